@@ -0,0 +1,90 @@
+# Benchmark da redução de pontos dos gráficos de séries temporais (utils/charts.py)
+#
+# Monta a figura de linha de uma série diária sintética (como o CHIRPS diário) de N anos
+# para M municípios, sem redução e com os métodos LTTB e mínimo/máximo, e registra os
+# pontos enviados, o tamanho da figura serializada (JSON), o tempo de montagem e
+# serialização, e a fração da amplitude original (máximo − mínimo) preservada.
+#
+# A saída é JSON Lines, como em benchmarks/bench_pages.py.
+#
+# Uso:
+#   python benchmarks/bench_charts.py --years 10 30 --municipalities 1 5 --width 1000
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import plotly.graph_objects as go
+
+from utils.charts import downsample
+
+
+# Série diária sintética: sazonalidade, ruído e alguns eventos extremos
+def synthetic_series(n_years, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("1991-01-01", periods=int(n_years * 365.25), freq="D")
+    season = 4 + 4 * np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 15) / 365.25)
+    values = np.maximum(season + rng.gamma(0.6, 4.0, len(dates)) - 2, 0)
+    values[rng.choice(len(dates), size=max(n_years // 2, 1), replace=False)] += rng.uniform(60, 120)
+    return pd.DataFrame({"date": dates, "precip": values})
+
+
+def build_figure(frames):
+    fig = go.Figure()
+    for name, frame in frames:
+        fig.add_trace(go.Scatter(x=frame["date"], y=frame["precip"], mode="lines", name=name))
+    return fig
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Redução de pontos dos gráficos de séries temporais")
+    parser.add_argument("--years", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--municipalities", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--width", type=int, default=1000, help="largura de referência do gráfico (px)")
+    parser.add_argument("--output", help="arquivo JSON Lines (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)
+    with out as out:
+        for n_years in args.years:
+            for n_municipalities in args.municipalities:
+                series = [(f"Município {i + 1:02d}", synthetic_series(n_years, seed=i))
+                          for i in range(n_municipalities)]
+                for method in ("none", "lttb", "minmax"):
+                    start = time.perf_counter()
+                    if method == "none":
+                        frames = series
+                    else:
+                        frames = [(name, downsample(df, "date", ["precip"], width=args.width, method=method).frame)
+                                  for name, df in series]
+                    reduce_s = time.perf_counter() - start
+                    start = time.perf_counter()
+                    payload = build_figure(frames).to_json()
+                    figure_s = time.perf_counter() - start
+
+                    ranges = [(frame["precip"].max() - frame["precip"].min()) /
+                              (df["precip"].max() - df["precip"].min())
+                              for (_, frame), (_, df) in zip(frames, series)]
+                    record = {
+                        "method": method, "years": n_years, "municipalities": n_municipalities,
+                        "width_px": args.width, "points": sum(len(frame) for _, frame in frames),
+                        "total_points": sum(len(df) for _, df in series),
+                        "figure_bytes": len(payload.encode("utf-8")), "reduce_s": round(reduce_s, 4),
+                        "figure_s": round(figure_s, 4), "range_preserved": round(min(ranges), 4),
+                    }
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# Benchmark do cubo de pixels local (utils/cube.py) contra as reduções no servidor
+#
+# Para um município e um período, calcula o que as páginas exibem quando o usuário percorre
+# todos os anos do mapa: série mensal e anual, escala de cores (mínimo, máximo e percentis) de
+# cada ano e climatologia mensal. Compara:
+# - "reductions": uma redução no servidor por estatística (série mensal, reduce_stats de cada
+#   imagem anual, redutor agrupado da climatologia), como no modo de análise completo;
+# - "cube": uma única requisição de pixels (backend.get_pixels) e tudo calculado com NumPy.
+# Registra o tempo de parede, as chamadas e os bytes recebidos, e a maior diferença entre as
+# médias mensais das duas estratégias (com o backend local, o cubo usa a mesma grade das
+# reduções: a diferença deve ficar na precisão do float32).
+#
+# A saída é JSON Lines, como em benchmarks/bench_pages.py.
+#
+# Com --check, o script também verifica o caminho do cubo local e termina com erro se algo
+# falhar: médias zonais (zonal_means/monthly_frame) iguais às reduções no servidor dentro de
+# --tolerance, um período sem nenhum pixel válido (sem anos nos mapas), uma ROI menor que um
+# pixel (imagens só com NaN) e a orientação dos mapas (linha 0 na latitude máxima).
+#
+# Uso:
+#   python benchmarks/bench_cube.py --years 5 10 30 --latency 0.2
+#   python benchmarks/bench_cube.py --years 2 --latency 0 --check
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("AGROMET_PRECOMPUTED_PATH", os.path.join(tempfile.gettempdir(), "agromet-sem-precalculo"))
+
+from utils import engine
+from utils import store as series_store
+from utils.catalog import get_municipalities, get_region
+from utils.charts import raster_figure
+from utils.cube import PixelCube, fetch_cube, pixel_centers, pixel_stats, zonal_means
+from utils.datasets import get_dataset
+from utils.fake_backend import METERS_PER_DEGREE, FakeBackend
+from utils.maps import roi_bounds
+from utils.planner import native_resolution, plan_region
+from utils.resultcache import get_result_cache
+from utils.series import month_range, monthly_climatology
+from utils.vizstats import get_viz_stats
+
+
+# Estratégia atual: uma redução no servidor por estatística
+def run_reductions(dataset, state, municipality, roi, start_date, end_date, plan, backend):
+    series = engine._dataset_series(dataset, state, municipality, roi, start_date, end_date, plan, backend)
+    stats = {}
+    for year in range(start_date.year, end_date.year + 1):
+        image = engine.annual_image(dataset, series.collection, year, roi, backend=backend)
+        window = engine.year_window(year, start_date, end_date)
+        stats[year] = get_viz_stats(backend, image, dataset.band, (dataset.id, year, window, municipality), roi,
+                                    plan.scale)
+    monthly_climatology(series.collection, dataset.band, roi, start_date, end_date, aggregator=dataset.aggregator,
+                        scale=plan.scale, value_name=dataset.value_name, backend=backend)
+    return series.monthly
+
+
+# Cubo local: uma requisição de pixels, estatísticas em NumPy
+def run_cube(dataset, state, municipality, roi, start_date, end_date, plan, backend):
+    result = engine._dataset_cube(dataset, state, municipality, roi, start_date, end_date, plan, backend)
+    stats = {year: pixel_stats(image) for year, image in zip(result.years, result.annual_images)}
+    return result.series.monthly
+
+
+# Verificações do cubo local (--check); devolve a lista de falhas
+def run_checks(backend, state, municipality, roi, plan, tolerance):
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+
+    # Médias zonais do cubo contra a redução das mesmas imagens mensais no servidor
+    for key in ("precipitacao", "temperatura"):
+        dataset = get_dataset(key)
+        start_date, end_date = date(2019, 1, 1), date(2020, 12, 31)
+        months = month_range(start_date, end_date)
+        collection = engine.dataset_collection(dataset, start_date, end_date, roi, backend)
+        images = backend.monthly_images(collection, 2019, 1, len(months), dataset.aggregator)
+        cube = fetch_cube(images, dataset.band, roi, roi_bounds(backend, roi), months, plan.scale, backend)
+        reduced = np.array(backend.get_info(backend.reduce_monthly_images(images, dataset.band, roi, len(months),
+                                                                         plan.scale)), dtype=float)
+        diff = float(np.nanmax(np.abs(zonal_means(cube) - reduced)))
+        check(diff <= tolerance, f"{key}: médias zonais diferem das reduções em {diff:.3g}")
+
+    # Período sem nenhum pixel válido (temperatura antes do início do MODIS, menos de 12 meses)
+    dataset = get_dataset("temperatura")
+    result = engine._dataset_cube(dataset, state, municipality, roi, date(1995, 1, 1), date(1995, 6, 30),
+                                  plan, backend)
+    check(result.years == [] and len(result.annual_images) == 0,
+          f"período sem dados: anos {result.years} nos mapas anuais")
+    check(result.series.monthly[dataset.value_name].isna().all(), "período sem dados: série mensal com valores")
+
+    # Período curto com dados: um único ano (incompleto) nos mapas
+    result = engine._dataset_cube(get_dataset("precipitacao"), state, municipality, roi, date(2020, 3, 1),
+                                  date(2020, 8, 31), plan, backend)
+    check(result.years == [2020], f"período curto: anos {result.years} nos mapas anuais")
+
+    # ROI menor que um pixel, entre os centros da grade: nenhum pixel válido
+    step = plan.scale / METERS_PER_DEGREE
+    lon, lat = round(roi.bbox[0] / step) * step, round(roi.bbox[1] / step) * step
+    ring = [[lon - 0.2 * step, lat - 0.2 * step], [lon + 0.2 * step, lat - 0.2 * step],
+            [lon + 0.2 * step, lat + 0.2 * step], [lon - 0.2 * step, lat + 0.2 * step]]
+    tiny = backend.geometry_from_geojson({"type": "Polygon", "coordinates": [ring + ring[:1]]})
+    result = engine._dataset_cube(get_dataset("precipitacao"), state, f"{municipality} (sub-pixel)", tiny,
+                                  date(2020, 1, 1), date(2020, 12, 31), plan, backend)
+    check(result.years == [], f"ROI sem pixels: anos {result.years} nos mapas anuais")
+    check(result.series.monthly["precip"].isna().all(), "ROI sem pixels: série mensal com valores")
+    stats = pixel_stats(np.full((3, 4), np.nan, dtype=np.float32))
+    check(all(value is None for value in stats.values()), f"imagem só com NaN: estatísticas {stats}")
+
+    # Orientação dos mapas: linha 0 (norte) na latitude máxima, com o eixo y crescente para cima
+    values = np.arange(12, dtype=np.float32).reshape(1, 3, 4)
+    cube = PixelCube(values, ~np.isnan(values), np.array([2020]), np.array([1]), (-50.0, -20.0, -49.0, -19.0), 1000)
+    _, lats = pixel_centers(cube)
+    fig = raster_figure(cube, values[0], "Viridis")
+    heatmap = fig.data[0]
+    check(float(heatmap.y[0]) == float(lats.max()) and heatmap.z[0][0] == values[0, 0, 0],
+          "mapa: a linha 0 não está na latitude máxima")
+    check(fig.layout.yaxis.autorange != "reversed", "mapa: eixo y invertido (norte embaixo)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cubo de pixels local contra reduções no servidor")
+    parser.add_argument("--state", default="Minas Gerais")
+    parser.add_argument("--dataset", default="precipitacao", choices=["precipitacao", "temperatura"])
+    parser.add_argument("--years", type=int, nargs="+", default=[5, 10, 30])
+    parser.add_argument("--municipality", type=int, default=3, help="índice do município sintético (tamanho)")
+    parser.add_argument("--latency", type=float, default=0.2, help="latência simulada por chamada (s)")
+    parser.add_argument("--output", help="arquivo JSON Lines (padrão: saída padrão)")
+    parser.add_argument("--check", action="store_true", help="verifica o cubo local e termina com erro se algo falhar")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="diferença máxima das médias mensais (--check)")
+    args = parser.parse_args(argv)
+
+    dataset = get_dataset(args.dataset)
+    backend = FakeBackend(latency=args.latency)
+    backend.initialize()
+    municipality = get_municipalities(backend, args.state)[args.municipality]
+    plan = plan_region(backend, args.state, municipality, native_resolution(dataset))
+    _, roi = get_region(backend, args.state, municipality, tolerance=plan.tolerance)
+
+    failures = []
+    out = open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)
+    with out as out, tempfile.TemporaryDirectory() as cache_dir:
+        for n_years in args.years:
+            start_date, end_date = date(2021 - n_years, 1, 1), date(2020, 12, 31)
+            monthly = {}
+            for strategy, run in (("reductions", run_reductions), ("cube", run_cube)):
+                series_store._default_store = series_store.SeriesStore(
+                    os.path.join(cache_dir, f"{time.time_ns()}.sqlite"))
+                get_result_cache().clear()
+                backend.reset_counters()
+                started = time.perf_counter()
+                monthly[strategy] = run(dataset, args.state, municipality, roi, start_date, end_date, plan, backend)
+                elapsed = time.perf_counter() - started
+                record = {
+                    "strategy": strategy, "dataset": args.dataset, "municipality": municipality,
+                    "years": n_years, "latency_s": args.latency, "wall_s": round(elapsed, 4),
+                    "calls": backend.calls, "bytes": backend.payload_bytes,
+                }
+                if strategy == "cube":
+                    values = [frame[dataset.value_name].to_numpy(dtype=float) for frame in monthly.values()]
+                    record["max_abs_diff"] = float(np.nanmax(np.abs(values[0] - values[1])))
+                    if record["max_abs_diff"] > args.tolerance:
+                        failures.append(f"{n_years} anos: séries mensais diferem em {record['max_abs_diff']:.3g}")
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+        if args.check:
+            get_result_cache().clear()
+            backend.latency = 0
+            failures += run_checks(backend, args.state, municipality, roi, plan, args.tolerance)
+    if args.check:
+        if failures:
+            sys.exit("Falhas na verificação do cubo local:\n- " + "\n- ".join(failures))
+        print("Verificação do cubo local: ok", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
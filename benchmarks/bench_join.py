@@ -0,0 +1,151 @@
+# Benchmark do balanço hídrico (página 03): pareamento de P e ET por busca x junção por chave
+#
+# Estratégias:
+# - "legacy": o pipeline original da página (composições mensais por calendarRange para cada
+#   ano × mês, um map extra para nbands e um filter(year).filter(month).first() em MOD16
+#   para cada mês do CHIRPS); apenas no backend "ee";
+# - "keyed": utils/series.water_balance_images (uma composição mensal por conjunto de dados,
+#   nbands gravado na composição e uma única ee.Join pela chave ano-mês).
+# Ambas reduzem as imagens sobre o município com reduceRegions e trazem o resultado em uma
+# chamada getInfo. Registra o tempo de parede de cada repetição e, com --profile (backend
+# "ee"), o perfil de computação do EE (ee.data.profiling / Profile.getProfiles), que
+# inclui os EECU-segundos de cada etapa.
+#
+# A saída é JSON Lines, como em benchmarks/bench_pages.py.
+#
+# Uso:
+#   python benchmarks/bench_join.py --backend ee --years 10 --repeats 3 --profile --output join.jsonl
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.backend import create_backend, features_to_df
+from utils.catalog import get_municipalities, get_region
+from utils.series import water_balance_images
+
+END_YEAR = 2021
+
+
+# Pipeline original da página 03 (antes da junção por chave), com a API do EE
+def legacy_water_balance(roi_fc, roi, year_start, year_end, scale):
+    import ee
+
+    chirps = ee.ImageCollection("UCSB-CHG/CHIRPS/PENTAD").select("precipitation")
+    mod16 = ee.ImageCollection("MODIS/061/MOD16A2GF") \
+        .map(lambda image: image.multiply(0.1).copyProperties(image, image.propertyNames())).select("ET")
+    start, end = ee.Date.fromYMD(year_start, 1, 1), ee.Date.fromYMD(year_end, 1, 1)
+    months = ee.List.sequence(1, 12)
+    years = ee.List.sequence(year_start, year_end - 1)
+
+    def monthly(collection):
+        filtered = collection.filter(ee.Filter.date(start, end)).filterBounds(roi)
+
+        def create_yearly(year):
+            def create_monthly_image(month):
+                return filtered \
+                    .filter(ee.Filter.calendarRange(year, year, "year")) \
+                    .filter(ee.Filter.calendarRange(month, month, "month")) \
+                    .sum().clip(roi).set("year", year).set("month", month)
+            return months.map(create_monthly_image)
+
+        images = ee.ImageCollection.fromImages(years.map(create_yearly).flatten())
+        return images.map(lambda image: image.set("nbands", image.bandNames().size())) \
+            .filter(ee.Filter.gt("nbands", 0))
+
+    chirps_monthly, mod16_monthly = monthly(chirps), monthly(mod16)
+
+    def add_et(image):
+        et = mod16_monthly \
+            .filter(ee.Filter.eq("year", image.get("year"))) \
+            .filter(ee.Filter.eq("month", image.get("month"))) \
+            .first()
+        return image.addBands([ee.Image(et).rename("ET")])
+
+    def add_balance(image):
+        return image.addBands([image.select("precipitation").subtract(image.select("ET")).rename("water_balance")])
+
+    def stats(image):
+        reduce = image.reduceRegions(collection=roi_fc, reducer=ee.Reducer.mean(), scale=scale)
+        return reduce.map(lambda f: f.set({"year": image.get("year"), "month": image.get("month")}))
+
+    return chirps_monthly.map(add_et).map(add_balance).map(stats).flatten()
+
+
+# Pipeline atual: composições mensais + junção por chave (via backend)
+def keyed_water_balance(backend, roi_fc, roi, year_start, year_end, scale):
+    chirps = backend.select(backend.image_collection("UCSB-CHG/CHIRPS/PENTAD"), "precipitation")
+    mod16 = backend.select(backend.rescale(backend.image_collection("MODIS/061/MOD16A2GF"), multiply=0.1), "ET")
+    start, end = f"{year_start}-01-01", f"{year_end}-01-01"
+    chirps = backend.filter_bounds(backend.filter_date(chirps, start, end), roi)
+    mod16 = backend.filter_bounds(backend.filter_date(mod16, start, end), roi)
+    images = water_balance_images(chirps, mod16, year_start, 1, (year_end - year_start) * 12, backend=backend)
+    return backend.reduce_regions(images, roi_fc, "mean", scale)
+
+
+# Executa a requisição e, se pedido, coleta o perfil de computação do EE
+def run(backend, request, profile):
+    if not profile:
+        started = time.perf_counter()
+        result = backend.get_info(request)
+        return result, time.perf_counter() - started, None
+
+    import ee
+    profile_ids = []
+    with ee.data.profiling(profile_ids.append):
+        started = time.perf_counter()
+        result = backend.get_info(request)
+        elapsed = time.perf_counter() - started
+    get_profiles = ee.ApiFunction.lookup("Profile.getProfiles").call
+    return result, elapsed, get_profiles(ids=profile_ids).getInfo()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Balanço hídrico: busca por imagem x junção por chave")
+    parser.add_argument("--backend", choices=["ee", "local"], default="local")
+    parser.add_argument("--state", default="Minas Gerais")
+    parser.add_argument("--municipality", help="padrão: o primeiro município do estado")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--scale", type=float, default=5000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--profile", action="store_true", help="coleta o perfil de computação do EE")
+    parser.add_argument("--output", help="arquivo JSON Lines (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    backend = create_backend(args.backend)
+    backend.initialize()
+    municipality = args.municipality or get_municipalities(backend, args.state)[0]
+    roi_fc, roi = get_region(backend, args.state, municipality)
+    year_start, year_end = END_YEAR - args.years, END_YEAR
+
+    strategies = {"keyed": lambda: keyed_water_balance(backend, roi_fc, roi, year_start, year_end, args.scale)}
+    if args.backend == "ee":
+        strategies["legacy"] = lambda: legacy_water_balance(roi_fc, roi, year_start, year_end, args.scale)
+
+    out = open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)
+    with out as out:
+        for strategy, build in sorted(strategies.items()):
+            for repeat in range(args.repeats):
+                result, elapsed, profile = run(backend, build(), args.profile and args.backend == "ee")
+                df = features_to_df(result)
+                record = {
+                    "strategy": strategy, "backend": args.backend, "municipality": municipality,
+                    "years": args.years, "scale_m": args.scale, "repeat": repeat,
+                    "wall_s": round(elapsed, 4), "months": len(df),
+                    "water_balance_mean": None if df.empty else round(float(df["water_balance"].mean()), 4),
+                }
+                if profile is not None:
+                    record["profile"] = profile
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# Benchmark das páginas: latência e chamadas ao Earth Engine por etapa
+#
+# Executa as páginas de precipitação, temperatura e evapotranspiração sem interface
+# (streamlit.testing AppTest) contra o backend local (utils/fake_backend.py), variando
+# o período (anos) e o tamanho da ROI. Cada bloco "with st.spinner(...)" das páginas é
+# atribuído a uma etapa (geometria, mapa da ROI, anual, mensal, estatísticas...) e
+# registra tempo de parede, número de chamadas getInfo e bytes recebidos.
+#
+# As páginas rodam no modo sequencial ou progressivo (utils/progressive.py, --modes); o
+# tempo até o primeiro mapa ou gráfico é registrado como a etapa "first_chart". No modo
+# progressivo, as etapas em segundo plano se sobrepõem às do spinner: compare o total.
+#
+# A saída é JSON Lines (um registro por página/período/ROI/etapa), para comparar
+# commits com benchmarks/compare.py.
+#
+# Uso:
+#   python benchmarks/bench_pages.py --output bench.jsonl
+#   python benchmarks/bench_pages.py --pages precipitacao --years 1 10 --sizes 0.25 1 --latency 0.1
+#   python benchmarks/bench_pages.py --modes sequential progressive --latency 0.2
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from utils import catalog as boundary_catalog
+from utils import store as series_store
+from utils.backend import set_backend
+from utils.fake_backend import FakeBackend, SYNTHETIC_MUNICIPALITY_SIZES
+from utils.resultcache import get_result_cache
+from utils.singleflight import get_singleflight
+
+PAGES = {
+    "precipitacao": "pages/01_*.py",
+    "temperatura": "pages/02_*.py",
+    "evapotranspiracao": "pages/03_*.py",
+}
+
+# Páginas que analisam apenas anos completos (data final em 1º de janeiro do ano seguinte)
+FULL_YEAR_PAGES = {"evapotranspiracao"}
+
+DEFAULT_YEARS = [1, 5, 10, 20]
+END_YEAR = 2020
+STATE = "Minas Gerais"
+
+# Etapas identificadas pelo texto do spinner (a primeira correspondência vale)
+STAGES = [
+    ("geometria", "geometry"),
+    ("mapa da região", "roi_map"),
+    ("mapa", "map"),
+    ("estatísticas", "stats"),
+    ("anual", "annual"),
+    ("mensa", "monthly"),
+    ("gráficos", "charts"),
+    ("carregando dados", "load"),
+]
+
+
+# Função para identificar a etapa a partir do texto do spinner
+def stage_of(text):
+    text = text.lower()
+    for keyword, stage in STAGES:
+        if keyword in text:
+            return stage
+    return "other"
+
+
+class StageRecorder:
+    def __init__(self, backend):
+        self.backend = backend
+        self.stages = {}
+
+    def add(self, stage, seconds, calls, payload_bytes):
+        totals = self.stages.setdefault(stage, {"wall_s": 0.0, "calls": 0, "bytes": 0})
+        totals["wall_s"] += seconds
+        totals["calls"] += calls
+        totals["bytes"] += payload_bytes
+
+    # Substitui st.spinner por uma versão que mede a etapa
+    @contextlib.contextmanager
+    def patch_spinner(self):
+        original = st.spinner
+
+        @contextlib.contextmanager
+        def timed_spinner(text="", *args, **kwargs):
+            calls, payload = self.backend.calls, self.backend.payload_bytes
+            start = time.perf_counter()
+            try:
+                with original(text, *args, **kwargs):
+                    yield
+            finally:
+                self.add(stage_of(text), time.perf_counter() - start,
+                         self.backend.calls - calls, self.backend.payload_bytes - payload)
+
+        st.spinner = timed_spinner
+        try:
+            yield
+        finally:
+            st.spinner = original
+
+
+# Função para obter o commit atual (para comparar execuções)
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Função para executar uma página com um período e um município e medir cada etapa
+def run_page(page_path, n_years, size, latency, cache_dir, timeout, full_years=False, mode="progressive"):
+    backend = FakeBackend(latency=latency)
+    set_backend(backend)
+    series_store._default_store = series_store.SeriesStore(os.path.join(cache_dir, f"{time.time_ns()}.sqlite"))
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    # Séries, estatísticas e tiles do processo: cada execução parte do zero
+    get_result_cache().clear()
+    get_singleflight().linger = 0
+
+    municipality = next(
+        f["properties"]["NM_MUN"] for f in backend.catalog["municipalities"]
+        if f["properties"]["NM_UF"] == STATE and abs(f["bbox"][2] - f["bbox"][0] - size) < 1e-9
+    )
+
+    at = AppTest.from_file(page_path, default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    sidebar = {"wall_s": time.perf_counter() - start, "calls": backend.calls, "bytes": backend.payload_bytes}
+
+    at.sidebar.selectbox[0].set_value(STATE)
+    at.sidebar.selectbox[1].set_value(municipality)
+    at.sidebar.date_input[0].set_value(date(END_YEAR - n_years + 1, 1, 1))
+    # O balanço hídrico usa anos completos até o ano anterior à data final
+    end_date = date(END_YEAR + 1, 1, 1) if full_years else date(END_YEAR, 12, 31)
+    at.sidebar.date_input[1].set_value(end_date)
+    at.sidebar.toggle[0].set_value(mode == "progressive")
+    at.sidebar.button[0].click()
+
+    backend.reset_counters()
+    recorder = StageRecorder(backend)
+    with recorder.patch_spinner():
+        start = time.perf_counter()
+        at.run()
+        total = {"wall_s": time.perf_counter() - start, "calls": backend.calls, "bytes": backend.payload_bytes}
+
+    staged = {key: sum(s[key] for s in recorder.stages.values()) for key in ("wall_s", "calls", "bytes")}
+    stages = dict(recorder.stages)
+    stages["unstaged"] = {key: total[key] - staged[key] for key in total}
+    stages["sidebar"] = sidebar
+    stages["total"] = total
+    first_chart = [entry for entry in at.session_state["instrumentacao_etapas"]
+                   if entry.get("metric") == "time_to_first_chart"]
+    if first_chart:
+        stages["first_chart"] = {"wall_s": first_chart[-1]["seconds"], "calls": 0, "bytes": 0}
+
+    # Troca do ano do mapa (páginas com o seletor): não deve refazer a análise
+    if at.main.selectbox:
+        at.main.selectbox[0].set_value(at.main.selectbox[0].options[-1])
+        backend.reset_counters()
+        start = time.perf_counter()
+        at.run()
+        stages["year_change"] = {"wall_s": time.perf_counter() - start, "calls": backend.calls,
+                                 "bytes": backend.payload_bytes}
+
+        # Volta ao ano já exibido: estatísticas e tiles devem vir do cache
+        at.main.selectbox[0].set_value(at.main.selectbox[0].options[0])
+        backend.reset_counters()
+        start = time.perf_counter()
+        at.run()
+        stages["year_revisit"] = {"wall_s": time.perf_counter() - start, "calls": backend.calls,
+                                  "bytes": backend.payload_bytes}
+    errors = [e.value for e in at.exception] + [e.value for e in at.error]
+    return stages, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das páginas contra o backend local")
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=sorted(PAGES))
+    parser.add_argument("--years", nargs="+", type=int, default=DEFAULT_YEARS)
+    parser.add_argument("--sizes", nargs="+", type=float, default=SYNTHETIC_MUNICIPALITY_SIZES,
+                        help="lado da ROI sintética, em graus")
+    parser.add_argument("--latency", type=float, default=0.05, help="latência simulada por chamada (s)")
+    parser.add_argument("--modes", nargs="+", choices=["sequential", "progressive"], default=["progressive"],
+                        help="execução das etapas das páginas (ver utils/progressive.py)")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="arquivo JSON Lines (padrão: saída padrão)")
+    parser.add_argument("--no-catalog", action="store_true",
+                        help="não gera o catálogo local de municípios (listas e ROI consultadas no backend)")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    commit = current_commit()
+    out = open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)
+    with tempfile.TemporaryDirectory() as cache_dir, out as out:
+        # Catálogo local de municípios gerado a partir do backend sintético (ou ausente)
+        boundary_catalog.CATALOG_PATH = os.path.join(cache_dir, "municipios.parquet")
+        if not args.no_catalog:
+            boundary_catalog.build_catalog(FakeBackend())
+        for page in args.pages:
+            page_path = glob.glob(PAGES[page])[0]
+            for n_years in args.years:
+                for size in args.sizes:
+                    for mode in args.modes:
+                        stages, errors = run_page(page_path, n_years, size, args.latency, cache_dir, args.timeout,
+                                                  full_years=page in FULL_YEAR_PAGES, mode=mode)
+                        for stage, values in stages.items():
+                            record = {
+                                "commit": commit, "page": page, "years": n_years, "roi_deg": size,
+                                "latency_s": args.latency, "catalog": not args.no_catalog, "mode": mode,
+                                "stage": stage, "wall_s": round(values["wall_s"], 4), "calls": values["calls"],
+                                "bytes": values["bytes"],
+                            }
+                            if errors and stage == "total":
+                                record["errors"] = errors
+                            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        out.flush()
+
+
+if __name__ == "__main__":
+    main()
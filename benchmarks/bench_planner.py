@@ -0,0 +1,128 @@
+# Benchmark do planejador de redução: precisão x latência
+#
+# Para cada município sintético (backend local) e cada conjunto de dados, calcula a série
+# mensal com:
+# - as escalas fixas antigas das páginas ("legacy": 10 km na precipitação, 1 km na temperatura);
+# - a escala escolhida por utils/planner.py para cada orçamento de pixels pedido;
+# e compara com uma referência fina (4x o maior orçamento). Registra tempo de parede,
+# chamadas, bytes, pixels na ROI, meses sem valor e o erro relativo médio.
+#
+# A saída é JSON Lines, como em benchmarks/bench_pages.py.
+#
+# Uso:
+#   python benchmarks/bench_planner.py --years 5 --budgets 2500 10000 40000 --output planner.jsonl
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from utils.datasets import MUNICIPIOS_ASSET, get_dataset
+from utils.fake_backend import FakeBackend, SYNTHETIC_MUNICIPALITY_SIZES
+from utils.planner import MIN_PIXELS, TARGET_PIXELS, native_resolution, plan_reduction
+from utils.series import monthly_series
+
+# Séries das páginas (registro em utils/datasets.py) e a escala fixa antiga de cada uma
+SERIES = {
+    "precipitacao": 10000,
+    "temperatura": 1000,
+}
+
+END_YEAR = 2020
+STATE = "Minas Gerais"
+
+
+# Função para obter a ROI e a área (km²) do município sintético com o lado pedido (graus)
+def synthetic_region(backend, size):
+    municipality = next(
+        f["properties"]["NM_MUN"] for f in backend.catalog["municipalities"]
+        if f["properties"]["NM_UF"] == STATE and abs(f["bbox"][2] - f["bbox"][0] - size) < 1e-9
+    )
+    fc = backend.feature_collection(MUNICIPIOS_ASSET)
+    fc = backend.filter_eq(backend.filter_eq(fc, "NM_UF", STATE), "NM_MUN", municipality)
+    roi = backend.geometry(fc)
+    return municipality, roi, backend.get_info(backend.area(roi)) / 1e6
+
+
+# Função para calcular a série mensal em uma escala e medir o custo
+def measure(backend, collection, band, roi, aggregator, n_years, plan_args):
+    backend.reset_counters()
+    start = time.perf_counter()
+    df = monthly_series(collection, band, roi, date(END_YEAR - n_years + 1, 1, 1), date(END_YEAR, 12, 31),
+                        aggregator=aggregator, backend=backend, **plan_args)
+    elapsed = time.perf_counter() - start
+    return df["value"].to_numpy(dtype=float), {"wall_s": elapsed, "calls": backend.calls, "bytes": backend.payload_bytes}
+
+
+# Erro relativo médio (%) em relação à referência e número de meses sem valor
+def compare(values, reference):
+    valid = ~np.isnan(reference)
+    missing = int(np.sum(np.isnan(values) & valid))
+    both = valid & ~np.isnan(values)
+    if not both.any():
+        return None, missing
+    scale = np.maximum(np.abs(reference[both]).mean(), 1e-9)
+    return float(np.abs(values[both] - reference[both]).mean() / scale * 100), missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precisão x latência do planejador de redução")
+    parser.add_argument("--series", nargs="+", choices=sorted(SERIES), default=sorted(SERIES))
+    parser.add_argument("--sizes", nargs="+", type=float, default=SYNTHETIC_MUNICIPALITY_SIZES,
+                        help="lado da ROI sintética, em graus")
+    parser.add_argument("--budgets", nargs="+", type=int, default=[TARGET_PIXELS // 4, TARGET_PIXELS, TARGET_PIXELS * 4],
+                        help="orçamentos de pixels a comparar")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="latência simulada por chamada (s)")
+    parser.add_argument("--output", help="arquivo JSON Lines (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    backend = FakeBackend(latency=args.latency)
+    out = open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)
+    with out as out:
+        for name in args.series:
+            dataset, legacy_scale = get_dataset(name), SERIES[name]
+            collection = backend.select(backend.image_collection(dataset.id), dataset.band)
+            collection = backend.rescale(collection, multiply=dataset.multiply, add=dataset.add)
+            band, aggregator = dataset.band, dataset.aggregator
+            native = native_resolution(dataset)
+
+            for size in args.sizes:
+                municipality, roi, area_km2 = synthetic_region(backend, size)
+                reference_plan = plan_reduction(area_km2, native, max(args.budgets) * 4, MIN_PIXELS * 25)
+                reference, _ = measure(backend, collection, band, roi, aggregator, args.years,
+                                       {"scale": reference_plan.scale})
+
+                candidates = [("legacy", {"scale": legacy_scale})]
+                for budget in args.budgets:
+                    plan = plan_reduction(area_km2, native, budget)
+                    candidates.append((f"plan@{budget}", {"scale": plan.scale, "tile_scale": plan.tile_scale,
+                                                           "best_effort": plan.best_effort}))
+
+                for strategy, plan_args in candidates:
+                    values, cost = measure(backend, collection, band, roi, aggregator, args.years, plan_args)
+                    error, missing = compare(values, reference)
+                    record = {
+                        "series": name, "roi_deg": size, "area_km2": round(area_km2, 1), "years": args.years,
+                        "strategy": strategy, "scale_m": plan_args["scale"],
+                        "pixels": int(area_km2 * 1e6 / plan_args["scale"] ** 2),
+                        "reference_scale_m": reference_plan.scale,
+                        "wall_s": round(cost["wall_s"], 4), "calls": cost["calls"], "bytes": cost["bytes"],
+                        "missing_months": missing,
+                        "mean_abs_error_pct": None if error is None else round(error, 3),
+                    }
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+
+if __name__ == "__main__":
+    main()
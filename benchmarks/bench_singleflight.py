@@ -0,0 +1,109 @@
+# Benchmark da coalescência de requisições entre sessões (utils/singleflight.py)
+#
+# Simula N sessões que abrem ao mesmo tempo o mesmo município e período (ex.: durante uma
+# seca) e pedem a série mensal pelo motor de séries (utils/engine.dataset_series), com o
+# backend local e latência simulada por chamada. Compara:
+# - "independent": cada sessão executa a própria cadeia de chamadas (sem coalescência);
+# - "coalesced": as sessões passam pela camada single-flight do processo.
+# Registra o tempo de parede, as chamadas ao backend e os contadores hit/miss/join.
+# Cada repetição usa um cache de séries (SQLite) vazio e sem armazenamento pré-calculado.
+#
+# A saída é JSON Lines, como em benchmarks/bench_pages.py.
+#
+# Uso:
+#   python benchmarks/bench_singleflight.py --sessions 1 10 50 --latency 0.2
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("AGROMET_PRECOMPUTED_PATH", os.path.join(tempfile.gettempdir(), "agromet-sem-precalculo"))
+
+from utils import engine
+from utils import store as series_store
+from utils.catalog import get_municipalities, get_region
+from utils.datasets import get_dataset
+from utils.fake_backend import FakeBackend
+from utils.planner import native_resolution, plan_region
+from utils.singleflight import SingleFlight
+
+
+# Executa as sessões simultaneamente (todas liberadas juntas por uma barreira)
+def run_sessions(n_sessions, request):
+    barrier = threading.Barrier(n_sessions)
+    errors = []
+
+    def session():
+        barrier.wait()
+        try:
+            request()
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=session) for _ in range(n_sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coalescência de análises idênticas entre sessões")
+    parser.add_argument("--state", default="Minas Gerais")
+    parser.add_argument("--dataset", default="precipitacao")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--latency", type=float, default=0.2, help="latência simulada por chamada (s)")
+    parser.add_argument("--output", help="arquivo JSON Lines (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    backend = FakeBackend(latency=args.latency)
+    backend.initialize()
+    municipality = get_municipalities(backend, args.state)[0]
+    plan = plan_region(backend, args.state, municipality, native_resolution(args.dataset))
+    _, roi = get_region(backend, args.state, municipality, tolerance=plan.tolerance)
+    start_date, end_date = date(2021 - args.years, 1, 1), date(2020, 12, 31)
+
+    out = open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)
+    with out as out, tempfile.TemporaryDirectory() as cache_dir:
+        for n_sessions in args.sessions:
+            for strategy in ("independent", "coalesced"):
+                series_store._default_store = series_store.SeriesStore(
+                    os.path.join(cache_dir, f"{time.time_ns()}.sqlite"))
+                singleflight = SingleFlight(linger=0)
+                if strategy == "independent":
+                    def request():
+                        engine._dataset_series(get_dataset(args.dataset), args.state, municipality, roi,
+                                               start_date, end_date, plan, backend)
+                else:
+                    def request():
+                        key = ("series", args.dataset, municipality, start_date, end_date, plan)
+                        singleflight.do(key, engine._dataset_series, get_dataset(args.dataset), args.state,
+                                        municipality, roi, start_date, end_date, plan, backend)
+
+                backend.reset_counters()
+                elapsed, errors = run_sessions(n_sessions, request)
+                record = {
+                    "strategy": strategy, "sessions": n_sessions, "dataset": args.dataset,
+                    "municipality": municipality, "years": args.years, "latency_s": args.latency,
+                    "wall_s": round(elapsed, 4), "calls": backend.calls, "errors": len(errors),
+                    **{key: value for key, value in singleflight.stats().items() if key != "in_flight"},
+                }
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Benchmark de inicialização: partida a frio e custo de cada rerun das páginas
+#
+# Cada página é aberta em um interpretador novo (AppTest, backend local com latência
+# simulada, inclusive na inicialização do EE) e executada uma vez (partida a frio) e
+# depois --reruns vezes, como a cada interação do usuário na barra lateral. Registra o
+# tempo e as chamadas ao servidor de cada fase e quais módulos pesados (ee, geemap,
+# folium, plotly.express) já foram importados sem que nenhum mapa ou gráfico tenha sido pedido.
+# Mede também o tempo de importação desses módulos isoladamente.
+#
+# Uso:
+#   python benchmarks/bench_startup.py --reruns 5 --latency 0.2 --output startup.jsonl
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {
+    "precipitacao": "pages/01_*.py",
+    "temperatura": "pages/02_*.py",
+    "evapotranspiracao": "pages/03_*.py",
+}
+
+# O próprio Streamlit já importa plotly.graph_objects (tema dos gráficos): vale observar plotly.express
+HEAVY_MODULES = ["ee", "geemap", "folium", "plotly.express"]
+IMPORTS = ["streamlit", "ee", "geemap.foliumap", "plotly.express", "utils.ee_backend"]
+
+
+# Executado no interpretador filho: partida a frio e reruns de uma página
+def child(page, reruns, latency):
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    from utils.backend import set_backend
+    from utils.fake_backend import FakeBackend
+
+    backend = FakeBackend(latency=latency)
+    set_backend(backend)
+    at = AppTest.from_file(glob.glob(PAGES[page])[0], default_timeout=600)
+    at.run()
+    result = {
+        "cold_s": time.perf_counter() - start,
+        "cold_calls": backend.calls,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+        "errors": [e.value for e in at.exception],
+    }
+
+    backend.reset_counters()
+    start = time.perf_counter()
+    for _ in range(reruns):
+        at.run()
+    result["rerun_s"] = (time.perf_counter() - start) / max(reruns, 1)
+    result["rerun_calls"] = backend.calls / max(reruns, 1)
+    print(json.dumps(result))
+
+
+# Tempo de importação de um módulo em um interpretador novo (None se não estiver instalado)
+def import_time(module):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    return float(proc.stdout.strip()) if proc.returncode == 0 else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partida a frio e custo por rerun das páginas")
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=sorted(PAGES))
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2, help="latência simulada por chamada (s)")
+    parser.add_argument("--output", help="arquivo JSON Lines (padrão: saída padrão)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child, args.reruns, args.latency)
+        return
+
+    out = open(args.output, "w") if args.output else contextlib.nullcontext(sys.stdout)
+    with out as out:
+        for module in IMPORTS:
+            out.write(json.dumps({"import": module, "seconds": import_time(module)}) + "\n")
+        for page in args.pages:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", page,
+                 "--reruns", str(args.reruns), "--latency", str(args.latency)],
+                cwd=ROOT, capture_output=True, text=True, check=True,
+            )
+            record = {"page": page, "latency_s": args.latency, "reruns": args.reruns}
+            record.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+
+if __name__ == "__main__":
+    main()
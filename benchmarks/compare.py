@@ -0,0 +1,49 @@
+# Comparação de dois resultados de benchmarks/bench_pages.py (ex.: antes e depois de um commit)
+#
+# Uso:
+#   python benchmarks/compare.py base.jsonl novo.jsonl [--stage total] [--threshold 0.10]
+#
+# Lista, para cada página/período/ROI/modo/etapa, tempo, chamadas e bytes das duas execuções
+# e a variação relativa do tempo. Sai com código 1 se alguma variação passar do limite.
+
+import argparse
+import json
+import sys
+
+KEY = ("page", "years", "roi_deg", "mode", "stage")
+
+
+def load(path):
+    with open(path) as f:
+        # Resultados anteriores ao modo progressivo não têm "mode" (execução sequencial)
+        return {tuple(r.get(k, "sequential") for k in KEY): r for r in map(json.loads, f) if r}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--stage", help="compara apenas esta etapa (ex.: total)")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="piora relativa de tempo considerada regressão")
+    args = parser.parse_args(argv)
+
+    base, new = load(args.base), load(args.new)
+    regressions = 0
+    print(f"{'página':<18}{'anos':>5}{'roi':>6}  {'modo':<12}{'etapa':<10}{'tempo (s)':>22}{'chamadas':>14}{'bytes':>22}")
+    for key in sorted(base.keys() & new.keys()):
+        if args.stage and key[4] != args.stage:
+            continue
+        b, n = base[key], new[key]
+        change = (n["wall_s"] - b["wall_s"]) / b["wall_s"] if b["wall_s"] else 0.0
+        flag = " !" if change > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{key[0]:<18}{key[1]:>5}{key[2]:>6g}  {key[3]:<12}{key[4]:<10}"
+              f"{b['wall_s']:>8.3f} → {n['wall_s']:>7.3f} {change:>+5.0%}"
+              f"{b['calls']:>6} → {n['calls']:<5}"
+              f"{b['bytes']:>10} → {n['bytes']:<10}{flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,30 @@
 #%%
 # Monitoramento Agrometeorológico com Google Earth Engine e Streamlit
 
-import geemap               # Ferramentas para integração com o Google Earth Engine e mapas interativos
-import ee                   # Biblioteca oficial do Google Earth Engine para Python (processamento de dados geoespaciais)
-import geemap.foliumap as geemap  # Versão do geemap baseada no folium, usada para renderizar mapas no Streamlit
-from datetime import datetime       # Utilizado para manipular datas (seleção do período de análise)
+from datetime import datetime  # Utilizado para manipular datas (seleção do período de análise)
 import streamlit as st              # Framework principal do app (interface web interativa)
-import plotly.express as px  # Gráficos simples e rápidos)
 import pandas as pd          # Manipulação de tabelas e dataframes                 # Pausa no processamento (ex: spinner de carregamento)
-import json               # Manipulação de arquivos JSON (ex: para exportar dados)
 import os                 # Manipulação de arquivos e diretórios (ex: para salvar arquivos temporários)
+from utils.catalog import get_states, get_municipalities, get_region  # Catálogo local de estados/municípios
+from utils.planner import plan_region, native_resolution  # Escala de redução conforme a área da ROI
+from utils.maps import MAP_MODES, prepare_map, render_map, render_thumbnail  # Mapas com cache de tiles (interativo ou PNG)
+from utils.session import get_session, get_analysis, set_analysis, debug_sidebar  # Sessão do Earth Engine e resultados da análise
+from utils.instrumentation import start_page, stage, start_first_chart_clock, chart_rendered  # Etapas instrumentadas (spinner + tempos e chamadas ao EE)
+from utils.charts import show_chart, downsample, raster_figure  # Gráficos com redução de pontos e métricas de renderização
+from utils.cube import pixel_stats, annual_anomaly  # Estatísticas locais do cubo de pixels
+from utils.progressive import ProgressiveRun  # Etapas independentes em paralelo, exibidas assim que ficam prontas
+from utils.vizstats import viz_params, describe_stretch  # Escala de cores dos mapas (uma chamada, com cache)
+from utils.datasets import get_dataset  # Registro dos conjuntos de dados (ID, banda, conversão, paleta...)
+from utils.series import dataset_collection  # Coleção do período (mapas anuais)
+from utils.engine import ANALYSIS_MODES, dataset_series, dataset_climatology, dataset_cube, annual_image, annual_viz_stats  # Motor de séries compartilhado pelas páginas
+
+# Conjunto de dados da página (ver utils/datasets.py)
+DATASET = get_dataset("precipitacao")
 
 #%%
 # Configuração da página
 st.set_page_config(layout="wide")
+start_page("precipitacao")  # Identifica a página nos registros de instrumentação
 
 # Definindo o ícone da página
 st.title("Monitoramento Climático e Agrícola 🌍")
@@ -44,44 +55,18 @@ A análise detalhada da precipitação auxilia na compreensão de padrões sazon
 """)
 
 #%%
-# Inicializar Google Earth Engine
-# Autenticação do Google Earth Engine para deploy (conta de serviço)
-if "GEE_CREDENTIALS_JSON" in st.secrets:
-    credentials = ee.ServiceAccountCredentials(
-        json.loads(st.secrets["GEE_CREDENTIALS_JSON"])["client_email"],
-        key_data=st.secrets["GEE_CREDENTIALS_JSON"]
-    )
-    ee.Initialize(credentials)
-else:
-    # Fallback para autenticação local (útil para desenvolvimento local)
-    try:
-        ee.Initialize()
-    except Exception as e:
-        ee.Authenticate()
-        ee.Initialize()
-
-
-# Inicializa um mapa apenas para garantir autenticação do Earth Engine
-auth_map = geemap.Map()
-
-# Carregar os assets do usuário no GEE
-ESTADOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_UF_2023"
-MUNICIPIOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_Municipios_2023"
-
-# Função para obter a lista de estados
-@st.cache_data
+# Backend do Google Earth Engine (ou o substituto local), inicializado uma única vez por processo
+backend = get_session()
+
+# Função para obter a lista de estados (catálogo local, ver utils/catalog.py)
+@st.cache_data(ttl="1d", max_entries=1)
 def get_estados():
-    estados = ee.FeatureCollection(ESTADOS_ASSET)
-    lista_estados = estados.aggregate_array("NM_UF").getInfo()
-    return sorted(lista_estados)
+    return get_states(backend)
 
 # Função para obter municípios com base no estado selecionado
-@st.cache_data
+@st.cache_data(ttl="1d", max_entries=27)
 def get_municipios(estado):
-    municipios = ee.FeatureCollection(MUNICIPIOS_ASSET)
-    municipios_estado = municipios.filter(ee.Filter.eq("NM_UF", estado))
-    lista_municipios = municipios_estado.aggregate_array("NM_MUN").getInfo()
-    return sorted(lista_municipios)
+    return get_municipalities(backend, estado)
 
 # Sidebar para seleção de estado e município
 st.sidebar.header("Seleção de Região")
@@ -102,6 +87,12 @@ st.sidebar.markdown("Defina o intervalo de datas para a análise.")
 
 start_date = st.sidebar.date_input("📅 Data inicial", datetime(2010, 1, 1))
 end_date   = st.sidebar.date_input("📅 Data final", datetime(2020, 12, 31))
+# Exibição dos mapas: interativo (ROI + mapa anual), interativo leve (um único mapa) ou imagem estática
+map_mode = MAP_MODES[st.sidebar.selectbox("🗺️ Exibição dos mapas", list(MAP_MODES))]
+# Modo de análise: completa ou apenas a climatologia mensal (12 linhas, uma única requisição)
+analysis_mode = ANALYSIS_MODES[st.sidebar.selectbox("📊 Análise", list(ANALYSIS_MODES))]
+# Renderização progressiva: série e mapas calculados ao mesmo tempo, cada um exibido assim que fica pronto
+progressive = st.sidebar.toggle("⚡ Renderização progressiva", value=True)
 run_analysis = st.sidebar.button("Executar Análise")
 
 # Verifica se a data inicial é anterior à data final
@@ -114,132 +105,223 @@ if not municipio_selecionado:
     st.error("Selecione um município para prosseguir.")
     st.stop()
 
+# Parâmetros da análise: os resultados ficam na sessão enquanto eles não mudarem
+analysis_params = (estado_selecionado, municipio_selecionado, start_date, end_date, analysis_mode)
+
 if run_analysis:
+    # Tempo até o primeiro mapa ou gráfico (ver utils/instrumentation.py)
+    start_first_chart_clock("progressive" if progressive else "sequential")
+
     # Definir a ROI como a geometria do município selecionado
-    with st.spinner("Carregando geometria do município..."):
-        roi_fc = ee.FeatureCollection(MUNICIPIOS_ASSET) \
-                    .filter(ee.Filter.eq("NM_UF", estado_selecionado)) \
-                    .filter(ee.Filter.eq("NM_MUN", municipio_selecionado))
-        roi = roi_fc.geometry()
-
-    # Visualização da Região de Interesse
-    with st.spinner("Renderizando mapa da região de interesse..."):
-        m = geemap.Map(height=600)
-        m.centerObject(roi, 8)
-        m.setOptions("HYBRID")
-        m.addLayer(roi, {}, "Região de Interesse")
-        m.to_streamlit()
+    with stage("Carregando geometria do município..."):
+        # Escala, simplificação e tileScale/bestEffort conforme a área do município
+        plan = plan_region(backend, estado_selecionado, municipio_selecionado, native_resolution(DATASET))
+        roi_fc, roi = get_region(backend, estado_selecionado, municipio_selecionado, tolerance=plan.tolerance)
+
+    # Climatologia mensal: média, desvio-padrão e número de anos por mês do calendário, agrupados
+    # no servidor (ou a partir do armazenamento pré-calculado); nada de séries, mapas ou estatísticas
+    if analysis_mode == "climatology":
+        with stage("Calculando climatologia mensal de precipitação..."):
+            climatology = dataset_climatology(DATASET, estado_selecionado, municipio_selecionado, roi,
+                                              start_date, end_date, plan, backend=backend)
+        set_analysis("precipitacao", analysis_params, plan=plan, roi=roi, climatology=climatology)
+    # Cubo local: os pixels mensais da ROI são baixados uma única vez; série, mapas anuais, escala de
+    # cores, climatologia e anomalias são calculados localmente com NumPy (ver utils/cube.py)
+    elif analysis_mode == "cube":
+        with stage("Baixando os pixels mensais da região..."):
+            cube = dataset_cube(DATASET, estado_selecionado, municipio_selecionado, roi, start_date, end_date,
+                                plan, backend=backend)
+        set_analysis("precipitacao", analysis_params, plan=plan, roi=roi, collection=cube.series.collection,
+                     series=cube.series, cube=cube)
+    else:
+        # Coleção do período para os mapas anuais (objeto lazy, nenhuma chamada ao EE)
+        collection = dataset_collection(DATASET, start_date, end_date, roi, backend)
+
+        # Séries mensal e anual: armazenamento pré-calculado (nenhuma chamada ao EE) ou, se o período não
+        # estiver coberto, cache local + uma chamada ao EE para os meses ausentes (ver utils/engine.py)
+        # No modo progressivo, a série é calculada junto com os mapas, mais abaixo
+        series = None
+        if not progressive:
+            with stage("Calculando série mensal de precipitação..."):
+                series = dataset_series(DATASET, estado_selecionado, municipio_selecionado, roi, start_date,
+                                        end_date, plan, backend=backend)
+
+        set_analysis("precipitacao", analysis_params, plan=plan, roi=roi, collection=collection, series=series)
+
+# Resultados da análise (recém-calculados ou de um rerun anterior, ex.: troca do ano do mapa)
+analysis = get_analysis("precipitacao", analysis_params)
+debug_sidebar()
+
+if analysis and "climatology" in analysis:
+    # Plotly só é importado quando há gráficos a exibir (partida mais rápida)
+    import plotly.express as px
+    climatology = analysis["climatology"]
+    st.header("Precipitação Média Mensal")
+    fig_climatology = px.bar(climatology.table, x="month", y="precip", error_y="std",
+                             labels={"month": "Mês", "precip": "Precipitação Média (mm)", "std": "Desvio-padrão"},
+                             title=f"Precipitação Média Mensal ({start_date.year}–{end_date.year}, ± desvio-padrão)")
+    show_chart(fig_climatology)
+    st.caption(climatology.caption)
+    st.dataframe(climatology.table.rename(columns={"count": "anos"}), use_container_width=True)
+    chart_rendered()
+    st.stop()
+
+if analysis:
+    plan, roi, collection = analysis["plan"], analysis["roi"], analysis["collection"]
 
     # Extraindo os anos do período selecionado
     start_year = start_date.year
     end_year = end_date.year
     years = list(range(start_year, end_year + 1))
-    months = list(range(1, 13))
-
-    # Carregar o conjunto de dados CHIRPS (precipitação diária)
-    with st.spinner("Carregando dados de precipitação..."):
-        chirps = ee.ImageCollection("UCSB-CHG/CHIRPS/DAILY") \
-            .select("precipitation") \
-            .filterDate(start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")) \
-            .filterBounds(roi)
 
     # Cálculo da precipitação anual
-    with st.spinner("Calculando precipitação anual..."):
-        def calc_annual_precip(year):
-            year = ee.Number(year)
-            start = ee.Date.fromYMD(year, 1, 1)
-            end = ee.Date.fromYMD(year, 12, 31)
-            precip_sum = chirps.filterDate(start, end).sum().clip(roi)
-            return precip_sum.set('year', year).set('system:time_start', start.millis())
-        annual_precip_ic = ee.ImageCollection(ee.List(years).map(calc_annual_precip))
-
-    # Ajuste automático do histograma para o mapa
-    def get_viz_params(image):
-        stats = image.reduceRegion(
-            reducer=ee.Reducer.minMax(),
-            geometry=roi,
-            scale=1000,
-            maxPixels=1e9
-        )
-        min_val = stats.get("precipitation_min").getInfo()
-        max_val = stats.get("precipitation_max").getInfo()
-        return {"min": min_val, "max": max_val, "palette": ['#ffffff', '#ff3333', '#fff581', '#33ecff', '#6f5eff', '#171cb1']}
-
-    # Mapa com precipitação anual
-    st.header("Mapa de Precipitação Anual")
-    year_for_map = st.selectbox("Selecione o ano para o mapa", years)
-    annual_img = ee.Image(annual_precip_ic.filter(ee.Filter.eq('year', year_for_map)).first())
-    viz_params = get_viz_params(annual_img)
-    with st.spinner("Renderizando mapa de precipitação anual..."):
-        m = geemap.Map()
-        m.centerObject(roi, 8)
-        m.addLayer(annual_img, viz_params, f"Precipitação Anual {year_for_map}")
-        st.write("### Visualização no Mapa")
-        m.to_streamlit(height=500)
-
-    # Geração dos gráficos com Plotly
-    st.header("Análise Gráfica da Precipitação")
-
-    def get_region_mean(image, band, scale=10000):
-        stat = image.reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=roi,
-            scale=scale,
-            maxPixels=1e9
-        )
-        return stat.get(band)
-
-    # Gráfico anual
-    with st.spinner("Gerando gráfico anual..."):
-        annual_data = []
-        for y in years:
-            img = ee.Image(annual_precip_ic.filter(ee.Filter.eq('year', y)).first())
-            mean_val = get_region_mean(img, "precipitation")
-            mean_val = ee.Number(mean_val).getInfo() if mean_val else None
-            annual_data.append({"year": y, "precip": mean_val})
-        df_annual = pd.DataFrame(annual_data)
-        fig_annual = px.bar(df_annual, x="year", y="precip",
-                            labels={"year": "Ano", "precip": "Precipitação (mm)"},
-                            title="Precipitação Acumulada Anual")
-        st.plotly_chart(fig_annual, use_container_width=True)
-
-    # Gráfico mensal
-    with st.spinner("Gerando gráfico mensal..."):
-        monthly_data = []
-        for y in years:
-            for m in months:
-                start = ee.Date.fromYMD(y, m, 1)
-                end = start.advance(1, 'month')
-                img = chirps.filterDate(start, end).sum().clip(roi)
-                mean_val = get_region_mean(img, "precipitation")
-                mean_val = ee.Number(mean_val).getInfo() if mean_val else None
-                monthly_data.append({"year": y, "month": m, "precip": mean_val})
-        df_monthly = pd.DataFrame(monthly_data)
-        df_monthly_avg = df_monthly.groupby("month").mean().reset_index()
-        fig_monthly = px.bar(df_monthly_avg, x="month", y="precip",
-                             labels={"month": "Mês", "precip": "Precipitação Média (mm)"},
-                             title="Precipitação Média Mensal")
-        st.plotly_chart(fig_monthly, use_container_width=True)
-
-    # Série temporal mensal com média móvel
-    with st.spinner("Gerando série temporal mensal..."):
-        df_monthly['date'] = pd.to_datetime(df_monthly['year'].astype(str) + '-' + df_monthly['month'].astype(str) + '-15')
-        df_monthly = df_monthly.sort_values('date')
-        df_monthly['precip_rolling'] = df_monthly['precip'].rolling(window=3, center=True).mean()
-        fig_ts = px.line(df_monthly, x='date', y='precip',
-                         labels={'date': 'Data', 'precip': 'Precipitação (mm)'},
-                         title='Série Temporal Mensal da Precipitação')
-        fig_ts.add_scatter(x=df_monthly['date'], y=df_monthly['precip_rolling'],
-                           mode='lines', name='Média Móvel (3 meses)', line=dict(color='black', width=3, dash='dash'))
-        st.plotly_chart(fig_ts, use_container_width=True)
-
-    # Estatísticas descritivas
-    with st.spinner("Calculando estatísticas descritivas..."):
-        st.subheader("###Estatísticas Descritivas da Precipitação Anual")
-        st.dataframe(df_annual.describe().transpose(), use_container_width=True)
-        max_row = df_annual.loc[df_annual['precip'].idxmax()]
-        min_row = df_annual.loc[df_annual['precip'].idxmin()]
-        st.markdown(f"**Ano mais chuvoso:** {int(max_row['year'])} ({max_row['precip']:.1f} mm)")
-        st.markdown(f"**Ano mais seco:** {int(min_row['year'])} ({min_row['precip']:.1f} mm)")
-        fig_box = px.box(df_annual, y="precip", points="all", title="Distribuição da Precipitação Anual")
-        st.plotly_chart(fig_box, use_container_width=True)
\ No newline at end of file
+    def calc_annual_precip(year):
+        return annual_image(DATASET, collection, year, roi, backend=backend)
+
+    # Ajuste automático do histograma para o mapa: mínimo, máximo e percentis em uma única chamada,
+    # memorizados por conjunto de dados, ano (trecho coberto pelo período), região e escala
+    def get_annual_stats(year, image):
+        return annual_viz_stats(DATASET, image, year, start_date, end_date, estado_selecionado,
+                                municipio_selecionado, roi, plan, backend=backend)
+
+    # Camada do mapa anual e as estatísticas da escala de cores
+    def annual_layers(year):
+        annual_img = calc_annual_precip(year)
+        stats = get_annual_stats(year, annual_img)
+        return [(annual_img, viz_params(stats, DATASET.palette), f"Precipitação Anual {year}")], stats
+
+    # Visualização da Região de Interesse (nos modos leve e estático, o contorno vai no mapa anual)
+    def roi_map():
+        with stage("Renderizando mapa da região de interesse..."):
+            render_map(backend, roi, height=600, basemap="HYBRID")
+        chart_rendered()
+
+    # Mapa com precipitação anual: a troca do ano reexecuta apenas este fragmento
+    @st.fragment
+    def annual_precip_map():
+        st.header("Mapa de Precipitação Anual")
+        year_for_map = st.selectbox("Selecione o ano para o mapa", years)
+        with stage("Renderizando mapa de precipitação anual..."):
+            layers, stats = annual_layers(year_for_map)
+            st.write("### Visualização no Mapa")
+            if map_mode == "static":
+                render_thumbnail(backend, roi, layers, caption=f"Precipitação Anual {year_for_map}")
+            else:
+                render_map(backend, roi, layers, height=500, basemap="HYBRID" if map_mode == "light" else None)
+            st.caption(describe_stretch(stats, DATASET.unit))
+        chart_rendered()
+
+    # Cubo local: mapa anual, anomalia e climatologia a partir dos pixels já baixados (sem chamadas ao EE)
+    @st.fragment
+    def cube_maps(result):
+        st.header("Mapa de Precipitação Anual (cubo local)")
+        if not result.years:
+            st.warning("Nenhum pixel válido na região no período selecionado: os mapas anuais não foram gerados.")
+        else:
+            year_for_map = st.selectbox("Selecione o ano para o mapa", result.years)
+            with stage("Calculando mapas a partir do cubo local..."):
+                annual = result.annual_images[result.years.index(year_for_map)]
+                stats = pixel_stats(annual)
+                if stats["min"] is None:
+                    st.warning(f"Nenhum pixel válido na região em {year_for_map}: o mapa anual não foi gerado.")
+                else:
+                    vis = viz_params(stats, DATASET.palette)
+                    show_chart(raster_figure(result.cube, annual, vis["palette"], vis["min"], vis["max"],
+                                             title=f"Precipitação Anual {year_for_map}", label="Precipitação (mm)"))
+                    st.caption(describe_stretch(stats, DATASET.unit))
+                    anomaly = annual_anomaly(result.years, result.annual_images, year_for_map)
+                    show_chart(raster_figure(result.cube, anomaly, "RdBu", symmetric=True,
+                                             title=f"Anomalia de Precipitação {year_for_map} (em relação à média de {result.years[0]}–{result.years[-1]})",
+                                             label="Anomalia (mm)"))
+            chart_rendered()
+        st.subheader("Climatologia Mensal (cubo local)")
+        st.dataframe(result.climatology.rename(columns={"count": "anos"}), use_container_width=True)
+
+    # Gráficos e estatísticas da série mensal
+    def series_charts(series):
+        df_monthly = series.monthly.copy()
+        plan_caption = series.caption
+
+        # Geração dos gráficos com Plotly
+        # Plotly só é importado quando há gráficos a exibir (partida mais rápida)
+        import plotly.express as px
+        st.header("Análise Gráfica da Precipitação")
+
+        # Gráfico anual
+        with stage("Gerando gráfico anual..."):
+            df_annual = series.annual
+            fig_annual = px.bar(df_annual, x="year", y="precip",
+                                labels={"year": "Ano", "precip": "Precipitação (mm)"},
+                                title="Precipitação Acumulada Anual")
+            show_chart(fig_annual)
+            st.caption(plan_caption)
+        chart_rendered()
+
+        # Gráfico mensal
+        with stage("Gerando gráfico mensal..."):
+            df_monthly_avg = df_monthly.groupby("month").mean().reset_index()
+            fig_monthly = px.bar(df_monthly_avg, x="month", y="precip",
+                                 labels={"month": "Mês", "precip": "Precipitação Média (mm)"},
+                                 title="Precipitação Média Mensal")
+            show_chart(fig_monthly)
+            st.caption(plan_caption)
+
+        # Série temporal mensal com média móvel
+        with stage("Gerando série temporal mensal..."):
+            df_monthly['date'] = pd.to_datetime(df_monthly['year'].astype(str) + '-' + df_monthly['month'].astype(str) + '-15')
+            df_monthly = df_monthly.sort_values('date')
+            df_monthly['precip_rolling'] = df_monthly['precip'].rolling(window=3, center=True).mean()
+            # Séries longas: cerca de um ponto por pixel do gráfico (ver utils/charts.py)
+            sample = downsample(df_monthly, 'date', ['precip'])
+            df_plot = sample.frame
+            fig_ts = px.line(df_plot, x='date', y='precip',
+                             labels={'date': 'Data', 'precip': 'Precipitação (mm)'},
+                             title='Série Temporal Mensal da Precipitação')
+            fig_ts.add_scatter(x=df_plot['date'], y=df_plot['precip_rolling'],
+                               mode='lines', name='Média Móvel (3 meses)', line=dict(color='black', width=3, dash='dash'))
+            show_chart(fig_ts, sample)
+            st.caption(plan_caption)
+
+        # Estatísticas descritivas
+        with stage("Calculando estatísticas descritivas..."):
+            st.subheader("###Estatísticas Descritivas da Precipitação Anual")
+            st.dataframe(df_annual.describe().transpose(), use_container_width=True)
+            # Sem nenhum valor anual (ex.: cubo local sem pixels válidos), não há ano mais chuvoso/seco
+            if df_annual['precip'].notna().any():
+                max_row = df_annual.loc[df_annual['precip'].idxmax()]
+                min_row = df_annual.loc[df_annual['precip'].idxmin()]
+                st.markdown(f"**Ano mais chuvoso:** {int(max_row['year'])} ({max_row['precip']:.1f} mm)")
+                st.markdown(f"**Ano mais seco:** {int(min_row['year'])} ({min_row['precip']:.1f} mm)")
+            fig_box = px.box(df_annual, y="precip", points="all", title="Distribuição da Precipitação Anual")
+            show_chart(fig_box)
+            st.caption(plan_caption)
+
+    if analysis.get("cube") is not None:
+        cube_maps(analysis["cube"])
+        series_charts(analysis["series"])
+    elif analysis["series"] is not None:
+        if map_mode == "interactive":
+            roi_map()
+        annual_precip_map()
+        series_charts(analysis["series"])
+    else:
+        # Modo progressivo: série mensal, mapa da ROI e mapa anual (estatísticas e tiles do primeiro ano)
+        # são calculados ao mesmo tempo; cada um é exibido no seu espaço assim que fica pronto
+        run = ProgressiveRun()
+        run.submit("Série mensal", dataset_series, DATASET, estado_selecionado, municipio_selecionado, roi,
+                   start_date, end_date, plan, backend=backend)
+        if map_mode == "interactive":
+            run.submit("Mapa da região de interesse", prepare_map, backend, roi)
+        run.submit("Mapa anual", lambda: prepare_map(backend, roi, annual_layers(years[0])[0],
+                                                     static=map_mode == "static"))
+
+        slots = {name: st.empty() for name in ("Mapa da região de interesse", "Mapa anual", "Série mensal")}
+        for name, result in run.as_completed():
+            with slots[name].container():
+                if name == "Mapa da região de interesse":
+                    roi_map()
+                elif name == "Mapa anual":
+                    annual_precip_map()
+                else:
+                    analysis["series"] = result
+                    series_charts(result)
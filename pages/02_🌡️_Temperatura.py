@@ -1,15 +1,26 @@
-import geemap               # Ferramentas para integração com o Google Earth Engine e mapas interativos
-import ee                   # Biblioteca oficial do Google Earth Engine para Python (processamento de dados geoespaciais)
-import geemap.foliumap as geemap  # Versão do geemap baseada no folium, usada para renderizar mapas no Streamlit
-from datetime import datetime       # Utilizado para manipular datas (seleção do período de análise)
+from datetime import datetime  # Utilizado para manipular datas (seleção do período de análise)
 import streamlit as st              # Framework principal do app (interface web interativa)
-import plotly.express as px  # Gráficos simples e rápidos)
 import pandas as pd          # Manipulação de tabelas e dataframes                 # Pausa no processamento (ex: spinner de carregamento)
-import json
+from utils.catalog import get_states, get_municipalities, get_region  # Catálogo local de estados/municípios
+from utils.planner import plan_region, native_resolution  # Escala de redução conforme a área da ROI
+from utils.maps import MAP_MODES, prepare_map, render_map, render_thumbnail  # Mapas com cache de tiles (interativo ou PNG)
+from utils.session import get_session, get_analysis, set_analysis, debug_sidebar  # Sessão do Earth Engine e resultados da análise
+from utils.instrumentation import start_page, stage, start_first_chart_clock, chart_rendered  # Etapas instrumentadas (spinner + tempos e chamadas ao EE)
+from utils.charts import show_chart, downsample, raster_figure  # Gráficos com redução de pontos e métricas de renderização
+from utils.cube import pixel_stats, annual_anomaly  # Estatísticas locais do cubo de pixels
+from utils.progressive import ProgressiveRun  # Etapas independentes em paralelo, exibidas assim que ficam prontas
+from utils.vizstats import viz_params, describe_stretch  # Escala de cores dos mapas (uma chamada, com cache)
+from utils.datasets import get_dataset  # Registro dos conjuntos de dados (ID, banda, conversão, paleta...)
+from utils.series import dataset_collection  # Coleção do período (mapas anuais)
+from utils.engine import ANALYSIS_MODES, dataset_series, dataset_climatology, dataset_cube, annual_image, annual_viz_stats  # Motor de séries compartilhado pelas páginas
+
+# Conjunto de dados da página (ver utils/datasets.py)
+DATASET = get_dataset("temperatura")
 
 #%%
 # Configuração da página
 st.set_page_config(layout="wide")
+start_page("temperatura")  # Identifica a página nos registros de instrumentação
 
 # Definindo o ícone da página
 st.title("Monitoramento Climático e Agrícola 🌍")
@@ -38,41 +49,18 @@ A temperatura média é um dos principais indicadores climáticos, fundamental p
 """)
 
 
-# Inicializar Google Earth Engine
-# Autenticação do Google Earth Engine para deploy (conta de serviço)
-if "GEE_CREDENTIALS_JSON" in st.secrets:
-    credentials = ee.ServiceAccountCredentials(
-        json.loads(st.secrets["GEE_CREDENTIALS_JSON"])["client_email"],
-        key_data=st.secrets["GEE_CREDENTIALS_JSON"]
-    )
-    ee.Initialize(credentials)
-else:
-    # Fallback para autenticação local (útil para desenvolvimento local)
-    try:
-        ee.Initialize()
-    except Exception as e:
-        ee.Authenticate()
-        ee.Initialize()
-
-# Inicializa um mapa apenas para garantir autenticação do Earth Engine
-auth_map = geemap.Map()
-
-# Carregar os assets do usuário no GEE
-ESTADOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_UF_2023"
-MUNICIPIOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_Municipios_2023"
-
-# Função para obter a lista de estados
+# Backend do Google Earth Engine (ou o substituto local), inicializado uma única vez por processo
+backend = get_session()
+
+# Função para obter a lista de estados (catálogo local, ver utils/catalog.py)
+@st.cache_data(ttl="1d", max_entries=1)
 def get_estados():
-    estados = ee.FeatureCollection(ESTADOS_ASSET)
-    lista_estados = estados.aggregate_array("NM_UF").getInfo()
-    return sorted(lista_estados)
+    return get_states(backend)
 
 # Função para obter municípios com base no estado selecionado
+@st.cache_data(ttl="1d", max_entries=27)
 def get_municipios(estado):
-    municipios = ee.FeatureCollection(MUNICIPIOS_ASSET)
-    municipios_estado = municipios.filter(ee.Filter.eq("NM_UF", estado))
-    lista_municipios = municipios_estado.aggregate_array("NM_MUN").getInfo()
-    return sorted(lista_municipios)
+    return get_municipalities(backend, estado)
 
 # Sidebar para seleção de estado e município
 st.sidebar.header("Seleção de Região")
@@ -91,6 +79,12 @@ if estado_selecionado:
 st.sidebar.header("Seleção de Período")
 start_date = st.sidebar.date_input("📅 Data inicial", datetime(2010, 1, 1))
 end_date   = st.sidebar.date_input("📅 Data final", datetime(2020, 12, 31))
+# Exibição dos mapas: interativo (ROI + mapa anual), interativo leve (um único mapa) ou imagem estática
+map_mode = MAP_MODES[st.sidebar.selectbox("🗺️ Exibição dos mapas", list(MAP_MODES))]
+# Modo de análise: completa ou apenas a climatologia mensal (12 linhas, uma única requisição)
+analysis_mode = ANALYSIS_MODES[st.sidebar.selectbox("📊 Análise", list(ANALYSIS_MODES))]
+# Renderização progressiva: série e mapas calculados ao mesmo tempo, cada um exibido assim que fica pronto
+progressive = st.sidebar.toggle("⚡ Renderização progressiva", value=True)
 run_analysis = st.sidebar.button("Executar Análise")
 
 
@@ -105,151 +99,240 @@ if not municipio_selecionado:
     st.error("Selecione um município para prosseguir.")
     st.stop()
 
+# Parâmetros da análise: os resultados ficam na sessão enquanto eles não mudarem
+analysis_params = (estado_selecionado, municipio_selecionado, start_date, end_date, analysis_mode)
+
 if run_analysis:
+    # Tempo até o primeiro mapa ou gráfico (ver utils/instrumentation.py)
+    start_first_chart_clock("progressive" if progressive else "sequential")
+
     # Definir a ROI como a geometria do município selecionado
-    with st.spinner("Carregando geometria do município..."):
-        roi_fc = ee.FeatureCollection(MUNICIPIOS_ASSET) \
-                    .filter(ee.Filter.eq("NM_UF", estado_selecionado)) \
-                    .filter(ee.Filter.eq("NM_MUN", municipio_selecionado))
-        roi = roi_fc.geometry()
-
-    # Visualização da Região de Interesse
-    with st.spinner("Renderizando mapa da região de interesse..."):
-        m = geemap.Map(height=600)
-        m.centerObject(roi, 8)
-        m.setOptions("HYBRID")
-        m.addLayer(roi, {}, "Região de Interesse")
-        m.to_streamlit()
+    with stage("Carregando geometria do município..."):
+        # Escala, simplificação e tileScale/bestEffort conforme a área do município
+        plan = plan_region(backend, estado_selecionado, municipio_selecionado, native_resolution(DATASET))
+        roi_fc, roi = get_region(backend, estado_selecionado, municipio_selecionado, tolerance=plan.tolerance)
+
+    # Climatologia mensal: média, desvio-padrão e número de anos por mês do calendário, agrupados
+    # no servidor (ou a partir do armazenamento pré-calculado); nada de séries, mapas ou estatísticas
+    if analysis_mode == "climatology":
+        with stage("Calculando climatologia mensal de temperatura..."):
+            climatology = dataset_climatology(DATASET, estado_selecionado, municipio_selecionado, roi,
+                                              start_date, end_date, plan, backend=backend)
+        set_analysis("temperatura", analysis_params, plan=plan, roi=roi, climatology=climatology)
+    # Cubo local: os pixels mensais da ROI são baixados uma única vez; série, mapas anuais, escala de
+    # cores, climatologia e anomalias são calculados localmente com NumPy (ver utils/cube.py)
+    elif analysis_mode == "cube":
+        with stage("Baixando os pixels mensais da região..."):
+            cube = dataset_cube(DATASET, estado_selecionado, municipio_selecionado, roi, start_date, end_date,
+                                plan, backend=backend)
+        set_analysis("temperatura", analysis_params, plan=plan, roi=roi, collection=cube.series.collection,
+                     series=cube.series, cube=cube)
+    else:
+        # Coleção do período para os mapas anuais (objeto lazy, nenhuma chamada ao EE)
+        collection = dataset_collection(DATASET, start_date, end_date, roi, backend)
+
+        # Séries mensal e anual: armazenamento pré-calculado (nenhuma chamada ao EE) ou, se o período não
+        # estiver coberto, cache local + uma chamada ao EE para os meses ausentes (ver utils/engine.py)
+        # No modo progressivo, a série é calculada junto com os mapas, mais abaixo
+        series = None
+        if not progressive:
+            with stage("Calculando série mensal de temperatura..."):
+                series = dataset_series(DATASET, estado_selecionado, municipio_selecionado, roi, start_date,
+                                        end_date, plan, backend=backend)
+
+        set_analysis("temperatura", analysis_params, plan=plan, roi=roi, collection=collection, series=series)
+
+# Resultados da análise (recém-calculados ou de um rerun anterior, ex.: troca do ano do mapa)
+analysis = get_analysis("temperatura", analysis_params)
+debug_sidebar()
+
+if analysis and "climatology" in analysis:
+    # Plotly só é importado quando há gráficos a exibir (partida mais rápida)
+    import plotly.express as px
+    climatology = analysis["climatology"]
+    st.header("Temperatura Média Mensal")
+    fig_climatology = px.line(climatology.table, x="month", y="temp", error_y="std",
+                              labels={"month": "Mês", "temp": "Temperatura Média (°C)", "std": "Desvio-padrão"},
+                              title=f"Temperatura Média Mensal ({start_date.year}–{end_date.year}, ± desvio-padrão)")
+    show_chart(fig_climatology)
+    st.caption(climatology.caption)
+    st.dataframe(climatology.table.rename(columns={"count": "anos"}), use_container_width=True)
+    chart_rendered()
+    st.stop()
+
+if analysis:
+    plan, roi, collection = analysis["plan"], analysis["roi"], analysis["collection"]
 
     # Extraindo os anos do período selecionado
     start_year = start_date.year
     end_year = end_date.year
     years = list(range(start_year, end_year + 1))
-    months = list(range(1, 13))
-
-    # Carregar o conjunto de dados MODIS MOD11A2 (Temperatura)
-    with st.spinner("Carregando dados de temperatura..."):
-        modis_temp = ee.ImageCollection("MODIS/006/MOD11A2") \
-            .select("LST_Day_1km") \
-            .filterDate(start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")) \
-            .filterBounds(roi)
-        modis_temp_celsius = modis_temp.map(lambda img: img.multiply(0.02).subtract(273.15).copyProperties(img, img.propertyNames()))
 
     # Cálculo da temperatura média anual
-    with st.spinner("Calculando temperatura média anual..."):
-        def calc_annual_temp(year):
-            year = ee.Number(year)
-            start = ee.Date.fromYMD(year, 1, 1)
-            end = ee.Date.fromYMD(year, 12, 31)
-            temp_mean = modis_temp_celsius.filterDate(start, end).mean().clip(roi)
-            return temp_mean.set('year', year).set('system:time_start', start.millis())
-        annual_temp_ic = ee.ImageCollection(ee.List(years).map(calc_annual_temp))
-
-    # Seleção de ano para visualização no mapa
-    year_for_temp_map = st.selectbox("Selecione o ano para o mapa de temperatura", years)
-    annual_temp_img = ee.Image(annual_temp_ic.filter(ee.Filter.eq('year', year_for_temp_map)).first())
-
-    # Ajuste automático do histograma para temperatura
-    def get_temp_viz_params(image):
-        stats = image.reduceRegion(
-            reducer=ee.Reducer.minMax(),
-            geometry=roi,
-            scale=1000,
-            maxPixels=1e9
-        )
-        min_val = stats.get("LST_Day_1km_min").getInfo()
-        max_val = stats.get("LST_Day_1km_max").getInfo()
-        return {"min": min_val, "max": max_val, "palette": ['#313695', '#4575b4', '#74add1', '#abd9e9', '#e0f3f8', '#ffffbf', '#fee090', '#fdae61', '#f46d43', '#d73027', '#a50026']}
-
-    # Renderizar o mapa de temperatura
-    with st.spinner("Renderizando mapa de temperatura..."):
-        viz_params_temp = get_temp_viz_params(annual_temp_img)
-        m_temp = geemap.Map()
-        m_temp.centerObject(roi, 8)
-        m_temp.addLayer(annual_temp_img, viz_params_temp, f"Temperatura Média Anual {year_for_temp_map}")
-        st.write("### Mapa de Temperatura Média Anual")
-        m_temp.to_streamlit(height=500)
-
-    # Geração dos gráficos com Plotly
-    st.header("Análise Gráfica da Temperatura Média")
-
-    def get_region_mean(image, band, scale=1000):
-        stat = image.reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=roi,
-            scale=scale,
-            maxPixels=1e9
-        )
-        return stat.get(band)
-
-    # Gráfico anual
-    with st.spinner("Gerando gráfico anual..."):
-        annual_temp_data = []
-        for y in years:
-            img = ee.Image(annual_temp_ic.filter(ee.Filter.eq('year', y)).first())
-            mean_val = get_region_mean(img, "LST_Day_1km")
-            mean_val = ee.Number(mean_val).getInfo() if mean_val else None
-            annual_temp_data.append({"year": y, "temp": mean_val})
-        df_annual_temp = pd.DataFrame(annual_temp_data)
-        fig_annual_temp = px.line(
-            df_annual_temp, x="year", y="temp",
-            labels={"year": "Ano", "temp": "Temperatura Média (°C)"},
-            title="Temperatura Média Anual",
-            line_shape="linear"
-        )
-        fig_annual_temp.update_traces(line_color="#ff8800", line_width=3, marker_color="#ff8800")
-        st.plotly_chart(fig_annual_temp, use_container_width=True)
-
-    # Gráfico mensal
-    with st.spinner("Gerando gráfico mensal..."):
-        monthly_temp_data = []
-        for y in years:
-            for m in months:
-                start = ee.Date.fromYMD(y, m, 1)
-                end = start.advance(1, 'month')
-                img = modis_temp_celsius.filterDate(start, end).mean().clip(roi)
-                mean_val = get_region_mean(img, "LST_Day_1km")
-                mean_val = ee.Number(mean_val).getInfo() if mean_val else None
-                monthly_temp_data.append({"year": y, "month": m, "temp": mean_val})
-        df_monthly_temp = pd.DataFrame(monthly_temp_data)
-        df_monthly_temp_avg = df_monthly_temp.groupby("month").mean().reset_index()
-        fig_monthly_temp = px.line(
-            df_monthly_temp_avg, x="month", y="temp",
-            labels={"month": "Mês", "temp": "Temperatura Média (°C)"},
-            title="Temperatura Média Mensal",
-            line_shape="linear"
-        )
-        fig_monthly_temp.update_traces(line_color="#ff8800", line_width=3, marker_color="#ff8800")
-        st.plotly_chart(fig_monthly_temp, use_container_width=True)
-
-    # Série temporal mensal com média móvel de 3 meses
-    with st.spinner("Gerando série temporal mensal..."):
-        df_monthly_temp['date'] = pd.to_datetime(df_monthly_temp['year'].astype(str) + '-' + df_monthly_temp['month'].astype(str) + '-15')
-        df_monthly_temp = df_monthly_temp.sort_values('date')
-        df_monthly_temp['temp_rolling'] = df_monthly_temp['temp'].rolling(window=3, center=True).mean()
-        fig_ts_temp = px.line(
-            df_monthly_temp, x='date', y='temp',
-            labels={'date': 'Data', 'temp': 'Temperatura Média (°C)'},
-            title='Série Temporal Mensal da Temperatura'
-        )
-        fig_ts_temp.add_scatter(
-            x=df_monthly_temp['date'], y=df_monthly_temp['temp_rolling'],
-            mode='lines', name='Média Móvel (3 meses)',
-            line=dict(color='#ff8800', width=3, dash='dash')
-        )
-        fig_ts_temp.update_traces(line_color="#ffbb33", selector=dict(mode='lines'))
-        st.plotly_chart(fig_ts_temp, use_container_width=True)
-
-    # Estatísticas descritivas da temperatura anual
-    with st.spinner("Calculando estatísticas descritivas..."):
-        st.subheader("Estatísticas Descritivas da Temperatura Média Anual")
-        st.dataframe(df_annual_temp.describe().transpose(), use_container_width=True)
-        max_row = df_annual_temp.loc[df_annual_temp['temp'].idxmax()]
-        min_row = df_annual_temp.loc[df_annual_temp['temp'].idxmin()]
-        st.markdown(f"**Ano mais quente:** {int(max_row['year'])} ({max_row['temp']:.2f} °C)")
-        st.markdown(f"**Ano mais frio:** {int(min_row['year'])} ({min_row['temp']:.2f} °C)")
-        fig_box_temp = px.box(
-            df_annual_temp, y="temp", points="all", title="Distribuição da Temperatura Média Anual",
-            color_discrete_sequence=["#ff8800"]
-        )
-        st.plotly_chart(fig_box_temp, use_container_width=True)
\ No newline at end of file
+    def calc_annual_temp(year):
+        return annual_image(DATASET, collection, year, roi, backend=backend)
+
+    # Ajuste automático do histograma para temperatura: mínimo, máximo e percentis em uma única
+    # chamada, memorizados por conjunto de dados, ano (trecho coberto pelo período), região e escala
+    def get_annual_temp_stats(year, image):
+        return annual_viz_stats(DATASET, image, year, start_date, end_date, estado_selecionado,
+                                municipio_selecionado, roi, plan, backend=backend)
+
+    # Camada do mapa de temperatura e as estatísticas da escala de cores
+    def annual_temp_layers(year):
+        annual_temp_img = calc_annual_temp(year)
+        stats_temp = get_annual_temp_stats(year, annual_temp_img)
+        viz_params_temp = viz_params(stats_temp, DATASET.palette)
+        return [(annual_temp_img, viz_params_temp, f"Temperatura Média Anual {year}")], stats_temp
+
+    # Visualização da Região de Interesse (nos modos leve e estático, o contorno vai no mapa anual)
+    def roi_map():
+        with stage("Renderizando mapa da região de interesse..."):
+            render_map(backend, roi, height=600, basemap="HYBRID")
+        chart_rendered()
+
+    # Mapa de temperatura: a troca do ano reexecuta apenas este fragmento
+    @st.fragment
+    def annual_temp_map():
+        # Seleção de ano para visualização no mapa
+        year_for_temp_map = st.selectbox("Selecione o ano para o mapa de temperatura", years)
+        with stage("Renderizando mapa de temperatura..."):
+            layers, stats_temp = annual_temp_layers(year_for_temp_map)
+            st.write("### Mapa de Temperatura Média Anual")
+            if map_mode == "static":
+                render_thumbnail(backend, roi, layers, caption=f"Temperatura Média Anual {year_for_temp_map}")
+            else:
+                render_map(backend, roi, layers, height=500, basemap="HYBRID" if map_mode == "light" else None)
+            st.caption(describe_stretch(stats_temp, DATASET.unit))
+        chart_rendered()
+
+    # Cubo local: mapa anual, anomalia e climatologia a partir dos pixels já baixados (sem chamadas ao EE)
+    @st.fragment
+    def cube_maps(result):
+        st.header("Mapa de Temperatura Média Anual (cubo local)")
+        if not result.years:
+            st.warning("Nenhum pixel válido na região no período selecionado: os mapas anuais não foram gerados.")
+        else:
+            year_for_map = st.selectbox("Selecione o ano para o mapa de temperatura", result.years)
+            with stage("Calculando mapas a partir do cubo local..."):
+                annual = result.annual_images[result.years.index(year_for_map)]
+                stats = pixel_stats(annual)
+                if stats["min"] is None:
+                    st.warning(f"Nenhum pixel válido na região em {year_for_map}: o mapa anual não foi gerado.")
+                else:
+                    vis = viz_params(stats, DATASET.palette)
+                    show_chart(raster_figure(result.cube, annual, vis["palette"], vis["min"], vis["max"],
+                                             title=f"Temperatura Média Anual {year_for_map}", label="Temperatura Média (°C)"))
+                    st.caption(describe_stretch(stats, DATASET.unit))
+                    anomaly = annual_anomaly(result.years, result.annual_images, year_for_map)
+                    show_chart(raster_figure(result.cube, anomaly, "RdBu_r", symmetric=True,
+                                             title=f"Anomalia de Temperatura {year_for_map} (em relação à média de {result.years[0]}–{result.years[-1]})",
+                                             label="Anomalia (°C)"))
+            chart_rendered()
+        st.subheader("Climatologia Mensal (cubo local)")
+        st.dataframe(result.climatology.rename(columns={"count": "anos"}), use_container_width=True)
+
+    # Gráficos e estatísticas da série mensal
+    def series_charts(series):
+        df_monthly_temp = series.monthly.copy()
+        plan_caption = series.caption
+
+        # Geração dos gráficos com Plotly
+        # Plotly só é importado quando há gráficos a exibir (partida mais rápida)
+        import plotly.express as px
+        st.header("Análise Gráfica da Temperatura Média")
+
+        # Gráfico anual (média ponderada pelo número de dias de cada mês)
+        with stage("Gerando gráfico anual..."):
+            df_annual_temp = series.annual
+            fig_annual_temp = px.line(
+                df_annual_temp, x="year", y="temp",
+                labels={"year": "Ano", "temp": "Temperatura Média (°C)"},
+                title="Temperatura Média Anual",
+                line_shape="linear"
+            )
+            fig_annual_temp.update_traces(line_color="#ff8800", line_width=3, marker_color="#ff8800")
+            show_chart(fig_annual_temp)
+            st.caption(plan_caption)
+        chart_rendered()
+
+        # Gráfico mensal
+        with stage("Gerando gráfico mensal..."):
+            df_monthly_temp_avg = df_monthly_temp.groupby("month").mean().reset_index()
+            fig_monthly_temp = px.line(
+                df_monthly_temp_avg, x="month", y="temp",
+                labels={"month": "Mês", "temp": "Temperatura Média (°C)"},
+                title="Temperatura Média Mensal",
+                line_shape="linear"
+            )
+            fig_monthly_temp.update_traces(line_color="#ff8800", line_width=3, marker_color="#ff8800")
+            show_chart(fig_monthly_temp)
+            st.caption(plan_caption)
+
+        # Série temporal mensal com média móvel de 3 meses
+        with stage("Gerando série temporal mensal..."):
+            df_monthly_temp['date'] = pd.to_datetime(df_monthly_temp['year'].astype(str) + '-' + df_monthly_temp['month'].astype(str) + '-15')
+            df_monthly_temp = df_monthly_temp.sort_values('date')
+            df_monthly_temp['temp_rolling'] = df_monthly_temp['temp'].rolling(window=3, center=True).mean()
+            # Séries longas: cerca de um ponto por pixel do gráfico (ver utils/charts.py)
+            sample = downsample(df_monthly_temp, 'date', ['temp'])
+            df_plot_temp = sample.frame
+            fig_ts_temp = px.line(
+                df_plot_temp, x='date', y='temp',
+                labels={'date': 'Data', 'temp': 'Temperatura Média (°C)'},
+                title='Série Temporal Mensal da Temperatura'
+            )
+            fig_ts_temp.add_scatter(
+                x=df_plot_temp['date'], y=df_plot_temp['temp_rolling'],
+                mode='lines', name='Média Móvel (3 meses)',
+                line=dict(color='#ff8800', width=3, dash='dash')
+            )
+            fig_ts_temp.update_traces(line_color="#ffbb33", selector=dict(mode='lines'))
+            show_chart(fig_ts_temp, sample)
+            st.caption(plan_caption)
+
+        # Estatísticas descritivas da temperatura anual
+        with stage("Calculando estatísticas descritivas..."):
+            st.subheader("Estatísticas Descritivas da Temperatura Média Anual")
+            st.dataframe(df_annual_temp.describe().transpose(), use_container_width=True)
+            # Sem nenhum valor anual (ex.: cubo local sem pixels válidos), não há ano mais quente/frio
+            if df_annual_temp['temp'].notna().any():
+                max_row = df_annual_temp.loc[df_annual_temp['temp'].idxmax()]
+                min_row = df_annual_temp.loc[df_annual_temp['temp'].idxmin()]
+                st.markdown(f"**Ano mais quente:** {int(max_row['year'])} ({max_row['temp']:.2f} °C)")
+                st.markdown(f"**Ano mais frio:** {int(min_row['year'])} ({min_row['temp']:.2f} °C)")
+            fig_box_temp = px.box(
+                df_annual_temp, y="temp", points="all", title="Distribuição da Temperatura Média Anual",
+                color_discrete_sequence=["#ff8800"]
+            )
+            show_chart(fig_box_temp)
+            st.caption(plan_caption)
+    if analysis.get("cube") is not None:
+        cube_maps(analysis["cube"])
+        series_charts(analysis["series"])
+    elif analysis["series"] is not None:
+        if map_mode == "interactive":
+            roi_map()
+        annual_temp_map()
+        series_charts(analysis["series"])
+    else:
+        # Modo progressivo: série mensal, mapa da ROI e mapa de temperatura (estatísticas e tiles do
+        # primeiro ano) são calculados ao mesmo tempo; cada um é exibido no seu espaço assim que fica pronto
+        run = ProgressiveRun()
+        run.submit("Série mensal", dataset_series, DATASET, estado_selecionado, municipio_selecionado, roi,
+                   start_date, end_date, plan, backend=backend)
+        if map_mode == "interactive":
+            run.submit("Mapa da região de interesse", prepare_map, backend, roi)
+        run.submit("Mapa anual", lambda: prepare_map(backend, roi, annual_temp_layers(years[0])[0],
+                                                     static=map_mode == "static"))
+
+        slots = {name: st.empty() for name in ("Mapa da região de interesse", "Mapa anual", "Série mensal")}
+        for name, result in run.as_completed():
+            with slots[name].container():
+                if name == "Mapa da região de interesse":
+                    roi_map()
+                elif name == "Mapa anual":
+                    annual_temp_map()
+                else:
+                    analysis["series"] = result
+                    series_charts(result)
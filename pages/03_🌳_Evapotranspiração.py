@@ -1,17 +1,20 @@
-import geemap               # Ferramentas para integração com o Google Earth Engine e mapas interativos
-import ee                   # Biblioteca oficial do Google Earth Engine para Python (processamento de dados geoespaciais)
-import geemap.foliumap as geemap  # Versão do geemap baseada no folium, usada para renderizar mapas no Streamlit
-from datetime import datetime       # Utilizado para manipular datas (seleção do período de análise)
+from datetime import datetime  # Utilizado para manipular datas (seleção do período de análise)
 import streamlit as st              # Framework principal do app (interface web interativa)
 import pandas as pd          # Manipulação de tabelas e dataframes            
-import plotly.graph_objects as go  # Usado para gráficos avançados (ex: série temporal, indicadores)
-import plotly.express as px  # Gráficos simples e rápidos)
-import json                 # Manipulação de arquivos JSON (ex: credenciais do GEE)
+from utils.catalog import get_states, get_municipalities, get_region  # Catálogo local de estados/municípios
+from utils.planner import plan_region, native_resolution  # Escala de redução conforme a área da ROI
+from utils.maps import MAP_MODES, render_map, render_thumbnail  # Mapas com cache de tiles (interativo ou PNG)
+from utils.session import get_session, debug_enabled, debug_sidebar  # Sessão do Earth Engine (inicializada uma vez por processo)
+from utils.instrumentation import start_page, stage, start_first_chart_clock, chart_rendered  # Etapas instrumentadas (spinner + tempos e chamadas ao EE)
+from utils.charts import show_chart, downsample, paginated_dataframe  # Gráficos com redução de pontos e tabelas paginadas
+from utils.progressive import ProgressiveRun  # Etapas independentes em paralelo, exibidas assim que ficam prontas
+from utils.engine import water_balance_series  # Motor de séries compartilhado pelas páginas
 
 
 #%%
 # Configuração da página
 st.set_page_config(layout="wide")
+start_page("evapotranspiracao")  # Identifica a página nos registros de instrumentação
 
 # Definindo o ícone da página
 st.title("Monitoramento Climático e Agrícola 🌍")
@@ -41,41 +44,18 @@ O balanço hídrico (precipitação menos evapotranspiração) indica períodos
 """)
 
 
-# Inicializar Google Earth Engine
-# Autenticação do Google Earth Engine para deploy (conta de serviço)
-if "GEE_CREDENTIALS_JSON" in st.secrets:
-    credentials = ee.ServiceAccountCredentials(
-        json.loads(st.secrets["GEE_CREDENTIALS_JSON"])["client_email"],
-        key_data=st.secrets["GEE_CREDENTIALS_JSON"]
-    )
-    ee.Initialize(credentials)
-else:
-    # Fallback para autenticação local (útil para desenvolvimento local)
-    try:
-        ee.Initialize()
-    except Exception as e:
-        ee.Authenticate()
-        ee.Initialize()
-
-# Inicializa um mapa apenas para garantir autenticação do Earth Engine
-auth_map = geemap.Map()
-
-# Carregar os assets do usuário no GEE
-ESTADOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_UF_2023"
-MUNICIPIOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_Municipios_2023"
-
-# Função para obter a lista de estados
+# Backend do Google Earth Engine (ou o substituto local), inicializado uma única vez por processo
+backend = get_session()
+
+# Função para obter a lista de estados (catálogo local, ver utils/catalog.py)
+@st.cache_data(ttl="1d", max_entries=1)
 def get_estados():
-    estados = ee.FeatureCollection(ESTADOS_ASSET)
-    lista_estados = estados.aggregate_array("NM_UF").getInfo()
-    return sorted(lista_estados)
+    return get_states(backend)
 
 # Função para obter municípios com base no estado selecionado
+@st.cache_data(ttl="1d", max_entries=27)
 def get_municipios(estado):
-    municipios = ee.FeatureCollection(MUNICIPIOS_ASSET)
-    municipios_estado = municipios.filter(ee.Filter.eq("NM_UF", estado))
-    lista_municipios = municipios_estado.aggregate_array("NM_MUN").getInfo()
-    return sorted(lista_municipios)
+    return get_municipalities(backend, estado)
 
 # Sidebar para seleção de estado e município
 st.sidebar.header("Seleção de Região")
@@ -94,6 +74,10 @@ if estado_selecionado:
 st.sidebar.header("Seleção de Período")
 start_date = st.sidebar.date_input("📅 Data inicial", datetime(2010, 1, 1))
 end_date   = st.sidebar.date_input("📅 Data final", datetime(2020, 12, 31))
+# Exibição dos mapas: interativo (ROI + mapa anual), interativo leve (um único mapa) ou imagem estática
+map_mode = MAP_MODES[st.sidebar.selectbox("🗺️ Exibição dos mapas", list(MAP_MODES))]
+# Renderização progressiva: a série de P e ET é calculada enquanto o mapa da ROI é exibido
+progressive = st.sidebar.toggle("⚡ Renderização progressiva", value=True)
 run_analysis = st.sidebar.button("Executar Análise")
 
 # Verifica se a data inicial é anterior à data final
@@ -107,29 +91,35 @@ if not municipio_selecionado:
     st.stop()
 
 if run_analysis:
+    # Tempo até o primeiro mapa ou gráfico (ver utils/instrumentation.py)
+    start_first_chart_clock("progressive" if progressive else "sequential")
 
     # Definir a ROI como a geometria do município selecionado
-    with st.spinner("Carregando geometria do município..."):
-        roi_fc = ee.FeatureCollection(MUNICIPIOS_ASSET) \
-                    .filter(ee.Filter.eq("NM_UF", estado_selecionado)) \
-                    .filter(ee.Filter.eq("NM_MUN", municipio_selecionado))
-        roi = roi_fc.geometry()
-
+    with stage("Carregando geometria do município..."):
+        # Escala, simplificação e tileScale/bestEffort conforme a área do município
+        plan = plan_region(backend, estado_selecionado, municipio_selecionado,
+                           native_resolution("precipitacao_pentadal", "evapotranspiracao"))
+        roi_fc, roi = get_region(backend, estado_selecionado, municipio_selecionado, tolerance=plan.tolerance)
+
+    # Modo progressivo: a série mensal começa a ser calculada antes do mapa da ROI
+    run = None
+    if progressive and end_date.year > start_date.year:
+        run = ProgressiveRun()
+        run.submit("Série mensal de P e ET", water_balance_series, estado_selecionado, municipio_selecionado, roi,
+                   start_date.year, end_date.year, plan, backend=backend)
 
 # ====================================================
 # Visuazalização da Região de Interesse (ROI) no mapa
 # ====================================================
 
-    with st.spinner("Renderizando mapa da região de interesse..."):
-
-        # Cria o mapa GEEMAP com a ROI
-        m = geemap.Map(height=600)
-        m.centerObject(roi, 8)
-        m.setOptions("HYBRID")
-        m.addLayer(roi, {}, "Região de Interesse")
+    with stage("Renderizando mapa da região de interesse..."):
 
-        # Renderiza o mapa no Streamlit
-        m.to_streamlit()
+        # Cria e renderiza no Streamlit o mapa com a ROI (tiles em cache, ver utils/maps.py)
+        if map_mode == "static":
+            render_thumbnail(backend, roi, [], caption="Região de Interesse")
+        else:
+            render_map(backend, roi, height=600, basemap="HYBRID")
+    chart_rendered()
 
 
 # Só executa as análises após clicar no botão
@@ -138,117 +128,37 @@ if run_analysis and roi is not None:
     # Extraindo os anos do período selecionado
     start_year = start_date.year
     end_year = end_date.year
-    years = list(range(start_year, end_year + 1))
-    months = list(range(1, 13))
-
-
-    with st.spinner("Carregando dados de precipitação e evapotranspiração..."):
-    ## Abrindo nossos dados
-        chirps = ee.ImageCollection("UCSB-CHG/CHIRPS/PENTAD").select('precipitation')
-
-        # Definindo a função de escala
-        def scale_mod16(image):
-            return image.multiply(0.1).copyProperties(image, image.propertyNames())
-
-        mod16 = ee.ImageCollection("MODIS/061/MOD16A2GF").map(scale_mod16 ).select('ET')
-
-    
-    # Filtrando a coleção de precipitação e evapotranspiração para o período selecionado
-    with st.spinner("Processando séries temporais mensais..."):
-        # Definição de período
-        year_start = start_date.year
-        year_end = end_date.year
-
-        # Parâmetros para padronização temporal
-        startDate = ee.Date.fromYMD(year_start, 1, 1)
-        endDate = ee.Date.fromYMD(year_end, 1, 1)  # Avança o ano inicial mais x
-
-        # Filtrar a coleção a partir do período definido
-        yearFiltered = chirps.filter(ee.Filter.date(startDate, endDate)).filterBounds(roi)
-        # print('Numero de imagens',yearFiltered.size().getInfo())
-
-        # Lista de meses e anos
-        months = ee.List.sequence(1, 12)
-        years = ee.List.sequence(year_start, (year_end - 1))
-
-        # Função para criar imagens mensais
-        def createYearly(year):
-
-            def createMonthlyImage(month):
-                return yearFiltered \
-                    .filter(ee.Filter.calendarRange(year, year, 'year')) \
-                    .filter(ee.Filter.calendarRange(month, month, 'month')) \
-                    .sum() \
-                    .clip(roi) \
-                    .set('year', year) \
-                    .set('month', month) \
-                    .set('data', ee.Date.fromYMD(year, month, 1).format()) \
-                    .set('system:time_start', ee.Date.fromYMD(year, month, 1))
-
-            return months.map(createMonthlyImage)
-
-        # Aplicar função mês/ano nas coleções
-        chirps_monthlyImages = ee.ImageCollection.fromImages(years.map(createYearly).flatten())
-        yearFiltered = mod16.filter(ee.Filter.date(startDate, endDate)).filterBounds(roi)
-        mod16_monthlyImages = ee.ImageCollection.fromImages(years.map(createYearly).flatten())
-
-        # Verificar número de bandas
-        def addNumBands(image):
-            num_bands = image.bandNames().size()
-            return image.set('nbands', num_bands)
-
-        # Aplica a função e filtra imagens com bandas válidas
-        mod16_monthlyImages = mod16_monthlyImages.map(addNumBands).filter(ee.Filter.gt('nbands', 0))
-        chirps_monthlyImages = chirps_monthlyImages.map(addNumBands).filter(ee.Filter.gt('nbands', 0))
-
-        ## Cálculo do Balanço Hídrico
-        def calculateWaterBalance(image):
-            P = image.select('precipitation')
-            ET = image.select('ET')
-            waterBalance = P.subtract(ET)
-            return image.addBands([waterBalance.rename('water_balance')])
-
-        # Adicionar bandas de precipitação e evapotranspiração às imagens CHIRPS
-        def addETBands(image):
-            ET_image = mod16_monthlyImages \
-                .filter(ee.Filter.eq('year', image.get('year'))) \
-                .filter(ee.Filter.eq('month', image.get('month'))) \
-                .first()
-            return image.addBands([ET_image.rename('ET')])
-
-        # Aplica as funções
-        waterBalanceWithBands = chirps_monthlyImages.map(addETBands)
-        waterBalanceResult = waterBalanceWithBands.map(calculateWaterBalance)
-
-        ## Função para extrair estatísticas das imagens
-        def stats(image):
-            reduce = image.reduceRegions(**{
-                'collection': roi,
-                'reducer': ee.Reducer.mean(),
-                'scale': 5000
-            })
-
-            reduce = reduce \
-                .map(lambda f: f.set({'data': image.get('data')})) \
-                .map(lambda f: f.set({'year': image.get('year')})) \
-                .map(lambda f: f.set({'month': image.get('month')}))
-
-            return reduce.copyProperties(image, image.propertyNames())
-
-        # Converter para df
-        col_bands = waterBalanceResult  # .select(bands)
-
-        # Aplicar estatísticas
-        stats_reduce = col_bands.map(stats) \
-            .flatten() \
-            .sort('data', True)
-    
 
-        df = geemap.ee_to_df(stats_reduce)
+    # O balanço hídrico usa anos completos, de start_date.year até end_date.year - 1
+    if end_year <= start_year:
+        st.error("Para o balanço hídrico, a data final deve estar em um ano posterior ao da data inicial.")
+        st.stop()
+
+    # Série mensal de P, ET e balanço hídrico: armazenamento pré-calculado (nenhuma chamada ao EE)
+    # ou, se o período não estiver coberto, cálculo no Earth Engine (ver utils/engine.py)
+    with stage("Processando séries temporais mensais..."):
+        if run is not None:
+            series = run.result("Série mensal de P e ET")
+        else:
+            series = water_balance_series(estado_selecionado, municipio_selecionado, roi, start_year, end_year,
+                                          plan, backend=backend)
+        df = series.monthly.copy()
+        plan_caption = series.caption
+
+    if debug_enabled() and series.extraction:
+        extraction = series.extraction
+        with st.expander("🔧 Depuração: extração da série mensal"):
+            st.write(f"Resposta: {extraction['bytes'] / 1e3:.1f} kB ({extraction['rows']} meses); "
+                     f"requisição {extraction['request_s']:.2f} s; decodificação {extraction['decode_s'] * 1e3:.1f} ms")
+    debug_sidebar()
+
+    df['data'] = pd.to_datetime(pd.DataFrame({'year': df['year'], 'month': df['month'], 'day': 1}))
     
 
         # ===================== ANÁLISE DE EVAPOTRANSPIRAÇÃO E BALANÇO HÍDRICO =====================
-    with st.spinner("Gerando gráficos e análises..."):
+    with stage("Gerando gráficos e análises..."):
+        # Plotly só é importado quando há gráficos a exibir (partida mais rápida)
+        import plotly.graph_objects as go
         st.subheader("Análise Gráfica da Evapotranspiração e Balanço Hídrico")
 
 
@@ -279,7 +189,8 @@ if run_analysis and roi is not None:
             title='Evapotranspiração e Balanço Hídrico Médios Anuais',
             xaxis_title='Ano', yaxis_title='Valor (mm/mês)'
         )
-        st.plotly_chart(fig_annual, use_container_width=True)
+        show_chart(fig_annual)
+        st.caption(plan_caption)
 
         # ----------- ANÁLISE MENSAL (SAZONALIDADE) -----------
         monthly_data = df.groupby('mes').agg({
@@ -301,34 +212,39 @@ if run_analysis and roi is not None:
             title='Evapotranspiração e Balanço Hídrico Médios Mensais',
             xaxis_title='Mês', yaxis_title='Valor (mm/mês)'
         )
-        st.plotly_chart(fig_monthly, use_container_width=True)
+        show_chart(fig_monthly)
+        st.caption(plan_caption)
 
         # ----------- SÉRIE TEMPORAL COM MÉDIA MÓVEL -----------
         df['ET_rolling'] = df['ET'].rolling(window=3, center=True).mean()
         df['wb_rolling'] = df['water_balance'].rolling(window=3, center=True).mean()
+        # Séries longas: cerca de um ponto por pixel do gráfico, mantendo os pontos de ET e do balanço
+        sample = downsample(df, 'data', ['ET', 'water_balance'])
+        df_plot = sample.frame
 
         fig_ts = go.Figure()
         fig_ts.add_trace(go.Scatter(
-            x=df['data'], y=df['ET'],
+            x=df_plot['data'], y=df_plot['ET'],
             mode='lines', name='ET', line=dict(color='#ff8800', width=2)
         ))
         fig_ts.add_trace(go.Scatter(
-            x=df['data'], y=df['ET_rolling'],
+            x=df_plot['data'], y=df_plot['ET_rolling'],
             mode='lines', name='ET (Média Móvel 3 meses)', line=dict(color='#ffbb33', width=3, dash='dash')
         ))
         fig_ts.add_trace(go.Scatter(
-            x=df['data'], y=df['water_balance'],
+            x=df_plot['data'], y=df_plot['water_balance'],
             mode='lines', name='Balanço Hídrico', line=dict(color='#00bfff', width=2)
         ))
         fig_ts.add_trace(go.Scatter(
-            x=df['data'], y=df['wb_rolling'],
+            x=df_plot['data'], y=df_plot['wb_rolling'],
             mode='lines', name='Balanço Hídrico (Média Móvel 3 meses)', line=dict(color='#005577', width=3, dash='dash')
         ))
         fig_ts.update_layout(
             title='Série Temporal de Evapotranspiração e Balanço Hídrico',
             xaxis_title='Data', yaxis_title='Valor (mm/mês)'
         )
-        st.plotly_chart(fig_ts, use_container_width=True)
+        show_chart(fig_ts, sample)
+        st.caption(plan_caption)
 
         # ----------- ESTATÍSTICAS DESCRITIVAS -----------
         st.subheader("Estatísticas Descritivas")
@@ -339,4 +255,4 @@ if run_analysis and roi is not None:
 
         # ----------- TABELA INTERATIVA -----------
         st.subheader("Tabela de Dados Mensais")
-        st.dataframe(df[['data', 'ET', 'water_balance']], use_container_width=True)
+        paginated_dataframe(df[['data', 'ET', 'water_balance']], key="tabela_mensal_et")
@@ -0,0 +1,164 @@
+#%%
+# Monitoramento Agrometeorológico com Google Earth Engine e Streamlit
+
+from datetime import datetime  # Utilizado para manipular datas (seleção do período de análise)
+import streamlit as st              # Framework principal do app (interface web interativa)
+import pandas as pd          # Manipulação de tabelas e dataframes
+from utils.catalog import get_states, get_municipalities  # Catálogo local de estados/municípios
+from utils.planner import plan_state, native_resolution, describe_plan  # Escala de redução conforme a área dos municípios
+from utils.session import get_session, get_analysis, set_analysis, debug_sidebar  # Sessão do Earth Engine e resultados da análise
+from utils.instrumentation import start_page, stage  # Etapas instrumentadas (spinner + tempos e chamadas ao EE)
+from utils.charts import show_chart, paginated_dataframe  # Gráficos com métricas de renderização e tabelas paginadas
+from utils.series import annual_from_monthly, dataset_collection, month_range  # Coleção do registro e série anual (local)
+from utils.datasets import get_dataset  # Registro dos conjuntos de dados
+from utils.batch import batch_monthly_series, plan_chunks, state_geojson  # Séries de todos os municípios em lote
+from utils.singleflight import coalesce  # Coalescência de cálculos idênticos entre sessões
+
+#%%
+# Configuração da página
+st.set_page_config(layout="wide")
+start_page("lote")  # Identifica a página nos registros de instrumentação
+
+# Definindo o ícone da página
+st.title("Monitoramento Climático e Agrícola 🌍")
+st.sidebar.image('assets/logo_geodata_lab_2.png')
+
+# Adicionando o autor do código na barra lateral
+st.sidebar.markdown('Desenvolvido por [Sandro de Sena](https://www.linkedin.com/in/sandro-sena/)')
+
+# Adicionando a descrição da página
+st.markdown("""
+### Análise Estadual em Lote
+
+Esta página calcula, de uma só vez, as séries mensais de precipitação ou temperatura de todos os municípios de um estado (ou de uma seleção deles), permitindo comparar os municípios lado a lado.
+
+Em vez de uma consulta por município, cada requisição ao Google Earth Engine reduz um bloco de meses sobre um bloco de municípios (reduceRegions), e os blocos são executados em paralelo.
+
+**Fonte dos dados:**
+- Precipitação: CHIRPS — série temporal diária, resolução espacial de 5 km.
+- Temperatura: MODIS MOD11A2 — temperatura da superfície terrestre (dia), resolução espacial de 1 km.
+
+**Análises disponíveis:**
+- Mapa coroplético da média anual por município
+- Tabela longa (município × mês) com download em CSV
+
+---
+""")
+
+# Variáveis disponíveis (conjuntos de dados do registro, ver utils/datasets.py)
+VARIAVEIS = {
+    "Precipitação (mm/ano)": get_dataset("precipitacao"),
+    "Temperatura média (°C)": get_dataset("temperatura"),
+}
+
+#%%
+# Backend do Google Earth Engine (ou o substituto local), inicializado uma única vez por processo
+backend = get_session()
+
+# Função para obter a lista de estados (catálogo local, ver utils/catalog.py)
+@st.cache_data(ttl="1d", max_entries=1)
+def get_estados():
+    return get_states(backend)
+
+# Função para obter municípios com base no estado selecionado
+@st.cache_data(ttl="1d", max_entries=27)
+def get_municipios(estado):
+    return get_municipalities(backend, estado)
+
+# Função para obter as geometrias dos municípios do estado (mapa coroplético; poucos estados em memória)
+@st.cache_data(ttl="1d", max_entries=4)
+def get_geojson(estado):
+    return state_geojson(backend, estado)
+
+# Sidebar para seleção do estado, dos municípios e da variável
+st.sidebar.header("Seleção de Região")
+estados = get_estados()
+estado_selecionado = st.sidebar.selectbox("Escolha o Estado", estados)
+municipios_selecionados = st.sidebar.multiselect(
+    "Municípios (vazio = todos)", get_municipios(estado_selecionado) if estado_selecionado else []
+)
+variavel = st.sidebar.selectbox("Variável", list(VARIAVEIS))
+
+# Adicionar campos de datas iniciais e finais na barra lateral
+st.sidebar.header("Seleção de Período")
+st.sidebar.markdown("Defina o intervalo de datas para a análise.")
+
+start_date = st.sidebar.date_input("📅 Data inicial", datetime(2010, 1, 1))
+end_date   = st.sidebar.date_input("📅 Data final", datetime(2020, 12, 31))
+
+run_analysis = st.sidebar.button("Calcular séries do estado")
+
+if start_date >= end_date:
+    st.error("A data inicial deve ser anterior à data final.")
+    st.stop()
+
+if not estado_selecionado:
+    st.error("Selecione um estado para prosseguir.")
+    st.stop()
+
+dataset = VARIAVEIS[variavel]
+municipios = sorted(municipios_selecionados) or get_municipios(estado_selecionado)
+st.write(f"### Estado Selecionado: {estado_selecionado} ({len(municipios)} municípios)")
+
+# Parâmetros da análise: os resultados ficam na sessão enquanto eles não mudarem
+analysis_params = (estado_selecionado, tuple(municipios_selecionados), variavel, start_date, end_date)
+
+if run_analysis:
+    # Escala conforme a área típica dos municípios (um único plano para todo o lote)
+    plan = plan_state(backend, estado_selecionado, native_resolution(dataset), municipios_selecionados)
+    collection = dataset_collection(dataset, start_date, end_date, backend=backend)
+
+    with stage(f"Calculando séries mensais de {len(municipios)} municípios em lote...", name="Séries mensais em lote"):
+        # Sessões que pedem o mesmo lote ao mesmo tempo compartilham um único cálculo
+        batch_key = ("batch", backend.name, dataset.key, estado_selecionado, tuple(municipios), start_date, end_date,
+                     plan)
+        df_batch = coalesce(batch_key, batch_monthly_series, backend, collection, estado_selecionado,
+                            start_date, end_date, municipalities=municipios_selecionados,
+                            aggregator=dataset.aggregator, scale=plan.scale, value_name=dataset.value_name,
+                            tile_scale=plan.tile_scale)
+
+    set_analysis("lote", analysis_params, plan=plan, df_batch=df_batch)
+
+# Resultados da análise (recém-calculados ou de um rerun anterior)
+analysis = get_analysis("lote", analysis_params)
+debug_sidebar()
+
+if analysis:
+    plan, df_batch = analysis["plan"], analysis["df_batch"]
+    value, unit = dataset.value_name, dataset.unit
+    months = month_range(start_date, end_date)
+    st.caption(f"{len(municipios)} municípios × {len(months)} meses em "
+               f"{len(plan_chunks(municipios, months))} requisições. {describe_plan(plan)}")
+
+    # Média anual do período por município
+    df_annual = pd.concat([
+        annual_from_monthly(group, value, aggregator=dataset.aggregator, weights=dataset.weights).assign(NM_MUN=name)
+        for name, group in df_batch.groupby("NM_MUN")
+    ])
+    df_mean = df_annual.groupby("NM_MUN", as_index=False)[value].mean()
+
+    # Plotly só é importado quando há gráficos a exibir (partida mais rápida)
+    import plotly.express as px
+
+    with stage("Gerando mapa coroplético..."):
+        fig_map = px.choropleth(
+            df_mean, geojson=get_geojson(estado_selecionado), locations="NM_MUN",
+            featureidkey="properties.NM_MUN", color=value, color_continuous_scale=dataset.palette,
+            labels={value: f"{dataset.label} ({unit})", "NM_MUN": "Município"},
+            title=f"{variavel} — média de {start_date.year} a {end_date.year}",
+        )
+        fig_map.update_geos(fitbounds="locations", visible=False)
+        fig_map.update_layout(height=600, margin={"r": 0, "l": 0, "b": 0})
+        show_chart(fig_map)
+
+    # Ranking dos municípios
+    st.subheader("Municípios")
+    st.dataframe(df_mean.sort_values(value, ascending=False).reset_index(drop=True), use_container_width=True)
+
+    # Tabela longa (município × mês) com download
+    st.subheader("Séries Mensais (tabela longa)")
+    paginated_dataframe(df_batch, key="tabela_lote")
+    st.download_button(
+        "Baixar CSV", df_batch.to_csv(index=False).encode("utf-8"),
+        file_name=f"{value}_{estado_selecionado}_{start_date.year}_{end_date.year}.csv", mime="text/csv",
+    )
@@ -0,0 +1,254 @@
+# Interface de acesso ao Earth Engine usada pelas páginas
+#
+# As páginas não chamam ee.* diretamente: todas as operações passam por um backend (os
+# mapas usam as URLs de tiles e miniaturas do backend, ver utils/maps.py). Há duas
+# implementações:
+# - utils/ee_backend.py: Google Earth Engine real (API ee)
+# - utils/fake_backend.py: substituto local com rasters sintéticos em NumPy, que conta
+#   as idas e voltas ao "servidor" e pode simular latência (testes e benchmarks offline)
+#
+# Os objetos retornados (coleções, imagens, geometrias) são opacos para as páginas:
+# só devem ser manipulados pelos métodos do próprio backend. Nada é calculado até
+# que get_info (o equivalente a getInfo) seja chamado.
+
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from utils.instrumentation import record_call
+
+# Variáveis de ambiente que escolhem o backend ("ee" ou "local") e a latência simulada (segundos)
+BACKEND_ENV = "AGROMET_BACKEND"
+LATENCY_ENV = "AGROMET_LATENCY"
+
+
+class Backend:
+    name = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    # Zera os contadores de chamadas ao servidor
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.payload_bytes = 0
+
+    # Registra uma ida e volta ao servidor, o tamanho da resposta e o tempo de espera
+    # (também na etapa da página em andamento, ver utils/instrumentation.py)
+    def _record_call(self, payload_bytes=0, seconds=0.0):
+        with self._lock:
+            self.calls += 1
+            self.payload_bytes += payload_bytes
+        record_call(payload_bytes, seconds)
+
+    # Traz o valor de um objeto do servidor (equivalente a getInfo), contando a chamada
+    def get_info(self, obj):
+        started = time.perf_counter()
+        value = self._get_info(obj)
+        self._record_call(len(json.dumps(value, default=str)), time.perf_counter() - started)
+        return value
+
+    def _get_info(self, obj):
+        raise NotImplementedError
+
+    # Inicialização/autenticação (chamada pelas páginas antes de qualquer operação)
+    def initialize(self):
+        pass
+
+    # ---------------- Regiões (FeatureCollections) ----------------
+
+    def feature_collection(self, asset_id):
+        raise NotImplementedError
+
+    def filter_eq(self, fc, prop, value):
+        raise NotImplementedError
+
+    # Feições cuja propriedade está na lista de valores
+    def filter_in(self, fc, prop, values):
+        raise NotImplementedError
+
+    # Lista (lazy) com os valores de uma propriedade em todas as feições
+    def aggregate_array(self, fc, prop):
+        raise NotImplementedError
+
+    # Geometria (lazy) que une todas as feições da coleção
+    def geometry(self, fc):
+        raise NotImplementedError
+
+    # Área (lazy) da geometria, em m²
+    def area(self, roi):
+        raise NotImplementedError
+
+    # Simplifica a geometria de cada feição (max_error em metros)
+    def simplify_features(self, fc, max_error):
+        raise NotImplementedError
+
+    # Geometria a partir de um dicionário GeoJSON local (sem consulta ao servidor)
+    def geometry_from_geojson(self, geojson):
+        raise NotImplementedError
+
+    # Coleção com uma única feição, a partir de uma geometria e propriedades locais
+    def feature_collection_from_geometry(self, roi, properties=None):
+        raise NotImplementedError
+
+    # ---------------- Coleções de imagens ----------------
+
+    def image_collection(self, dataset_id):
+        raise NotImplementedError
+
+    def select(self, collection, band):
+        raise NotImplementedError
+
+    # Filtro temporal [start, end); aceita datas ou strings "AAAA-MM-DD"
+    def filter_date(self, collection, start, end):
+        raise NotImplementedError
+
+    def filter_bounds(self, collection, roi):
+        raise NotImplementedError
+
+    # Conversão linear de cada imagem (valor * multiply + add), preservando as propriedades
+    def rescale(self, collection, multiply=1.0, add=0.0):
+        raise NotImplementedError
+
+    # Data da imagem mais recente da coleção (lazy; system:time_start em ms desde 1970, None se vazia)
+    def latest_time(self, collection):
+        raise NotImplementedError
+
+    # Composição temporal (sum/mean) das imagens no intervalo [start, end)
+    def composite(self, collection, start, end, aggregator):
+        raise NotImplementedError
+
+    def clip(self, image, roi):
+        raise NotImplementedError
+
+    # Redução espacial de uma imagem sobre a ROI; reducer: "mean" ou "minMax"
+    # tile_scale/best_effort: parâmetros tileScale/bestEffort do EE (ver utils/planner.py)
+    def reduce_region(self, image, roi, reducer, scale, tile_scale=1, best_effort=False):
+        raise NotImplementedError
+
+    # Mínimo, máximo e percentis de cada banda sobre a ROI, em um único dicionário
+    # (chaves no padrão do EE: banda_min, banda_max, banda_p2, banda_p98...)
+    def reduce_stats(self, image, roi, percentiles, scale, tile_scale=1, best_effort=False):
+        raise NotImplementedError
+
+    # Valor (lazy) de uma chave de um dicionário do servidor
+    def get_property(self, dictionary, key):
+        raise NotImplementedError
+
+    # ---------------- Séries mensais ----------------
+
+    # Coleção de imagens mensais a partir de (ano, mês) inicial, com as propriedades year, month,
+    # ym (chave ano * 100 + mês, usada nas junções) e nbands (0 nos meses sem imagens)
+    def monthly_images(self, collection, start_year, start_month, n_months, aggregator):
+        raise NotImplementedError
+
+    # Lista (lazy) com a média de uma banda de cada imagem mensal sobre a ROI
+    def reduce_monthly_images(self, images, band, roi, n_months, scale, tile_scale=1, best_effort=False):
+        raise NotImplementedError
+
+    # Linhas compactas [ano, mês, banda1, banda2, ...] com a média de cada banda das imagens
+    # mensais sobre a ROI (lista lazy, sem geometrias nem nomes de propriedades por linha)
+    def reduce_monthly_rows(self, images, roi, bands, n_months, scale, tile_scale=1, best_effort=False):
+        raise NotImplementedError
+
+    # Climatologia mensal em uma única redução agrupada: a média de cada imagem mensal sobre a ROI
+    # é agrupada pelo mês do calendário; lista (lazy) de {month, mean, stdDev, count}, apenas
+    # dos meses com dados (stdDev populacional, como ee.Reducer.stdDev)
+    def reduce_climatology(self, images, band, roi, scale, tile_scale=1, best_effort=False):
+        raise NotImplementedError
+
+    # Remove imagens sem bandas (meses sem dados)
+    def filter_nonempty(self, images):
+        raise NotImplementedError
+
+    # Junção por chave (ym) de duas coleções mensais: adiciona a cada imagem de left a imagem de
+    # right do mesmo ano-mês, renomeada para band; meses sem imagens em um dos lados são descartados
+    def join_monthly(self, left, right, band):
+        raise NotImplementedError
+
+    # Adiciona a cada imagem a banda name = a - b
+    def band_difference(self, images, a, b, name):
+        raise NotImplementedError
+
+    # Reduz cada imagem sobre as feições (reduceRegions), copiando year/month para as feições
+    # Com uma única banda, o valor reduzido fica na propriedade com o nome do redutor ("mean")
+    # geometry=False descarta as geometrias do resultado (respostas bem menores)
+    def reduce_regions(self, images, fc, reducer, scale, tile_scale=1, geometry=True):
+        raise NotImplementedError
+
+    # ---------------- Pixels (ver utils/cube.py) ----------------
+
+    # Baixa os pixels de uma banda das imagens mensais recortadas na ROI, na grade de scale metros
+    # sobre o retângulo envolvente bounds [oeste, sul, leste, norte], contando as chamadas e os bytes
+    # Devolve um array float32 (meses, linhas, colunas), linhas de norte para sul, com NaN fora da
+    # ROI e nos pixels ou meses sem dados
+    def get_pixels(self, images, band, roi, bounds, n_months, scale):
+        raise NotImplementedError
+
+    # ---------------- Mapas (ver utils/maps.py) ----------------
+
+    # Identificador estável da expressão de um objeto (chave dos caches de tiles)
+    def expression_key(self, obj):
+        raise NotImplementedError
+
+    # Imagem (lazy) com o contorno da ROI pintado com o valor 1
+    def outline(self, roi, width=2):
+        raise NotImplementedError
+
+    # Retângulo envolvente (lazy) da ROI: [oeste, sul, leste, norte]
+    def bounds(self, roi):
+        raise NotImplementedError
+
+    # Imagem RGB única com as camadas [(imagem, vis_params), ...] sobrepostas (para miniaturas)
+    def visualize(self, layers):
+        raise NotImplementedError
+
+    # Requisita um map ID e devolve o modelo de URL dos tiles ({z}/{x}/{y}), contando a chamada
+    def get_tile_url(self, image, vis_params):
+        raise NotImplementedError
+
+    # Requisita a URL de uma miniatura PNG da imagem recortada na ROI, contando a chamada
+    def get_thumbnail_url(self, image, roi, dimensions):
+        raise NotImplementedError
+
+
+# Função para converter uma FeatureCollection (resultado de get_info) em DataFrame
+def features_to_df(fc_info):
+    return pd.DataFrame([feature["properties"] for feature in fc_info["features"]])
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+# Função para obter o backend do processo, conforme a variável de ambiente AGROMET_BACKEND
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(os.environ.get(BACKEND_ENV, "ee"))
+        return _backend
+
+
+# Função para criar um backend pelo nome ("ee" ou "local")
+def create_backend(name, **kwargs):
+    if name == "ee":
+        from utils.ee_backend import EarthEngineBackend
+        return EarthEngineBackend(**kwargs)
+    if name == "local":
+        from utils.fake_backend import FakeBackend
+        kwargs.setdefault("latency", float(os.environ.get(LATENCY_ENV, "0")))
+        return FakeBackend(**kwargs)
+    raise ValueError(f"Backend desconhecido: {name}")
+
+
+# Função para substituir o backend do processo (benchmarks e testes)
+def set_backend(backend):
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,101 @@
+# Modo em lote: séries mensais de todos os municípios de um estado
+#
+# Em vez de uma série por município (853 municípios × 132 meses de idas e voltas em
+# Minas Gerais), cada requisição reduz um bloco de imagens mensais sobre um bloco de
+# municípios da FeatureCollection MUNICIPIOS_ASSET com reduceRegions, sem as geometrias
+# no resultado. Os blocos são dimensionados para que cada resposta fique abaixo do
+# limite de elementos do EE e são executados em paralelo pelo executor compartilhado.
+# O resultado é uma tabela longa (município × mês × valor).
+
+import json
+
+import pandas as pd
+
+from utils.catalog import load_catalog
+from utils.datasets import MUNICIPIOS_ASSET
+from utils.executor import get_executor
+from utils.series import month_range
+
+# Limite de linhas (município × mês) por resposta (o EE recusa coleções com mais de 5000 elementos)
+MAX_ROWS_PER_REQUEST = 5000
+# Máximo de meses por requisição
+MAX_MONTHS_PER_REQUEST = 120
+
+
+# Função para obter os nomes dos municípios de um estado (catálogo local ou asset no EE)
+def state_municipalities(backend, state):
+    catalog = load_catalog()
+    if catalog is not None:
+        return sorted(catalog.loc[catalog["NM_UF"] == state, "NM_MUN"].tolist())
+    fc = backend.filter_eq(backend.feature_collection(MUNICIPIOS_ASSET), "NM_UF", state)
+    return sorted(backend.get_info(backend.aggregate_array(fc, "NM_MUN")))
+
+
+# Função para dividir os municípios e os meses em blocos que respeitam o limite de linhas
+def plan_chunks(municipalities, months, max_rows=MAX_ROWS_PER_REQUEST, max_months=MAX_MONTHS_PER_REQUEST):
+    months_per_chunk = max(1, min(len(months), max_months, max_rows))
+    municipalities_per_chunk = max(1, max_rows // months_per_chunk)
+    return [
+        (municipalities[i:i + municipalities_per_chunk], months[j:j + months_per_chunk])
+        for i in range(0, len(municipalities), municipalities_per_chunk)
+        for j in range(0, len(months), months_per_chunk)
+    ]
+
+
+# Função para calcular séries mensais de vários municípios de um estado em tabela longa
+# build_images(ano, mês, n_meses) monta a coleção de imagens mensais de um bloco de meses;
+# columns: bandas a manter (com uma única banda, a saída "mean" do reduceRegions vira columns[0])
+# Colunas: NM_MUN, CD_MUN (se houver no asset), year, month, *columns
+def batch_series(backend, state, start_date, end_date, build_images, columns, municipalities=None,
+                 scale=10000, tile_scale=1):
+    municipalities = sorted(municipalities or state_municipalities(backend, state))
+    months = month_range(start_date, end_date)
+    state_fc = backend.filter_eq(backend.feature_collection(MUNICIPIOS_ASSET), "NM_UF", state)
+
+    requests = []
+    for names, chunk in plan_chunks(municipalities, months):
+        start_year, start_month = chunk[0]
+        images = build_images(start_year, start_month, len(chunk))
+        fc = backend.filter_in(state_fc, "NM_MUN", names)
+        requests.append(backend.reduce_regions(images, fc, "mean", scale, tile_scale=tile_scale, geometry=False))
+
+    rows = [
+        feature["properties"]
+        for fc_info in get_executor().get_info_all(backend, requests)
+        for feature in fc_info["features"]
+    ]
+    df = pd.DataFrame(rows, columns=sorted({key for row in rows for key in row}) or ["NM_MUN", "year", "month"])
+    if len(columns) == 1:
+        df = df.rename(columns={"mean": columns[0]})
+    df = df[[c for c in ["NM_MUN", "CD_MUN", "year", "month", *columns] if c in df.columns]]
+
+    # Tabela completa: meses sem imagens (ou sem valor) ficam como NaN
+    full = pd.DataFrame([(name, year, month) for name in municipalities for year, month in months],
+                        columns=["NM_MUN", "year", "month"])
+    df = full.merge(df, on=["NM_MUN", "year", "month"], how="left")
+    if "CD_MUN" in df.columns:
+        df.insert(1, "CD_MUN", df.pop("CD_MUN").groupby(df["NM_MUN"]).transform("first").astype("string"))
+    for column in columns:
+        df[column] = pd.to_numeric(df[column], errors="coerce") if column in df.columns else float("nan")
+    return df.sort_values(["NM_MUN", "year", "month"]).reset_index(drop=True)
+
+
+# Função para calcular a série mensal (uma banda) de vários municípios de um estado em tabela longa
+# Colunas: NM_MUN, CD_MUN (se houver no asset), year, month, value_name
+def batch_monthly_series(backend, collection, state, start_date, end_date, municipalities=None,
+                         aggregator="sum", scale=10000, value_name="value", tile_scale=1):
+    def build_images(start_year, start_month, n_months):
+        images = backend.monthly_images(collection, start_year, start_month, n_months, aggregator)
+        return backend.filter_nonempty(images)
+
+    return batch_series(backend, state, start_date, end_date, build_images, [value_name],
+                        municipalities=municipalities, scale=scale, tile_scale=tile_scale)
+
+
+# Função para obter as geometrias (GeoJSON) dos municípios de um estado para o mapa coroplético
+def state_geojson(backend, state, tolerance=500):
+    catalog = load_catalog()
+    if catalog is not None:
+        return json.loads(catalog[catalog["NM_UF"] == state].to_json())
+    fc = backend.filter_eq(backend.feature_collection(MUNICIPIOS_ASSET), "NM_UF", state)
+    return backend.get_info(backend.simplify_features(fc, tolerance))
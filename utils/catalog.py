@@ -0,0 +1,149 @@
+# Catálogo local de estados e municípios (GeoParquet)
+#
+# Pré-calculado a partir dos assets BR_UF_2023 / BR_Municipios_2023, guarda para cada
+# município o nome, o estado, o código IBGE, o retângulo envolvente, a área e a
+# geometria simplificada. Com ele as listas da barra lateral são montadas sem consultar
+# o Earth Engine, e a ROI é enviada ao servidor como geometria local (sem filtros
+# ee.Filter.eq sobre o asset). Sem o arquivo, as funções recorrem ao asset no EE.
+#
+# Reconstrução do catálogo:
+#   python -m utils.catalog build [--tolerance 100] [--backend ee|local]
+
+import argparse
+import json
+import os
+from functools import lru_cache
+
+from utils.backend import create_backend
+from utils.datasets import ESTADOS_ASSET, MUNICIPIOS_ASSET
+from utils.executor import get_executor
+
+# Caminho padrão do catálogo (pode ser alterado pela variável de ambiente)
+CATALOG_PATH = os.environ.get("AGROMET_CATALOG_PATH", os.path.join("data", "catalog", "municipios.parquet"))
+
+# Tolerância padrão de simplificação das geometrias, em metros
+DEFAULT_TOLERANCE = 100
+
+# Propriedades do asset mantidas no catálogo (as ausentes são ignoradas)
+PROPERTIES = ["CD_MUN", "NM_MUN", "CD_UF", "NM_UF", "SIGLA_UF"]
+
+# Metros por grau (conversão da tolerância de simplificação para coordenadas geográficas)
+METERS_PER_DEGREE = 111320.0
+
+# Projeção de área equivalente usada no cálculo da área (Albers da América do Sul)
+AREA_CRS = "ESRI:102033"
+
+
+@lru_cache(maxsize=2)
+def _read_catalog(path, mtime):
+    import geopandas as gpd
+    return gpd.read_parquet(path)
+
+
+# Função para carregar o catálogo (None se o arquivo ainda não foi gerado)
+def load_catalog(path=None):
+    path = path or CATALOG_PATH
+    if not os.path.exists(path):
+        return None
+    return _read_catalog(path, os.path.getmtime(path))
+
+
+# Função para obter a lista de estados
+def get_states(backend):
+    catalog = load_catalog()
+    if catalog is not None:
+        return sorted(catalog["NM_UF"].unique().tolist())
+    estados = backend.feature_collection(ESTADOS_ASSET)
+    return sorted(backend.get_info(backend.aggregate_array(estados, "NM_UF")))
+
+
+# Função para obter os municípios de um estado
+def get_municipalities(backend, state):
+    catalog = load_catalog()
+    if catalog is not None:
+        return sorted(catalog.loc[catalog["NM_UF"] == state, "NM_MUN"].tolist())
+    municipios = backend.filter_eq(backend.feature_collection(MUNICIPIOS_ASSET), "NM_UF", state)
+    return sorted(backend.get_info(backend.aggregate_array(municipios, "NM_MUN")))
+
+
+# Função para obter a linha do catálogo de um município (None sem catálogo ou se não encontrado)
+def get_municipality(state, municipality):
+    catalog = load_catalog()
+    if catalog is None:
+        return None
+    rows = catalog[(catalog["NM_UF"] == state) & (catalog["NM_MUN"] == municipality)]
+    return rows.iloc[0] if len(rows) else None
+
+
+# Função para obter a ROI de um município: (coleção com a feição, geometria)
+# tolerance (m): simplificação opcional do contorno (ver utils/planner.py)
+def get_region(backend, state, municipality, tolerance=None):
+    row = get_municipality(state, municipality)
+    if row is not None:
+        import shapely
+        geometry = row.geometry
+        if tolerance:
+            # Simplificação local, em graus (aproximação de 111,32 km por grau)
+            geometry = geometry.simplify(tolerance / METERS_PER_DEGREE, preserve_topology=True)
+        roi = backend.geometry_from_geojson(json.loads(shapely.to_geojson(geometry)))
+        properties = {key: str(row[key]) for key in PROPERTIES if key in row.index}
+        return backend.feature_collection_from_geometry(roi, properties), roi
+
+    roi_fc = backend.feature_collection(MUNICIPIOS_ASSET)
+    roi_fc = backend.filter_eq(roi_fc, "NM_UF", state)
+    roi_fc = backend.filter_eq(roi_fc, "NM_MUN", municipality)
+    if tolerance:
+        roi_fc = backend.simplify_features(roi_fc, tolerance)
+    return roi_fc, backend.geometry(roi_fc)
+
+
+# Função para reconstruir o catálogo a partir dos assets (uma requisição por estado, em paralelo)
+def build_catalog(backend, path=None, tolerance=DEFAULT_TOLERANCE):
+    import geopandas as gpd
+
+    path = path or CATALOG_PATH
+    estados = backend.get_info(backend.aggregate_array(backend.feature_collection(ESTADOS_ASSET), "NM_UF"))
+    municipios = backend.feature_collection(MUNICIPIOS_ASSET)
+    requests = [
+        backend.simplify_features(backend.filter_eq(municipios, "NM_UF", estado), tolerance)
+        for estado in estados
+    ]
+    features = [
+        feature
+        for fc_info in get_executor().get_info_all(backend, requests)
+        for feature in fc_info["features"]
+    ]
+
+    catalog = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
+    catalog = catalog[[key for key in PROPERTIES if key in catalog.columns] + ["geometry"]]
+    catalog["AREA_KM2"] = catalog.geometry.to_crs(AREA_CRS).area / 1e6
+    catalog = catalog.join(catalog.geometry.bounds)
+    catalog = catalog.sort_values(["NM_UF", "NM_MUN"]).reset_index(drop=True)
+
+    # Gravação atômica: as sessões em andamento nunca leem um arquivo pela metade
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    catalog.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+    return catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catálogo local de estados e municípios")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="reconstrói o catálogo a partir dos assets do GEE")
+    build.add_argument("--path", default=CATALOG_PATH)
+    build.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                       help="tolerância de simplificação das geometrias (m)")
+    build.add_argument("--backend", choices=["ee", "local"], default="ee")
+    args = parser.parse_args(argv)
+
+    backend = create_backend(args.backend)
+    backend.initialize()
+    catalog = build_catalog(backend, args.path, args.tolerance)
+    print(f"Catálogo gravado em {args.path}: {catalog['NM_UF'].nunique()} estados, "
+          f"{len(catalog)} municípios ({os.path.getsize(args.path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
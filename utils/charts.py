@@ -0,0 +1,154 @@
+# Camada de dados dos gráficos e tabelas das páginas
+#
+# Séries longas (dados diários, 30+ anos, vários municípios) enviariam todos os pontos ao
+# navegador em cada figura do Plotly. Aqui, antes de montar a figura, a série é reduzida a
+# cerca de um ponto por pixel da largura do gráfico (AGROMET_CHART_WIDTH) com um método que
+# preserva a forma:
+# - "lttb" (Largest-Triangle-Three-Buckets): um ponto por intervalo, o que forma o maior
+#   triângulo com os vizinhos; mantém picos e vales visíveis com ~1 ponto por pixel;
+# - "minmax": o mínimo e o máximo de cada intervalo (até 2 pontos por pixel); garante os extremos.
+# Séries que já cabem na largura não são alteradas.
+#
+# show_chart exibe a figura e, no modo de depuração, registra o tamanho serializado (JSON) e o
+# tempo para enfileirá-la no Streamlit (utils/instrumentation.py); paginated_dataframe exibe tabelas grandes em páginas, e
+# raster_figure desenha as imagens do cubo de pixels local (utils/cube.py).
+
+import math
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.cube import pixel_centers
+from utils.instrumentation import record_chart
+from utils.session import debug_enabled
+
+# Largura de referência dos gráficos, em pixels (número de intervalos da redução)
+CHART_WIDTH = int(os.environ.get("AGROMET_CHART_WIDTH", "1000"))
+# Linhas por página das tabelas grandes
+TABLE_PAGE_ROWS = int(os.environ.get("AGROMET_TABLE_PAGE_ROWS", "500"))
+
+DOWNSAMPLING_METHODS = {"lttb": "LTTB", "minmax": "mínimo/máximo"}
+
+# Série reduzida: frame (linhas mantidas, na ordem original), pontos exibidos, pontos da série
+# original e método (None se a série não foi reduzida)
+Downsampled = namedtuple("Downsampled", ["frame", "points", "total", "method"])
+
+
+# Índices dos pontos escolhidos pelo LTTB (x crescente, sem NaN)
+def lttb_indices(x, y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n_out - 2 intervalos entre o primeiro e o último ponto (que são sempre mantidos)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Média do intervalo seguinte (o último ponto, no último intervalo)
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+# Índices do mínimo e do máximo de cada intervalo (mais o primeiro e o último ponto)
+def minmax_indices(y, n_buckets):
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    indices = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        indices.append(start + int(np.argmin(y[start:end])))
+        indices.append(start + int(np.argmax(y[start:end])))
+    return np.unique(indices)
+
+
+def _numeric(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(float)
+    return values.to_numpy(dtype=float)
+
+
+# Função para reduzir as linhas de um DataFrame ordenado por x, para gráficos de linha
+# columns: colunas plotadas que guiam a escolha dos pontos (a união dos pontos de cada uma é
+# mantida; as demais colunas, como médias móveis, acompanham as linhas escolhidas)
+def downsample(df, x, columns, width=CHART_WIDTH, method="lttb"):
+    total = len(df)
+    limit = width if method == "lttb" else 2 * width
+    if total <= limit:
+        return Downsampled(df, total, total, None)
+
+    xs = _numeric(df[x])
+    keep = np.zeros(total, dtype=bool)
+    for column in columns:
+        ys = df[column].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(ys))
+        if method == "minmax":
+            chosen = minmax_indices(ys[valid], width)
+        else:
+            chosen = lttb_indices(xs[valid], ys[valid], width)
+        keep[valid[chosen]] = True
+    frame = df.iloc[np.flatnonzero(keep)]
+    return Downsampled(frame, len(frame), total, method)
+
+
+# Função para exibir uma figura do Plotly (no modo de depuração, registra o tamanho serializado
+# e o tempo para enfileirá-la; st.plotly_chart só envia o elemento, o desenho é feito no navegador)
+# sample: resultado de downsample (indica na legenda quantos pontos foram exibidos)
+def show_chart(fig, sample=None):
+    if not debug_enabled():
+        # Sem depuração, a figura não é serializada uma segunda vez só para medir o tamanho
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        figure_bytes = len(fig.to_json().encode("utf-8"))
+        started = time.perf_counter()
+        st.plotly_chart(fig, use_container_width=True)
+        seconds = time.perf_counter() - started
+        record_chart(fig.layout.title.text or "", seconds, figure_bytes,
+                     sample.points if sample is not None else None, sample.total if sample is not None else None)
+
+    if sample is not None and sample.method is not None:
+        st.caption(f"Exibindo {sample.points} de {sample.total} pontos (redução "
+                   f"{DOWNSAMPLING_METHODS[sample.method]} para ~{CHART_WIDTH} px).")
+
+
+# Tabela paginada: a troca da página reexecuta apenas este fragmento
+@st.fragment
+def paginated_dataframe(df, key, page_rows=TABLE_PAGE_ROWS):
+    if len(df) <= page_rows:
+        st.dataframe(df, use_container_width=True)
+        return
+    n_pages = math.ceil(len(df) / page_rows)
+    page = st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key=key)
+    first = (page - 1) * page_rows
+    last = min(first + page_rows, len(df))
+    st.dataframe(df.iloc[first:last], use_container_width=True)
+    st.caption(f"Linhas {first + 1}–{last} de {len(df)}.")
+
+
+# Função para montar o mapa de uma imagem 2D do cubo local (utils/cube.py) como figura do Plotly
+# symmetric: escala centrada em zero (anomalias), de -máx|valor| a +máx|valor|
+def raster_figure(cube, image, palette, zmin=None, zmax=None, title="", label="", symmetric=False):
+    # Plotly só é importado quando há gráficos a exibir (partida mais rápida)
+    import plotly.express as px
+
+    if symmetric:
+        valid = np.abs(image[~np.isnan(image)])
+        limit = float(valid.max()) if valid.size and valid.max() > 0 else 1.0
+        zmin, zmax = -limit, limit
+    # As linhas vêm de norte para sul, com as latitudes decrescentes em y: origin="lower" mantém o
+    # eixo y crescente (linha 0 no topo, na latitude máxima); "upper" inverteria o eixo outra vez
+    lons, lats = pixel_centers(cube)
+    fig = px.imshow(image, x=lons, y=lats, origin="lower", color_continuous_scale=palette, zmin=zmin, zmax=zmax,
+                    labels={"x": "Longitude", "y": "Latitude", "color": label}, title=title, aspect="equal")
+    fig.update_layout(height=500)
+    return fig
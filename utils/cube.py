@@ -0,0 +1,113 @@
+# Cubo de pixels local (modo de análise "Cubo local")
+#
+# Nas análises completas, cada estatística exibida (série mensal, escala de cores de cada mapa
+# anual, climatologia) é uma redução separada no Earth Engine sobre a mesma ROI pequena. Neste
+# modo, os pixels mensais da ROI são baixados uma única vez (backend.get_pixels; no EE,
+# ee.data.computePixels) em um array (meses, linhas, colunas) com máscara de validade (pixels
+# fora da ROI ou sem dados), e todo o resto é calculado localmente com NumPy: médias zonais,
+# composições anuais por pixel, percentis da escala de cores, climatologia e anomalias.
+#
+# Com o backend local (AGROMET_BACKEND=local), o cubo é gerado a partir dos mesmos campos
+# sintéticos e da mesma grade das reduções, de modo que as médias zonais coincidem com as
+# séries calculadas "no servidor" (ver benchmarks/bench_cube.py).
+
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from utils.vizstats import DEFAULT_PERCENTILES
+
+# Cubo de pixels: values (float32, meses × linhas × colunas, de norte para sul, NaN onde não há
+# dado), valid (máscara de validade), years/months de cada camada, bounds [oeste, sul, leste,
+# norte] e escala (m)
+PixelCube = namedtuple("PixelCube", ["values", "valid", "years", "months", "bounds", "scale"])
+
+
+# Função para baixar o cubo de uma banda das imagens mensais (uma camada por mês de months)
+def fetch_cube(images, band, roi, bounds, months, scale, backend):
+    values = backend.get_pixels(images, band, roi, bounds, len(months), scale)
+    return PixelCube(values, ~np.isnan(values), np.array([year for year, _ in months]),
+                     np.array([month for _, month in months]), tuple(bounds), scale)
+
+
+# Função para calcular a média zonal de cada mês (NaN nos meses sem pixels válidos)
+def zonal_means(cube):
+    counts = cube.valid.sum(axis=(1, 2))
+    sums = np.where(cube.valid, cube.values, 0).sum(axis=(1, 2), dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+# Função para montar a série mensal (year, month, valor) a partir das médias zonais
+def monthly_frame(cube, value_name="value"):
+    return pd.DataFrame({"year": cube.years, "month": cube.months, value_name: zonal_means(cube)})
+
+
+# Função para calcular a composição anual de cada pixel (soma ou média dos meses do ano)
+# weights: None (meses com peso igual) ou "days" (dias de cada mês), como em annual_from_monthly
+# Devolve (anos, array anos × linhas × colunas); anos sem nenhum pixel válido ficam de fora
+def annual_composites(cube, aggregator="sum", weights=None):
+    years = [int(year) for year in np.unique(cube.years)]
+    if weights == "days":
+        first_days = pd.to_datetime(pd.DataFrame({"year": cube.years, "month": cube.months, "day": 1}))
+        month_weights = first_days.dt.days_in_month.to_numpy(dtype=float)
+    else:
+        month_weights = np.ones(len(cube.years))
+
+    composites = np.full((len(years),) + cube.values.shape[1:], np.nan, dtype=np.float32)
+    for i, year in enumerate(years):
+        selected = cube.years == year
+        values, valid = cube.values[selected], cube.valid[selected]
+        any_valid = valid.any(axis=0)
+        if aggregator == "sum":
+            total = np.where(valid, values, 0).sum(axis=0)
+        elif aggregator == "mean":
+            w = np.where(valid, month_weights[selected][:, None, None], 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                total = (np.where(valid, values, 0) * w).sum(axis=0) / w.sum(axis=0)
+        else:
+            raise ValueError(f"Agregador temporal desconhecido: {aggregator}")
+        composites[i] = np.where(any_valid, total, np.nan)
+    has_data = ~np.isnan(composites).all(axis=(1, 2))
+    return [year for year, keep in zip(years, has_data) if keep], composites[has_data]
+
+
+# Função para obter {"min", "max", "p2", "p98", ...} dos pixels válidos de uma imagem 2D
+# (mesmo formato de utils/vizstats.get_viz_stats)
+def pixel_stats(image, percentiles=DEFAULT_PERCENTILES):
+    valid = image[~np.isnan(image)]
+    if not valid.size:
+        return {"min": None, "max": None, **{f"p{p}": None for p in percentiles}}
+    stats = {"min": float(valid.min()), "max": float(valid.max())}
+    for p, value in zip(percentiles, np.percentile(valid, percentiles)):
+        stats[f"p{p}"] = float(value)
+    return stats
+
+
+# Função para calcular a anomalia de cada pixel em um ano: composição do ano menos a média
+# das composições de todos os anos do período
+def annual_anomaly(years, composites, year):
+    # Pixels sem dado em todos os anos ficam NaN (sem o aviso de "Mean of empty slice")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(composites, axis=0)
+    return composites[years.index(year)] - mean
+
+
+# Coordenadas dos centros dos pixels (longitudes de oeste para leste, latitudes de norte para sul)
+def pixel_centers(cube):
+    west, south, east, north = cube.bounds
+    height, width = cube.values.shape[1:]
+    lons = west + (np.arange(width) + 0.5) * (east - west) / width
+    lats = north - (np.arange(height) + 0.5) * (north - south) / height
+    return lons, lats
+
+
+# Função para descrever o cubo (legenda dos gráficos)
+def describe_cube(cube):
+    months, height, width = cube.values.shape
+    valid_pixels = int(cube.valid.any(axis=0).sum())
+    return (f"Cubo local: {valid_pixels} pixels válidos ({width} × {height}) × {months} meses, "
+            f"{cube.values.nbytes / 1024:.0f} kB baixados de uma só vez; estatísticas calculadas localmente.")
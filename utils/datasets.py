@@ -0,0 +1,65 @@
+# Registro dos conjuntos de dados usados pelo app
+#
+# Cada entrada reúne o que as páginas, o planejador, o armazenamento pré-calculado e o
+# modo em lote precisam saber de uma coleção do Earth Engine: ID, banda, conversão
+# (valor * multiply + add), resolução nativa, duração das imagens, agregação temporal
+# (mensal/anual), unidade e paleta dos mapas. As séries são calculadas a partir dessas
+# entradas pelo motor de séries (utils/engine.py). Os assets dos limites administrativos
+# também ficam aqui, fora de utils/session.py, para que o catálogo, o planejador e o modo em
+# lote possam ser usados sem o Streamlit.
+
+from collections import namedtuple
+
+# Assets do usuário no GEE (limites dos estados e municípios)
+ESTADOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_UF_2023"
+MUNICIPIOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_Municipios_2023"
+
+Dataset = namedtuple("Dataset", [
+    "key",                # nome curto do registro
+    "id",                 # ID da coleção no Earth Engine
+    "band",               # banda usada
+    "multiply", "add",    # conversão para a unidade exibida
+    "native_resolution",  # resolução nativa (m), ver utils/planner.py
+    "cadence_days",       # duração máxima de cada imagem (dias), ver utils/precomputed.py
+    "aggregator",         # agregação temporal: "sum" (acumulados) ou "mean"
+    "weights",            # pesos da média anual: None ou "days" (dias de cada mês)
+    "value_name",         # coluna das séries
+    "label", "unit",      # rótulo e unidade nos gráficos
+    "palette",            # paleta dos mapas
+])
+
+DATASETS = {
+    "precipitacao": Dataset(
+        "precipitacao", "UCSB-CHG/CHIRPS/DAILY", "precipitation", 1.0, 0.0, 5566, 1, "sum", None,
+        "precip", "Precipitação", "mm",
+        ['#ffffff', '#ff3333', '#fff581', '#33ecff', '#6f5eff', '#171cb1'],
+    ),
+    "precipitacao_pentadal": Dataset(
+        "precipitacao_pentadal", "UCSB-CHG/CHIRPS/PENTAD", "precipitation", 1.0, 0.0, 5566, 6, "sum", None,
+        "precipitation", "Precipitação", "mm",
+        ['#ffffff', '#ff3333', '#fff581', '#33ecff', '#6f5eff', '#171cb1'],
+    ),
+    "temperatura": Dataset(
+        "temperatura", "MODIS/006/MOD11A2", "LST_Day_1km", 0.02, -273.15, 1000, 8, "mean", "days",
+        "temp", "Temperatura Média", "°C",
+        ['#313695', '#4575b4', '#74add1', '#abd9e9', '#e0f3f8', '#ffffbf', '#fee090', '#fdae61', '#f46d43', '#d73027', '#a50026'],
+    ),
+    "evapotranspiracao": Dataset(
+        "evapotranspiracao", "MODIS/061/MOD16A2GF", "ET", 0.1, 0.0, 500, 8, "sum", None,
+        "ET", "Evapotranspiração", "mm",
+        ['#ffffff', '#fcd163', '#99b718', '#66a000', '#3e8601', '#207401', '#056201', '#004c00', '#011301'],
+    ),
+}
+
+_BY_ID = {dataset.id: dataset for dataset in DATASETS.values()}
+
+
+# Função para obter uma entrada do registro pelo nome curto ou pelo ID da coleção
+def get_dataset(key):
+    if isinstance(key, Dataset):
+        return key
+    if key in DATASETS:
+        return DATASETS[key]
+    if key in _BY_ID:
+        return _BY_ID[key]
+    raise KeyError(f"Conjunto de dados desconhecido: {key}")
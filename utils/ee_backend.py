@@ -0,0 +1,334 @@
+# Backend do Google Earth Engine (API ee; mapas por getMapId/getThumbURL, ver utils/maps.py)
+
+import json
+import math
+import os
+import time
+
+import ee
+import numpy as np
+import streamlit as st
+
+from utils.backend import Backend
+
+
+# Função para agregar uma coleção no tempo (soma para precipitação, média para temperatura)
+def aggregate_collection(collection, aggregator):
+    if aggregator == "sum":
+        return collection.sum()
+    if aggregator == "mean":
+        return collection.mean()
+    raise ValueError(f"Agregador temporal desconhecido: {aggregator}")
+
+
+# Credenciais da conta de serviço: secrets do Streamlit ou variável de ambiente (linha de comando)
+def _credentials_json():
+    try:
+        if "GEE_CREDENTIALS_JSON" in st.secrets:
+            return st.secrets["GEE_CREDENTIALS_JSON"]
+    except Exception:
+        # Fora do Streamlit (ou sem secrets.toml) não há st.secrets
+        pass
+    return os.environ.get("GEE_CREDENTIALS_JSON")
+
+
+# Pixels (ver get_pixels): valor dos pixels sem dado, metros por grau da grade em EPSG:4326 e
+# tamanho máximo de cada resposta de computePixels (o EE recusa respostas acima de ~48 MB)
+NODATA = -9999.0
+METERS_PER_DEGREE = 111320.0
+MAX_PIXEL_BYTES = 32 * 1024 * 1024
+MAX_PIXEL_BANDS = 1024
+
+# Redutores espaciais disponíveis para as páginas
+REDUCERS = {
+    "mean": ee.Reducer.mean,
+    "minMax": ee.Reducer.minMax,
+}
+
+
+class EarthEngineBackend(Backend):
+    name = "ee"
+
+    def _get_info(self, obj):
+        return obj.getInfo()
+
+    # Autenticação do Google Earth Engine (uma vez por processo, ver utils/session.py)
+    def initialize(self):
+        # Autenticação do Google Earth Engine para deploy (conta de serviço)
+        credentials_json = _credentials_json()
+        if credentials_json:
+            credentials = ee.ServiceAccountCredentials(
+                json.loads(credentials_json)["client_email"],
+                key_data=credentials_json
+            )
+            ee.Initialize(credentials)
+        else:
+            # Fallback para autenticação local (útil para desenvolvimento local)
+            try:
+                ee.Initialize()
+            except Exception as e:
+                ee.Authenticate()
+                ee.Initialize()
+
+    # ---------------- Regiões ----------------
+
+    def feature_collection(self, asset_id):
+        return ee.FeatureCollection(asset_id)
+
+    def filter_eq(self, fc, prop, value):
+        return fc.filter(ee.Filter.eq(prop, value))
+
+    def filter_in(self, fc, prop, values):
+        return fc.filter(ee.Filter.inList(prop, list(values)))
+
+    def aggregate_array(self, fc, prop):
+        return fc.aggregate_array(prop)
+
+    def geometry(self, fc):
+        return fc.geometry()
+
+    def area(self, roi):
+        return roi.area(maxError=100)
+
+    def simplify_features(self, fc, max_error):
+        return fc.map(lambda f: f.simplify(max_error))
+
+    def geometry_from_geojson(self, geojson):
+        return ee.Geometry(geojson)
+
+    def feature_collection_from_geometry(self, roi, properties=None):
+        return ee.FeatureCollection([ee.Feature(roi, properties or {})])
+
+    # ---------------- Coleções de imagens ----------------
+
+    def image_collection(self, dataset_id):
+        return ee.ImageCollection(dataset_id)
+
+    def select(self, collection, band):
+        return collection.select(band)
+
+    def filter_date(self, collection, start, end):
+        return collection.filterDate(str(start), str(end))
+
+    def filter_bounds(self, collection, roi):
+        return collection.filterBounds(roi)
+
+    def rescale(self, collection, multiply=1.0, add=0.0):
+        def rescale_image(img):
+            return img.multiply(multiply).add(add).copyProperties(img, img.propertyNames())
+        return collection.map(rescale_image)
+
+    def latest_time(self, collection):
+        return collection.aggregate_max("system:time_start")
+
+    def composite(self, collection, start, end, aggregator):
+        return aggregate_collection(collection.filterDate(str(start), str(end)), aggregator)
+
+    def clip(self, image, roi):
+        return image.clip(roi)
+
+    def reduce_region(self, image, roi, reducer, scale, tile_scale=1, best_effort=False):
+        return image.reduceRegion(
+            reducer=REDUCERS[reducer](),
+            geometry=roi,
+            scale=scale,
+            maxPixels=1e9,
+            tileScale=tile_scale,
+            bestEffort=best_effort
+        )
+
+    def reduce_stats(self, image, roi, percentiles, scale, tile_scale=1, best_effort=False):
+        reducer = ee.Reducer.minMax().combine(ee.Reducer.percentile(list(percentiles)), sharedInputs=True)
+        return image.reduceRegion(
+            reducer=reducer,
+            geometry=roi,
+            scale=scale,
+            maxPixels=1e9,
+            tileScale=tile_scale,
+            bestEffort=best_effort
+        )
+
+    def get_property(self, dictionary, key):
+        return ee.Dictionary(dictionary).get(key)
+
+    # ---------------- Séries mensais ----------------
+
+    def monthly_images(self, collection, start_year, start_month, n_months, aggregator):
+        origin = ee.Date.fromYMD(start_year, start_month, 1)
+
+        def create_monthly_image(offset):
+            start = origin.advance(offset, "month")
+            end = start.advance(1, "month")
+            image = aggregate_collection(collection.filterDate(start, end), aggregator)
+            return image.set({
+                "year": start.get("year"),
+                "month": start.get("month"),
+                "ym": start.get("year").multiply(100).add(start.get("month")),
+                # Meses sem imagens resultam em uma imagem sem bandas
+                "nbands": image.bandNames().size(),
+                "system:time_start": start.millis(),
+            })
+
+        offsets = ee.List.sequence(0, n_months - 1)
+        return ee.ImageCollection.fromImages(offsets.map(create_monthly_image))
+
+    def reduce_monthly_images(self, images, band, roi, n_months, scale, tile_scale=1, best_effort=False):
+        def reduce_image(image):
+            stats = ee.Image(image).reduceRegion(
+                reducer=ee.Reducer.mean(),
+                geometry=roi,
+                scale=scale,
+                maxPixels=1e9,
+                tileScale=tile_scale,
+                bestEffort=best_effort
+            )
+            # Meses sem imagens resultam em uma imagem sem bandas: devolve nulo
+            return ee.Algorithms.If(stats.contains(band), stats.get(band), None)
+
+        return images.toList(n_months).map(reduce_image)
+
+    def reduce_monthly_rows(self, images, roi, bands, n_months, scale, tile_scale=1, best_effort=False):
+        def reduce_image(image):
+            image = ee.Image(image)
+            stats = image.reduceRegion(
+                reducer=ee.Reducer.mean(),
+                geometry=roi,
+                scale=scale,
+                maxPixels=1e9,
+                tileScale=tile_scale,
+                bestEffort=best_effort
+            )
+            # Uma lista por mês: nulos são preservados (reduceColumns descartaria a linha inteira)
+            return ee.List([image.get('year'), image.get('month')] + [stats.get(band) for band in bands])
+
+        return images.toList(n_months).map(reduce_image)
+
+    def reduce_climatology(self, images, band, roi, scale, tile_scale=1, best_effort=False):
+        def reduce_image(image):
+            stats = image.reduceRegion(
+                reducer=ee.Reducer.mean(),
+                geometry=roi,
+                scale=scale,
+                maxPixels=1e9,
+                tileScale=tile_scale,
+                bestEffort=best_effort
+            )
+            return ee.Feature(None, {'month': image.get('month'), 'value': stats.get(band)})
+
+        # Uma feição (mês, valor) por imagem mensal; meses sem dados ficam de fora do agrupamento
+        rows = ee.FeatureCollection(self.filter_nonempty(images).map(reduce_image)) \
+            .filter(ee.Filter.notNull(['value']))
+        reducer = ee.Reducer.mean() \
+            .combine(ee.Reducer.stdDev(), sharedInputs=True) \
+            .combine(ee.Reducer.count(), sharedInputs=True) \
+            .group(groupField=1, groupName='month')
+        return ee.List(rows.reduceColumns(reducer, ['value', 'month']).get('groups'))
+
+    def filter_nonempty(self, images):
+        # nbands é gravado por monthly_images: o filtro não precisa de um map extra
+        return images.filter(ee.Filter.gt('nbands', 0))
+
+    def join_monthly(self, left, right, band):
+        # Uma única junção pela chave ym, em vez de um filtro em right para cada imagem de left
+        pairs = ee.Join.inner('primary', 'secondary').apply(
+            self.filter_nonempty(left), self.filter_nonempty(right),
+            ee.Filter.equals(leftField='ym', rightField='ym')
+        )
+
+        def add_band(pair):
+            image = ee.Image(pair.get('primary'))
+            return image.addBands([ee.Image(pair.get('secondary')).rename(band)])
+
+        return ee.ImageCollection(pairs.map(add_band))
+
+    def band_difference(self, images, a, b, name):
+        def add_difference(image):
+            return image.addBands([image.select(a).subtract(image.select(b)).rename(name)])
+
+        return images.map(add_difference)
+
+    def reduce_regions(self, images, fc, reducer, scale, tile_scale=1, geometry=True):
+        def stats(image):
+            reduce = image.reduceRegions(**{
+                'collection': fc,
+                'reducer': REDUCERS[reducer](),
+                'scale': scale,
+                'tileScale': tile_scale
+            })
+
+            # Um único map: year/month (e a remoção da geometria) em cada feição
+            year, month = image.get('year'), image.get('month')
+            if geometry:
+                reduce = reduce.map(lambda f: f.set({'year': year, 'month': month}))
+            else:
+                reduce = reduce.map(lambda f: f.set({'year': year, 'month': month}).setGeometry(None))
+
+            return reduce.copyProperties(image, image.propertyNames())
+
+        return images.map(stats).flatten()
+
+    # ---------------- Pixels ----------------
+
+    def get_pixels(self, images, band, roi, bounds, n_months, scale):
+        west, south, east, north = bounds
+        step = scale / METERS_PER_DEGREE
+        width, height = max(math.ceil((east - west) / step), 1), max(math.ceil((north - south) / step), 1)
+        grid = {
+            "dimensions": {"width": width, "height": height},
+            "affineTransform": {"scaleX": step, "shearX": 0, "translateX": west,
+                                "shearY": 0, "scaleY": -step, "translateY": north},
+            "crsCode": "EPSG:4326",
+        }
+
+        # Uma banda float por mês; meses sem imagens e pixels fora da ROI recebem NODATA
+        def month_band(image):
+            image = ee.Image(image)
+            band_image = ee.Image(ee.Algorithms.If(
+                ee.Number(image.get("nbands")).gt(0), image.select([band]),
+                ee.Image.constant(0).rename(band).updateMask(0)
+            ))
+            return band_image.toFloat().clip(roi).unmask(NODATA, False)
+
+        # Meses por requisição, dentro do limite de tamanho da resposta
+        per_request = max(1, min(MAX_PIXEL_BANDS, MAX_PIXEL_BYTES // (width * height * 4)))
+        chunks = []
+        for offset in range(0, n_months, per_request):
+            count = min(per_request, n_months - offset)
+            stack = ee.ImageCollection(images.toList(count, offset).map(month_band)).toBands()
+            started = time.perf_counter()
+            array = ee.data.computePixels({"expression": stack, "fileFormat": "NUMPY_NDARRAY", "grid": grid})
+            self._record_call(array.nbytes, time.perf_counter() - started)
+            # Array estruturado (linhas × colunas) com um campo por banda, na ordem da coleção
+            chunks.append(np.stack([array[name] for name in array.dtype.names]).astype(np.float32))
+
+        values = np.concatenate(chunks)
+        values[values == NODATA] = np.nan
+        return values
+
+    # ---------------- Mapas ----------------
+
+    def expression_key(self, obj):
+        return obj.serialize()
+
+    def outline(self, roi, width=2):
+        return ee.Image().byte().paint(ee.FeatureCollection([ee.Feature(roi)]), 1, width)
+
+    def bounds(self, roi):
+        ring = ee.List(roi.bounds(maxError=100).coordinates().get(0))
+        lower_left, upper_right = ee.List(ring.get(0)), ee.List(ring.get(2))
+        return ee.List([lower_left.get(0), lower_left.get(1), upper_right.get(0), upper_right.get(1)])
+
+    def visualize(self, layers):
+        return ee.ImageCollection([ee.Image(image).visualize(**vis_params) for image, vis_params in layers]).mosaic()
+
+    def get_tile_url(self, image, vis_params):
+        started = time.perf_counter()
+        map_id = ee.Image(image).getMapId(vis_params)
+        self._record_call(seconds=time.perf_counter() - started)
+        return map_id["tile_fetcher"].url_format
+
+    def get_thumbnail_url(self, image, roi, dimensions):
+        started = time.perf_counter()
+        url = ee.Image(image).getThumbURL({"region": roi, "dimensions": dimensions, "format": "png"})
+        self._record_call(seconds=time.perf_counter() - started)
+        return url
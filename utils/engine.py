@@ -0,0 +1,192 @@
+# Motor de séries compartilhado pelas páginas
+#
+# A partir de uma entrada do registro (utils/datasets.py), da ROI e do período, devolve as
+# séries mensal e anual do município: primeiro no armazenamento pré-calculado (nenhuma
+# chamada ao EE), depois no cache local de séries (SQLite), que só busca no EE os meses
+# ausentes. As chaves de cache usam o ID da coleção, a banda, a região e a escala, de modo
+# que páginas diferentes que pedem a mesma série compartilham os resultados. Também monta
+# as imagens anuais dos mapas e as respectivas estatísticas de visualização, e a
+# climatologia mensal (12 linhas) do modo de análise rápido, e o modo "cubo local", em que os
+# pixels da ROI são baixados uma única vez e tudo é calculado com NumPy (utils/cube.py).
+#
+# Os resultados ficam no cache de resultados do processo (utils/resultcache.py, com orçamento
+# em bytes e validade menor para períodos com meses recentes), e cada cálculo passa pela
+# camada de coalescência (utils/singleflight.py): sessões que pedem ao mesmo tempo a mesma
+# chave (conjunto de dados, ROI, período e plano de redução) esperam um único cálculo em
+# andamento. Os resultados são compartilhados entre sessões e não devem ser alterados pelas
+# páginas (use .copy()).
+
+from collections import namedtuple
+from datetime import date
+
+from utils.backend import get_backend
+from utils.cube import annual_composites, describe_cube, fetch_cube, monthly_frame
+from utils.datasets import get_dataset
+from utils.maps import roi_bounds
+from utils.planner import describe_plan
+from utils.precomputed import describe_precomputed, load_series
+from utils.series import (annual_from_monthly, cached_monthly_series, climatology_from_monthly,
+                          dataset_collection, month_range, monthly_climatology, monthly_table,
+                          water_balance_images)
+from utils.resultcache import get_result_cache, period_ttl, year_ttl
+from utils.singleflight import coalesce
+from utils.vizstats import get_viz_stats
+
+# Resultado de uma série: tabelas mensal e anual, coleção usada (mapas), legenda dos gráficos
+# e origem ("precomputed" ou "live"); extraction traz bytes/tempos da extração (depuração)
+SeriesResult = namedtuple("SeriesResult", ["monthly", "annual", "collection", "caption", "source", "extraction"])
+
+# Modos de análise das páginas: completa (séries, mapas e estatísticas), apenas a climatologia
+# mensal, calculada no servidor em uma única requisição, ou o cubo de pixels local
+ANALYSIS_MODES = {
+    "Completa (séries, mapas e estatísticas)": "full",
+    "Climatologia mensal (uma requisição)": "climatology",
+    "Cubo local (pixels baixados uma vez)": "cube",
+}
+
+# Resultado da climatologia: tabela de 12 linhas (month, valor médio, std, count), legenda e origem
+ClimatologyResult = namedtuple("ClimatologyResult", ["table", "caption", "source"])
+
+
+# Resultado do cubo local: série (SeriesResult, médias zonais), cubo de pixels, composições anuais
+# por pixel (anos, array anos × linhas × colunas) e climatologia, todos calculados localmente
+CubeResult = namedtuple("CubeResult", ["series", "cube", "years", "annual_images", "climatology"])
+
+
+def _region(state, municipality):
+    return f"{state}/{municipality}"
+
+
+# Busca no cache de resultados; na falta, calcula uma única vez para as sessões simultâneas
+def _shared(key, ttl, fn, *args):
+    return get_result_cache().get_or_compute(key, lambda: coalesce(key, fn, *args), ttl)
+
+
+# Função para obter as séries mensal e anual de um conjunto de dados do registro sobre um município
+def dataset_series(dataset, state, municipality, roi, start_date, end_date, plan, backend=None):
+    dataset = get_dataset(dataset)
+    backend = backend or get_backend()
+    key = ("series", backend.name, dataset.key, state, municipality, start_date, end_date, plan)
+    return _shared(key, period_ttl(end_date), _dataset_series, dataset, state, municipality, roi, start_date,
+                   end_date, plan, backend)
+
+
+def _dataset_series(dataset, state, municipality, roi, start_date, end_date, plan, backend):
+    collection = dataset_collection(dataset, start_date, end_date, roi, backend)
+
+    monthly = load_series(dataset.key, state, municipality, start_date, end_date)
+    if monthly is not None:
+        caption, source = describe_precomputed(monthly), "precomputed"
+    else:
+        monthly = cached_monthly_series(collection, dataset.id, dataset.band, _region(state, municipality), roi,
+                                        start_date, end_date, aggregator=dataset.aggregator, scale=plan.scale,
+                                        value_name=dataset.value_name, backend=backend,
+                                        tile_scale=plan.tile_scale, best_effort=plan.best_effort)
+        caption, source = describe_plan(plan), "live"
+
+    annual = annual_from_monthly(monthly, dataset.value_name, aggregator=dataset.aggregator, weights=dataset.weights)
+    return SeriesResult(monthly, annual, collection, caption, source, None)
+
+
+# Função para obter a climatologia mensal (média, desvio-padrão e número de anos de cada mês do
+# calendário): do armazenamento pré-calculado, se o período estiver coberto; senão, um redutor
+# agrupado por mês no servidor, em uma única chamada
+def dataset_climatology(dataset, state, municipality, roi, start_date, end_date, plan, backend=None):
+    dataset = get_dataset(dataset)
+    backend = backend or get_backend()
+    key = ("climatology", backend.name, dataset.key, state, municipality, start_date, end_date, plan)
+    return _shared(key, period_ttl(end_date), _dataset_climatology, dataset, state, municipality, roi, start_date,
+                   end_date, plan, backend)
+
+
+def _dataset_climatology(dataset, state, municipality, roi, start_date, end_date, plan, backend):
+    monthly = load_series(dataset.key, state, municipality, start_date, end_date)
+    if monthly is not None:
+        table = climatology_from_monthly(monthly, dataset.value_name)
+        return ClimatologyResult(table, describe_precomputed(monthly), "precomputed")
+
+    collection = dataset_collection(dataset, start_date, end_date, roi, backend)
+    table = monthly_climatology(collection, dataset.band, roi, start_date, end_date,
+                                aggregator=dataset.aggregator, scale=plan.scale, value_name=dataset.value_name,
+                                backend=backend, tile_scale=plan.tile_scale, best_effort=plan.best_effort)
+    return ClimatologyResult(table, describe_plan(plan), "live")
+
+
+# Função para baixar o cubo de pixels mensais da ROI (uma requisição de pixels) e calcular
+# localmente a série, as composições anuais por pixel e a climatologia
+def dataset_cube(dataset, state, municipality, roi, start_date, end_date, plan, backend=None):
+    dataset = get_dataset(dataset)
+    backend = backend or get_backend()
+    key = ("cube", backend.name, dataset.key, state, municipality, start_date, end_date, plan)
+    return _shared(key, period_ttl(end_date), _dataset_cube, dataset, state, municipality, roi, start_date,
+                   end_date, plan, backend)
+
+
+def _dataset_cube(dataset, state, municipality, roi, start_date, end_date, plan, backend):
+    collection = dataset_collection(dataset, start_date, end_date, roi, backend)
+    months = month_range(start_date, end_date)
+    start_year, start_month = months[0]
+    images = backend.monthly_images(collection, start_year, start_month, len(months), dataset.aggregator)
+    cube = fetch_cube(images, dataset.band, roi, roi_bounds(backend, roi), months, plan.scale, backend)
+
+    monthly = monthly_frame(cube, dataset.value_name)
+    annual = annual_from_monthly(monthly, dataset.value_name, aggregator=dataset.aggregator, weights=dataset.weights)
+    years, annual_images = annual_composites(cube, dataset.aggregator, dataset.weights)
+    caption = f"{describe_cube(cube)} {describe_plan(plan)}"
+    series = SeriesResult(monthly, annual, collection, caption, "cube", None)
+    return CubeResult(series, cube, years, annual_images, climatology_from_monthly(monthly, dataset.value_name))
+
+
+# Função para obter a série mensal de P, ET e balanço hídrico (P - ET) de anos completos
+# [start_year, end_year); os meses sem precipitação ou ET ficam de fora
+def water_balance_series(state, municipality, roi, start_year, end_year, plan, backend=None):
+    backend = backend or get_backend()
+    key = ("water_balance", backend.name, state, municipality, start_year, end_year, plan)
+    return _shared(key, year_ttl(end_year - 1), _water_balance_series, state, municipality, roi, start_year,
+                   end_year, plan, backend)
+
+
+def _water_balance_series(state, municipality, roi, start_year, end_year, plan, backend):
+    start_date, end_date = date(start_year, 1, 1), date(end_year - 1, 12, 31)
+
+    monthly = load_series("evapotranspiracao", state, municipality, start_date, end_date)
+    if monthly is not None:
+        monthly = monthly.dropna(subset=["ET", "water_balance"]).reset_index(drop=True)
+        return SeriesResult(monthly, None, None, describe_precomputed(monthly), "precomputed", None)
+
+    precipitation = dataset_collection("precipitacao_pentadal", start_date, end_date, roi, backend)
+    et = dataset_collection("evapotranspiracao", start_date, end_date, roi, backend)
+    n_months = (end_year - start_year) * 12
+    images = water_balance_images(precipitation, et, start_year, 1, n_months, backend=backend)
+    # Resposta compacta: uma lista [ano, mês, P, ET, P - ET] por mês, sem a geometria do município
+    monthly, extraction = monthly_table(images, roi, ["precipitation", "ET", "water_balance"], n_months,
+                                        plan.scale, backend=backend,
+                                        tile_scale=plan.tile_scale, best_effort=plan.best_effort)
+    return SeriesResult(monthly, None, None, describe_plan(plan), "live", extraction)
+
+
+# Função para montar a imagem anual (soma ou média do ano, conforme o registro) recortada na ROI
+def annual_image(dataset, collection, year, roi, backend=None):
+    dataset = get_dataset(dataset)
+    backend = backend or get_backend()
+    image = backend.composite(collection, date(year, 1, 1), date(year + 1, 1, 1), dataset.aggregator)
+    return backend.clip(image, roi)
+
+
+# Função para obter o trecho do ano coberto pelo período (primeiro e último dia)
+# A coleção é filtrada pelo período, então o primeiro e o último ano podem ser composições parciais
+def year_window(year, start_date, end_date):
+    return max(date(year, 1, 1), start_date), min(date(year, 12, 31), end_date)
+
+
+# Função para obter as estatísticas de visualização da imagem anual (uma chamada, em cache)
+# start_date, end_date: período da análise (as chaves usam o trecho do ano coberto por ele)
+def annual_viz_stats(dataset, image, year, start_date, end_date, state, municipality, roi, plan, backend=None):
+    dataset = get_dataset(dataset)
+    backend = backend or get_backend()
+    first, last = year_window(year, start_date, end_date)
+    window = (first.isoformat(), last.isoformat())
+    key = ("viz_stats", backend.name, dataset.key, year, window, state, municipality, plan)
+    stats_key = (dataset.id, year, window, _region(state, municipality))
+    return coalesce(key, get_viz_stats, backend, image, dataset.band, stats_key, roi, plan.scale,
+                    tile_scale=plan.tile_scale, best_effort=plan.best_effort, ttl=period_ttl(last))
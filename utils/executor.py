@@ -0,0 +1,108 @@
+# Executor compartilhado para chamadas independentes ao Earth Engine
+#
+# Quando não é possível agrupar o trabalho em uma única requisição no servidor
+# (blocos de uma série longa, meses ausentes do cache, parâmetros de visualização...),
+# as chamadas são executadas em um pool limitado de threads, com:
+# - limite global de requisições por segundo (ratelim), compartilhado por todas as sessões;
+# - novas tentativas com espera exponencial em erros de cota do EE (tenacity);
+# - resultados devolvidos na ordem de submissão;
+# - o contexto de quem submeteu (contextvars) propagado para a thread, de modo que as chamadas
+#   sejam atribuídas à etapa da página que as originou (ver utils/instrumentation.py).
+
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ratelim
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+# Configuração padrão (pode ser alterada por variáveis de ambiente)
+MAX_WORKERS = int(os.environ.get("AGROMET_MAX_WORKERS", "8"))
+REQUESTS_PER_SECOND = float(os.environ.get("AGROMET_RPS", "10"))
+MAX_ATTEMPTS = 6
+
+# Mensagens de erro do EE que indicam cota/limite de taxa (vale a pena tentar de novo). O número
+# 429 sozinho não é critério: aparece em contagens de pixels, IDs de assets e anos; o status HTTP
+# é verificado à parte (_status_code)
+QUOTA_ERROR_PATTERN = re.compile(
+    r"too many concurrent|too many requests|quota exceeded|exceeded .*quota|rate limit",
+    re.IGNORECASE,
+)
+QUOTA_STATUS_CODES = (429,)
+
+
+# Status HTTP de um erro, quando disponível (googleapiclient.errors.HttpError, requests...)
+def _status_code(exc):
+    for owner in (exc, getattr(exc, "resp", None), getattr(exc, "response", None)):
+        for attribute in ("status_code", "status"):
+            value = getattr(owner, attribute, None)
+            if isinstance(value, (int, str)) and str(value).isdigit():
+                return int(value)
+    return None
+
+
+# Função para identificar erros de cota/limite de taxa do Earth Engine
+def is_quota_error(exc):
+    if _status_code(exc) in QUOTA_STATUS_CODES:
+        return True
+    return QUOTA_ERROR_PATTERN.search(str(exc)) is not None
+
+
+class RequestExecutor:
+    def __init__(self, max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND,
+                 max_attempts=MAX_ATTEMPTS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ee-request")
+        # ratelim.patient espaça as chamadas em 1/rps segundos; o lock o torna seguro entre threads
+        self._throttle = ratelim.patient(1, 1.0 / requests_per_second)(lambda: None)
+        self._throttle_lock = threading.Lock()
+        self._retrying = retry(
+            retry=retry_if_exception(is_quota_error),
+            wait=wait_random_exponential(multiplier=1, max=30),
+            stop=stop_after_attempt(max_attempts),
+            reraise=True,
+        )
+
+    # Aguarda a vez da próxima requisição, respeitando o limite global
+    def _wait_turn(self):
+        with self._throttle_lock:
+            self._throttle()
+
+    def _call(self, fn, args, kwargs):
+        @self._retrying
+        def attempt():
+            self._wait_turn()
+            return fn(*args, **kwargs)
+        return attempt()
+
+    # Agenda uma chamada (com limite de taxa e novas tentativas) e devolve um Future
+    def submit(self, fn, *args, **kwargs):
+        context = contextvars.copy_context()
+        return self._pool.submit(context.run, self._call, fn, args, kwargs)
+
+    # Executa fn para cada item em paralelo e devolve os resultados na ordem de submissão
+    def map(self, fn, *iterables):
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        return [future.result() for future in futures]
+
+    # Atalho: traz vários objetos do servidor em paralelo (getInfo de cada um)
+    def get_info_all(self, backend, objects):
+        return self.map(backend.get_info, objects)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# Função para obter o executor compartilhado do processo (todas as sessões do Streamlit)
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RequestExecutor()
+        return _executor
@@ -0,0 +1,538 @@
+# Backend local com rasters sintéticos em NumPy (sem conta no Google Earth Engine)
+#
+# Simula os conjuntos de dados usados pelas páginas (CHIRPS diário/pentadal, MOD11A2 e
+# MOD16A2GF) com campos analíticos determinísticos, avaliados apenas sobre a ROI e na
+# escala pedida. Como no Earth Engine, nada é calculado até get_info, que conta a
+# ida e volta e aplica a latência configurada.
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, replace
+from datetime import date
+
+import numpy as np
+
+from utils.backend import Backend
+
+# Metros por grau (aproximação usada para converter a escala de redução em graus)
+METERS_PER_DEGREE = 111320.0
+
+# Estados e municípios sintéticos: lado (graus) do quadrado de cada município
+SYNTHETIC_STATES = {
+    "Minas Gerais": (-19.9, -44.0),
+    "Pará": (-3.5, -52.0),
+    "Rio Grande do Sul": (-29.7, -53.2),
+}
+SYNTHETIC_MUNICIPALITY_SIZES = [0.05, 0.1, 0.25, 0.5, 1.0, 2.0]
+
+# Número de vértices do contorno de cada município (imita o peso das geometrias reais)
+SYNTHETIC_VERTICES = 2000
+
+
+# ---------------- Campos sintéticos ----------------
+
+# Ruído determinístico em [0, 1) a partir de um índice inteiro (mesmo valor para o mesmo dia)
+def _hash_noise(index, seed):
+    x = np.sin(np.asarray(index, dtype=float) * 12.9898 + seed * 78.233) * 43758.5453
+    return x - np.floor(x)
+
+
+def _phase(dates):
+    doy = (dates - dates.astype("datetime64[Y]")).astype(int)
+    return 2 * np.pi * doy / 365.25
+
+
+def _day_index(dates):
+    return dates.astype("datetime64[D]").astype(int)
+
+
+# Precipitação diária (mm): estação chuvosa no verão austral, ~40% de dias secos
+def _chirps_daily(dates, lat, lon, seed):
+    days = _day_index(dates)
+    seasonal = 1.0 + 0.8 * np.cos(_phase(dates))
+    wet = _hash_noise(days, seed) > 0.4
+    amount = -np.log1p(-_hash_noise(days, seed + 1) * 0.999)
+    spatial = np.clip(4.0 + 2.0 * np.sin(lon / 3.0) * np.cos(lat / 4.0), 0.5, None)
+    return (seasonal * wet * amount)[:, None, None] * spatial[None]
+
+
+# Precipitação pentadal (mm): soma de cinco dias sintéticos
+def _chirps_pentad(dates, lat, lon, seed):
+    return sum(_chirps_daily(dates + np.timedelta64(k, "D"), lat, lon, seed) for k in range(5))
+
+
+# Temperatura da superfície (valor bruto MOD11A2: Kelvin / 0.02)
+def _mod11_lst(dates, lat, lon, seed):
+    seasonal = 4.0 * np.cos(_phase(dates)) + 1.5 * (_hash_noise(_day_index(dates), seed) - 0.5)
+    spatial = 30.0 - 0.4 * (np.abs(lat) - 10.0) + 2.0 * np.sin(lon / 2.0)
+    celsius = seasonal[:, None, None] + spatial[None]
+    return (celsius + 273.15) / 0.02
+
+
+# Evapotranspiração em 8 dias (valor bruto MOD16A2GF: 0.1 kg/m²)
+def _mod16_et(dates, lat, lon, seed):
+    seasonal = 25.0 + 10.0 * np.cos(_phase(dates)) + 4.0 * (_hash_noise(_day_index(dates), seed) - 0.5)
+    spatial = 0.6 + 0.4 * np.sin(lat / 5.0 + lon / 7.0) ** 2
+    return seasonal[:, None, None] * spatial[None] * 10.0
+
+
+def _daily_dates(start, end):
+    return np.arange(start, end, dtype="datetime64[D]")
+
+
+def _pentad_dates(start, end):
+    days = _daily_dates(start, end)
+    day_of_month = (days - days.astype("datetime64[M]")).astype(int) + 1
+    return days[np.isin(day_of_month, [1, 6, 11, 16, 21, 26])]
+
+
+def _eight_day_dates(start, end):
+    days = _daily_dates(start, end)
+    doy = (days - days.astype("datetime64[Y]")).astype(int)
+    return days[doy % 8 == 0]
+
+
+@dataclass(frozen=True)
+class SyntheticDataset:
+    band: str
+    first_date: str
+    resolution: float
+    dates: object
+    values: object
+    lag_days: int = 0  # atraso de publicação: dias recentes ainda sem imagens
+
+
+DATASETS = {
+    "UCSB-CHG/CHIRPS/DAILY": SyntheticDataset("precipitation", "1981-01-01", 5566, _daily_dates, _chirps_daily, 20),
+    "UCSB-CHG/CHIRPS/PENTAD": SyntheticDataset("precipitation", "1981-01-01", 5566, _pentad_dates, _chirps_pentad, 20),
+    "MODIS/006/MOD11A2": SyntheticDataset("LST_Day_1km", "2000-02-18", 1000, _eight_day_dates, _mod11_lst, 9),
+    "MODIS/061/MOD16A2GF": SyntheticDataset("ET", "2001-01-01", 500, _eight_day_dates, _mod16_et, 30),
+}
+
+
+# ---------------- Objetos "do servidor" ----------------
+
+@dataclass(frozen=True)
+class _Geometry:
+    bbox: tuple  # (oeste, sul, leste, norte)
+
+    def to_geojson(self, vertices=5):
+        west, south, east, north = self.bbox
+        # Contorno elíptico inscrito no retângulo, com o número de vértices pedido
+        angles = np.linspace(0, 2 * np.pi, max(vertices, 4))
+        cx, cy = (west + east) / 2, (south + north) / 2
+        ring = np.column_stack([cx + (east - west) / 2 * np.cos(angles), cy + (north - south) / 2 * np.sin(angles)])
+        return {"type": "Polygon", "coordinates": [ring.round(6).tolist()]}
+
+
+def _union(bboxes):
+    bboxes = list(bboxes)
+    if not bboxes:
+        return None
+    return (min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+            max(b[2] for b in bboxes), max(b[3] for b in bboxes))
+
+
+# Percorre as coordenadas (x, y) de qualquer geometria GeoJSON
+def _flatten_coordinates(coordinates):
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        yield coordinates[:2]
+        return
+    for item in coordinates:
+        yield from _flatten_coordinates(item)
+
+
+@dataclass(frozen=True)
+class _Features:
+    features: tuple  # ({"properties": {...}, "bbox": (...)}, ...)
+
+
+@dataclass(frozen=True)
+class _Collection:
+    dataset: str
+    band: str
+    start: object = None
+    end: object = None
+    multiply: float = 1.0
+    add: float = 0.0
+    seed: int = 0
+
+    def dates(self):
+        spec = DATASETS[self.dataset]
+        start = np.datetime64(spec.first_date, "D")
+        if self.start is not None:
+            start = max(start, self.start)
+        end = np.datetime64(date.today(), "D") - np.timedelta64(spec.lag_days, "D")
+        if self.end is not None:
+            end = min(end, self.end)
+        if end <= start:
+            return np.array([], dtype="datetime64[D]")
+        return spec.dates(start, end)
+
+    def sample(self, dates, lat, lon):
+        raw = DATASETS[self.dataset].values(dates, lat, lon, self.seed)
+        return raw * self.multiply + self.add
+
+
+@dataclass(frozen=True)
+class _Image:
+    bands: tuple  # ((nome, função(lat, lon) -> 2D), ...)
+    properties: tuple = ()
+    clip_bbox: tuple = None
+    expression: tuple = ()  # descrição determinística da imagem (chave dos caches de tiles)
+
+    @property
+    def band_names(self):
+        return [name for name, _ in self.bands]
+
+    def prop(self, key):
+        return dict(self.properties).get(key)
+
+    def sample(self, lat, lon):
+        values = {}
+        for name, function in self.bands:
+            array = np.asarray(function(lat, lon), dtype=float)
+            if self.clip_bbox is not None:
+                west, south, east, north = self.clip_bbox
+                inside = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+                array = np.where(inside, array, np.nan)
+            values[name] = array
+        return values
+
+
+@dataclass(frozen=True)
+class _ImageList:
+    images: tuple
+
+
+class _Lazy:
+    def __init__(self, compute):
+        self.compute = compute
+
+
+def _to_datetime64(value):
+    return np.datetime64(str(value)[:10], "D")
+
+
+# Grade de centros de pixel (alinhada à origem global) dentro do retângulo, na escala em metros
+def _pixel_grid(bbox, scale):
+    step = scale / METERS_PER_DEGREE
+    west, south, east, north = bbox
+    lons = (np.arange(np.ceil(west / step - 0.5), np.floor(east / step - 0.5) + 1) + 0.5) * step
+    lats = (np.arange(np.ceil(south / step - 0.5), np.floor(north / step - 0.5) + 1) + 0.5) * step
+    lat, lon = np.meshgrid(lats, lons, indexing="ij")
+    return lat, lon
+
+
+def _composite_function(collection, dates, aggregator):
+    def function(lat, lon):
+        stack = collection.sample(dates, lat, lon)
+        return stack.sum(axis=0) if aggregator == "sum" else stack.mean(axis=0)
+    return function
+
+
+def _reduce_arrays(values, reducer):
+    result = {}
+    for name, array in values.items():
+        valid = array[~np.isnan(array)]
+        if reducer == "mean":
+            result[name] = float(valid.mean()) if valid.size else None
+        elif reducer == "minMax":
+            result[f"{name}_min"] = float(valid.min()) if valid.size else None
+            result[f"{name}_max"] = float(valid.max()) if valid.size else None
+        else:
+            raise ValueError(f"Redutor desconhecido: {reducer}")
+    return result
+
+
+class FakeBackend(Backend):
+    name = "local"
+
+    def __init__(self, latency=0.0, seed=0, municipality_sizes=None, vertices=SYNTHETIC_VERTICES):
+        super().__init__()
+        self.latency = latency
+        self.seed = seed
+        self.vertices = vertices
+        self.catalog = self._build_catalog(municipality_sizes or SYNTHETIC_MUNICIPALITY_SIZES)
+
+    # Catálogo sintético: cada estado recebe municípios quadrados de tamanhos crescentes
+    def _build_catalog(self, sizes):
+        municipalities = []
+        code = 1000000
+        for state, (lat, lon) in SYNTHETIC_STATES.items():
+            offset = 0.0
+            for i, size in enumerate(sizes, start=1):
+                west = lon + offset
+                municipalities.append({
+                    "properties": {"NM_UF": state, "NM_MUN": f"Município {i:02d} ({size:g}°)",
+                                   "CD_MUN": str(code + i)},
+                    "bbox": (west, lat, west + size, lat + size),
+                })
+                offset += size + 0.1
+            code += 1000000
+        states = [
+            {"properties": {"NM_UF": state},
+             "bbox": _union(m["bbox"] for m in municipalities if m["properties"]["NM_UF"] == state)}
+            for state in SYNTHETIC_STATES
+        ]
+        return {"states": tuple(states), "municipalities": tuple(municipalities)}
+
+    # Simula a ida e volta de ee.Initialize (autenticação e checagem do projeto)
+    def initialize(self):
+        if self.latency:
+            time.sleep(self.latency)
+        self._record_call()
+
+    def _get_info(self, obj):
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(obj, _Lazy):
+            return obj.compute()
+        if isinstance(obj, _Geometry):
+            return obj.to_geojson(self.vertices)
+        if isinstance(obj, _Features):
+            return {"type": "FeatureCollection", "features": [
+                {"type": "Feature", "geometry": _Geometry(f["bbox"]).to_geojson(self.vertices),
+                 "properties": dict(f["properties"])}
+                for f in obj.features
+            ]}
+        raise TypeError(f"Objeto não suportado por get_info: {type(obj).__name__}")
+
+    # ---------------- Regiões ----------------
+
+    def feature_collection(self, asset_id):
+        kind = "states" if "UF" in asset_id.split("/")[-1] else "municipalities"
+        return _Features(self.catalog[kind])
+
+    def filter_eq(self, fc, prop, value):
+        return _Features(tuple(f for f in fc.features if f["properties"].get(prop) == value))
+
+    def filter_in(self, fc, prop, values):
+        values = set(values)
+        return _Features(tuple(f for f in fc.features if f["properties"].get(prop) in values))
+
+    def aggregate_array(self, fc, prop):
+        return _Lazy(lambda: [f["properties"][prop] for f in fc.features if prop in f["properties"]])
+
+    def geometry(self, fc):
+        return _Geometry(_union(f["bbox"] for f in fc.features))
+
+    def area(self, roi):
+        # Área da elipse inscrita no retângulo (o contorno devolvido por to_geojson)
+        west, south, east, north = roi.bbox
+        width = (east - west) * METERS_PER_DEGREE * np.cos(np.radians((south + north) / 2))
+        height = (north - south) * METERS_PER_DEGREE
+        return _Lazy(lambda: float(np.pi / 4 * width * height))
+
+    def simplify_features(self, fc, max_error):
+        return fc
+
+    def geometry_from_geojson(self, geojson):
+        coordinates = np.array(list(_flatten_coordinates(geojson["coordinates"])))
+        return _Geometry((coordinates[:, 0].min(), coordinates[:, 1].min(),
+                          coordinates[:, 0].max(), coordinates[:, 1].max()))
+
+    def feature_collection_from_geometry(self, roi, properties=None):
+        return _Features(({"properties": dict(properties or {}), "bbox": roi.bbox},))
+
+    # ---------------- Coleções de imagens ----------------
+
+    def image_collection(self, dataset_id):
+        if dataset_id not in DATASETS:
+            raise ValueError(f"Conjunto de dados sem versão sintética: {dataset_id}")
+        return _Collection(dataset_id, DATASETS[dataset_id].band, seed=self.seed)
+
+    def select(self, collection, band):
+        if band != collection.band:
+            raise ValueError(f"Banda inexistente em {collection.dataset}: {band}")
+        return collection
+
+    def filter_date(self, collection, start, end):
+        start, end = _to_datetime64(start), _to_datetime64(end)
+        if collection.start is not None:
+            start = max(start, collection.start)
+        if collection.end is not None:
+            end = min(end, collection.end)
+        return replace(collection, start=start, end=end)
+
+    def filter_bounds(self, collection, roi):
+        # Os campos sintéticos cobrem todo o território: o filtro espacial não altera a coleção
+        return collection
+
+    def rescale(self, collection, multiply=1.0, add=0.0):
+        return replace(collection, multiply=collection.multiply * multiply,
+                       add=collection.add * multiply + add)
+
+    def latest_time(self, collection):
+        def compute():
+            dates = collection.dates()
+            if not len(dates):
+                return None
+            return int(dates[-1].astype("datetime64[ms]").astype(np.int64))
+        return _Lazy(compute)
+
+    def composite(self, collection, start, end, aggregator):
+        window = self.filter_date(collection, start, end)
+        dates = window.dates()
+        if dates.size == 0:
+            return _Image(())
+        return _Image(((collection.band, _composite_function(window, dates, aggregator)),),
+                      expression=("composite", repr(window), aggregator))
+
+    def clip(self, image, roi):
+        return replace(image, clip_bbox=roi.bbox)
+
+    def reduce_region(self, image, roi, reducer, scale, tile_scale=1, best_effort=False):
+        def compute():
+            lat, lon = _pixel_grid(roi.bbox, scale)
+            return _reduce_arrays(image.sample(lat, lon), reducer)
+        return _Lazy(compute)
+
+    def reduce_stats(self, image, roi, percentiles, scale, tile_scale=1, best_effort=False):
+        def compute():
+            lat, lon = _pixel_grid(roi.bbox, scale)
+            result = {}
+            for name, array in image.sample(lat, lon).items():
+                valid = array[~np.isnan(array)]
+                result.update(_reduce_arrays({name: array}, "minMax"))
+                for p in percentiles:
+                    result[f"{name}_p{p}"] = float(np.percentile(valid, p)) if valid.size else None
+            return result
+        return _Lazy(compute)
+
+    def get_property(self, dictionary, key):
+        return _Lazy(lambda: dictionary.compute().get(key))
+
+    # ---------------- Séries mensais ----------------
+
+    def monthly_images(self, collection, start_year, start_month, n_months, aggregator):
+        images = []
+        year, month = start_year, start_month
+        for _ in range(n_months):
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            image = self.composite(collection, date(year, month, 1), date(next_year, next_month, 1), aggregator)
+            images.append(replace(image, properties=(("year", year), ("month", month), ("ym", year * 100 + month),
+                                                     ("nbands", len(image.bands)))))
+            year, month = next_year, next_month
+        return _ImageList(tuple(images))
+
+    def reduce_monthly_images(self, images, band, roi, n_months, scale, tile_scale=1, best_effort=False):
+        def compute():
+            lat, lon = _pixel_grid(roi.bbox, scale)
+            return [_reduce_arrays(image.sample(lat, lon), "mean").get(band)
+                    for image in images.images[:n_months]]
+        return _Lazy(compute)
+
+    def reduce_monthly_rows(self, images, roi, bands, n_months, scale, tile_scale=1, best_effort=False):
+        def compute():
+            lat, lon = _pixel_grid(roi.bbox, scale)
+            rows = []
+            for image in images.images[:n_months]:
+                values = _reduce_arrays(image.sample(lat, lon), "mean")
+                rows.append([image.prop("year"), image.prop("month")] + [values.get(band) for band in bands])
+            return rows
+        return _Lazy(compute)
+
+    def reduce_climatology(self, images, band, roi, scale, tile_scale=1, best_effort=False):
+        def compute():
+            lat, lon = _pixel_grid(roi.bbox, scale)
+            by_month = {}
+            for image in self.filter_nonempty(images).images:
+                value = _reduce_arrays(image.sample(lat, lon), "mean").get(band)
+                if value is not None:
+                    by_month.setdefault(image.prop("month"), []).append(value)
+            return [{"month": month, "mean": float(np.mean(values)), "stdDev": float(np.std(values)),
+                     "count": len(values)}
+                    for month, values in sorted(by_month.items())]
+        return _Lazy(compute)
+
+    def filter_nonempty(self, images):
+        return _ImageList(tuple(image for image in images.images if image.bands))
+
+    def join_monthly(self, left, right, band):
+        by_month = {image.prop("ym"): image for image in self.filter_nonempty(right).images}
+        joined = []
+        for image in self.filter_nonempty(left).images:
+            other = by_month.get(image.prop("ym"))
+            if other is not None:
+                joined.append(replace(image, bands=image.bands + ((band, other.bands[0][1]),)))
+        return _ImageList(tuple(joined))
+
+    def band_difference(self, images, a, b, name):
+        def with_difference(image):
+            functions = dict(image.bands)
+            fa, fb = functions[a], functions[b]
+            return replace(image, bands=image.bands + ((name, lambda lat, lon: fa(lat, lon) - fb(lat, lon)),))
+        return _ImageList(tuple(with_difference(image) for image in images.images))
+
+    def reduce_regions(self, images, fc, reducer, scale, tile_scale=1, geometry=True):
+        def compute():
+            features = []
+            for feature in fc.features:
+                bbox = _Geometry(feature["bbox"])
+                lat, lon = _pixel_grid(bbox.bbox, scale)
+                geojson = bbox.to_geojson(self.vertices) if geometry else None
+                for image in images.images:
+                    properties = dict(feature["properties"])
+                    values = _reduce_arrays(image.sample(lat, lon), reducer)
+                    # Como no EE: com uma única banda, a saída leva o nome do redutor
+                    if len(image.bands) == 1 and reducer == "mean":
+                        values = {"mean": values[image.bands[0][0]]}
+                    properties.update(values)
+                    properties.update(year=image.prop("year"), month=image.prop("month"))
+                    features.append({"type": "Feature", "geometry": geojson, "properties": properties})
+            return {"type": "FeatureCollection", "features": features}
+        return _Lazy(compute)
+
+    # ---------------- Pixels ----------------
+
+    # Mesma grade das reduções (_pixel_grid): as médias zonais do cubo coincidem com reduce_region
+    def get_pixels(self, images, band, roi, bounds, n_months, scale):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        lat, lon = _pixel_grid(roi.bbox, scale)
+        values = np.full((n_months,) + lat.shape, np.nan, dtype=np.float32)
+        for i, image in enumerate(images.images[:n_months]):
+            if band in image.band_names:
+                values[i] = image.sample(lat, lon)[band]
+        # Linhas de norte para sul, como no EE
+        values = values[:, ::-1].copy()
+        self._record_call(values.nbytes, time.perf_counter() - started)
+        return values
+
+    # ---------------- Mapas ----------------
+
+    def expression_key(self, obj):
+        if isinstance(obj, _Image):
+            return repr((obj.expression, obj.clip_bbox)) if obj.expression else f"id:{id(obj)}"
+        return repr(obj)
+
+    def outline(self, roi, width=2):
+        return _Image((), expression=("outline", roi.bbox, width))
+
+    def bounds(self, roi):
+        return _Lazy(lambda: [float(value) for value in roi.bbox])
+
+    def visualize(self, layers):
+        return _Image((), expression=("visualize", tuple(
+            (self.expression_key(image), json.dumps(vis_params, sort_keys=True, default=str))
+            for image, vis_params in layers
+        )))
+
+    # Simula a requisição de map ID / miniatura (não há servidor de tiles local)
+    def _fake_url(self, *parts):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        self._record_call(seconds=time.perf_counter() - started)
+        return hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+
+    def get_tile_url(self, image, vis_params):
+        token = self._fake_url(self.expression_key(image), json.dumps(vis_params, sort_keys=True, default=str))
+        return f"https://tiles.invalid/{token}/{{z}}/{{x}}/{{y}}.png"
+
+    def get_thumbnail_url(self, image, roi, dimensions):
+        token = self._fake_url(self.expression_key(image), roi.bbox, dimensions)
+        return f"https://tiles.invalid/{token}/thumbnail.png"
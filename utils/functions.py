@@ -29,27 +29,19 @@
 
 # %%
 # Funções auxiliares para o aplicativo de monitoramento agrometeorológico
+# (o Earth Engine é inicializado uma única vez por processo, em utils/session.py)
 
-import streamlit as st
-import ee
-import geemap
+from utils.catalog import get_municipalities, get_states
+from utils.datasets import ESTADOS_ASSET, MUNICIPIOS_ASSET
+from utils.session import get_session
 
-# Inicializar Google Earth Engine
-ee.Initialize()
-
-# Carregar os assets do usuário no GEE
-ESTADOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_Estados"
-MUNICIPIOS_ASSET = "projects/ee-sandrosenamachado/assets/BR_Municipios"
+# Os assets continuam disponíveis aqui por compatibilidade com o código antigo
+__all__ = ["ESTADOS_ASSET", "MUNICIPIOS_ASSET", "get_estados", "get_municipios"]
 
 # Função para obter a lista de estados
 def get_estados():
-    estados = ee.FeatureCollection(ESTADOS_ASSET)
-    lista_estados = estados.aggregate_array("nome").getInfo()
-    return sorted(lista_estados)
+    return get_states(get_session())
 
 # Função para obter municípios com base no estado selecionado
 def get_municipios(estado):
-    municipios = ee.FeatureCollection(MUNICIPIOS_ASSET)
-    municipios_estado = municipios.filter(ee.Filter.eq("estado", estado))
-    lista_municipios = municipios_estado.aggregate_array("nome").getInfo()
-    return sorted(lista_municipios)
+    return get_municipalities(get_session(), estado)
@@ -0,0 +1,339 @@
+# Instrumentação das etapas das páginas e das chamadas ao Earth Engine
+#
+# Cada etapa das páginas (with stage("Carregando geometria do município...")) exibe o mesmo
+# spinner de antes e registra a duração, o número de chamadas ao servidor (getInfo, map IDs,
+# miniaturas), o tempo gasto nelas e os bytes das respostas. As chamadas feitas no executor
+# compartilhado (em outras threads) são atribuídas à etapa que as originou (contextvars); em
+# etapas aninhadas, as chamadas contam apenas para a mais interna.
+#
+# Os registros vão para:
+# - a sessão do usuário (painel de depuração da barra lateral, ver utils/session.py);
+# - um log JSON estruturado, uma linha por etapa (AGROMET_METRICS_LOG: arquivo, ou "-" para stderr);
+# - totais do processo no formato de texto do Prometheus (prometheus_text), regravados em
+#   AGROMET_METRICS_PATH ao fim de cada etapa para coleta local (ex.: textfile collector do
+#   node_exporter).
+#
+# O tempo até o primeiro gráfico (do clique em "Executar Análise" até o primeiro mapa ou
+# gráfico exibido) também é registrado, por página e modo de execução (sequencial ou
+# progressivo, ver utils/progressive.py). No modo de depuração, também são registrados o tamanho
+# serializado de cada gráfico e o tempo para enfileirá-lo no Streamlit (ver utils/charts.py; o
+# desenho em si acontece no navegador e não é medido aqui).
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import streamlit as st
+
+from utils.resultcache import get_result_cache
+from utils.singleflight import get_singleflight
+
+METRICS_LOG = os.environ.get("AGROMET_METRICS_LOG")
+METRICS_PATH = os.environ.get("AGROMET_METRICS_PATH")
+# Número de etapas guardadas na sessão de cada usuário (painel de depuração)
+SESSION_HISTORY = 200
+
+_PAGE_KEY = "instrumentacao_pagina"
+_HISTORY_KEY = "instrumentacao_etapas"
+_CLOCK_KEY = "instrumentacao_relogio"
+
+_logger = logging.getLogger("agromet.metrics")
+# Erros da própria instrumentação (ex.: falha ao gravar AGROMET_METRICS_PATH)
+_errors = logging.getLogger(__name__)
+if METRICS_LOG and not _logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr) if METRICS_LOG == "-" else logging.FileHandler(METRICS_LOG)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger.addHandler(_handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+
+class _Stage:
+    def __init__(self, page, name):
+        self.page = page
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.bytes = 0
+        self.ee_seconds = 0.0
+
+
+_current = contextvars.ContextVar("agromet_stage", default=None)
+_lock = threading.Lock()
+# Totais do processo por (página, etapa): [execuções, segundos, chamadas, bytes, segundos no EE]
+# Chamadas fora de qualquer etapa ficam em ("", "")
+_totals = {}
+# Tempo até o primeiro gráfico por (página, modo): [análises, segundos]
+_first_chart = {}
+# Gráficos exibidos por página: [gráficos, segundos para enfileirar, bytes das figuras]
+_charts = {}
+
+
+def _add_totals(key, runs=0, seconds=0.0, calls=0, payload_bytes=0, ee_seconds=0.0):
+    totals = _totals.setdefault(key, [0, 0.0, 0, 0, 0.0])
+    totals[0] += runs
+    totals[1] += seconds
+    totals[2] += calls
+    totals[3] += payload_bytes
+    totals[4] += ee_seconds
+
+
+# Função chamada pelo backend a cada ida e volta ao servidor (ver utils/backend.py)
+def record_call(payload_bytes=0, seconds=0.0):
+    current = _current.get()
+    with _lock:
+        if current is None:
+            _add_totals(("", ""), calls=1, payload_bytes=payload_bytes, ee_seconds=seconds)
+        else:
+            current.calls += 1
+            current.bytes += payload_bytes
+            current.ee_seconds += seconds
+
+
+# Nome da etapa a partir do texto do spinner ("Carregando geometria do município...")
+def stage_name(label):
+    return label.strip().rstrip(".").strip()
+
+
+# Função para identificar a página nos registros da sessão (chamada no início de cada página)
+def start_page(page):
+    st.session_state[_PAGE_KEY] = page
+
+
+# Função para obter a página da sessão (ver start_page)
+def current_page():
+    return st.session_state.get(_PAGE_KEY, "")
+
+
+# Mede uma etapa sem spinner e sem acesso à sessão (pode rodar em outra thread, ver
+# utils/progressive.py); o registro é concluído na thread da página com finish_stage
+@contextlib.contextmanager
+def track(page, name):
+    record = _Stage(page, name)
+    token = _current.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - started
+        _current.reset(token)
+
+
+# Etapa instrumentada: spinner + duração, chamadas e bytes da etapa
+# name: nome fixo da etapa nos registros, quando o texto do spinner varia (ex.: inclui contagens)
+@contextlib.contextmanager
+def stage(label, name=None):
+    try:
+        with track(current_page(), name or stage_name(label)) as record:
+            with st.spinner(label):
+                yield
+    finally:
+        finish_stage(record)
+
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+# Registra uma entrada na sessão do usuário, no log JSON e no arquivo de métricas
+def _publish(entry):
+    history = st.session_state.setdefault(_HISTORY_KEY, [])
+    history.append(entry)
+    del history[:-SESSION_HISTORY]
+
+    _logger.info(json.dumps(entry, ensure_ascii=False))
+    if METRICS_PATH:
+        # A exportação das métricas nunca interrompe a página
+        try:
+            write_metrics(METRICS_PATH)
+        except OSError:
+            _errors.exception("Falha ao gravar as métricas em %s", METRICS_PATH)
+
+
+# Conclui o registro de uma etapa medida com track (na thread da página)
+def finish_stage(record):
+    entry = {
+        "ts": round(time.time(), 3),
+        "session": _session_id(),
+        "page": record.page,
+        "stage": record.name,
+        "seconds": round(record.seconds, 4),
+        "calls": record.calls,
+        "bytes": record.bytes,
+        "ee_seconds": round(record.ee_seconds, 4),
+    }
+    with _lock:
+        _add_totals((record.page, record.name), 1, record.seconds, record.calls, record.bytes, record.ee_seconds)
+
+    _publish(entry)
+
+
+# Função para iniciar a contagem do tempo até o primeiro gráfico (ao executar a análise)
+# mode: "sequential" ou "progressive"
+def start_first_chart_clock(mode):
+    st.session_state[_CLOCK_KEY] = (time.perf_counter(), mode)
+
+
+# Função chamada após cada mapa ou gráfico exibido: apenas o primeiro depois de
+# start_first_chart_clock é registrado
+def chart_rendered():
+    clock = st.session_state.pop(_CLOCK_KEY, None)
+    if clock is None:
+        return
+    started, mode = clock
+    seconds = time.perf_counter() - started
+    page = current_page()
+    with _lock:
+        totals = _first_chart.setdefault((page, mode), [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+
+    entry = {
+        "ts": round(time.time(), 3),
+        "session": _session_id(),
+        "page": page,
+        "stage": f"Tempo até o primeiro gráfico ({mode})",
+        "seconds": round(seconds, 4),
+        "calls": 0,
+        "bytes": 0,
+        "ee_seconds": 0.0,
+        "metric": "time_to_first_chart",
+        "mode": mode,
+    }
+    _publish(entry)
+
+
+# Função chamada após cada gráfico exibido no modo de depuração (ver utils/charts.show_chart)
+# seconds: tempo de st.plotly_chart, que apenas enfileira o elemento para o navegador
+# points, total_points: pontos exibidos e pontos da série original (None se não há redução)
+def record_chart(title, seconds, figure_bytes, points=None, total_points=None):
+    page = current_page()
+    with _lock:
+        totals = _charts.setdefault(page, [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += figure_bytes
+
+    entry = {
+        "ts": round(time.time(), 3),
+        "session": _session_id(),
+        "page": page,
+        "stage": f"Gráfico: {title}",
+        "seconds": round(seconds, 4),
+        "calls": 0,
+        "bytes": 0,
+        "ee_seconds": 0.0,
+        "metric": "chart",
+        "figure_bytes": figure_bytes,
+        "points": points,
+        "total_points": total_points,
+    }
+    _publish(entry)
+
+
+# Função para obter as etapas registradas na sessão do usuário (mais recentes por último)
+def session_stages():
+    return list(st.session_state.get(_HISTORY_KEY, []))
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for sample, labels, value in samples:
+        selector = ",".join(f'{key}="{_label(val)}"' for key, val in labels.items())
+        lines.append(f"{sample}{{{selector}}} {value}" if selector else f"{sample} {value}")
+
+
+# Função para montar os totais do processo no formato de texto do Prometheus
+def prometheus_text():
+    with _lock:
+        staged = sorted((key, list(values)) for key, values in _totals.items())
+        first_chart = sorted((key, list(values)) for key, values in _first_chart.items())
+        charts = sorted((key, list(values)) for key, values in _charts.items())
+    runs = [(key, values) for key, values in staged if values[0]]
+
+    def by_stage(name, index, digits=None):
+        return [(name, {"page": page, "stage": stage_}, values[index] if digits is None
+                 else f"{values[index]:.{digits}f}") for (page, stage_), values in staged]
+
+    lines = []
+    _metric(lines, "agromet_stage_seconds", "summary", "Duração das etapas das páginas (s)", [
+        (f"agromet_stage_seconds_{suffix}", {"page": page, "stage": stage_}, value)
+        for (page, stage_), values in runs
+        for suffix, value in (("sum", f"{values[1]:.6f}"), ("count", values[0]))
+    ])
+    _metric(lines, "agromet_time_to_first_chart_seconds", "summary",
+            "Tempo do início da análise até o primeiro mapa ou gráfico (s)", [
+                (f"agromet_time_to_first_chart_seconds_{suffix}", {"page": page, "mode": mode}, value)
+                for (page, mode), values in first_chart
+                for suffix, value in (("sum", f"{values[1]:.6f}"), ("count", values[0]))
+            ])
+    _metric(lines, "agromet_chart_queue_seconds", "summary",
+            "Tempo para enfileirar os gráficos no Streamlit (s), no modo de depuração", [
+                (f"agromet_chart_queue_seconds_{suffix}", {"page": page}, value)
+                for page, values in charts
+                for suffix, value in (("sum", f"{values[1]:.6f}"), ("count", values[0]))
+            ])
+    _metric(lines, "agromet_chart_figure_bytes", "summary",
+            "Tamanho das figuras serializadas (JSON), no modo de depuração", [
+                (f"agromet_chart_figure_bytes_{suffix}", {"page": page}, value)
+                for page, values in charts
+                for suffix, value in (("sum", values[2]), ("count", values[0]))
+            ])
+    _metric(lines, "agromet_ee_calls_total", "counter", "Chamadas ao servidor do Earth Engine",
+            by_stage("agromet_ee_calls_total", 2))
+    _metric(lines, "agromet_ee_response_bytes_total", "counter", "Bytes das respostas do Earth Engine",
+            by_stage("agromet_ee_response_bytes_total", 3))
+    _metric(lines, "agromet_ee_seconds_total", "counter", "Tempo de espera pelas respostas do Earth Engine (s)",
+            by_stage("agromet_ee_seconds_total", 4, digits=6))
+
+    singleflight = get_singleflight().stats()
+    _metric(lines, "agromet_singleflight_requests_total", "counter", "Cálculos pela camada de coalescência", [
+        ("agromet_singleflight_requests_total", {"result": result}, singleflight[key])
+        for result, key in (("hit", "hits"), ("miss", "misses"), ("join", "joins"))
+    ])
+
+    cache = get_result_cache().stats()
+    _metric(lines, "agromet_result_cache_entries", "gauge", "Entradas no cache de resultados",
+            [("agromet_result_cache_entries", {}, cache["entries"])])
+    _metric(lines, "agromet_result_cache_bytes", "gauge", "Memória estimada do cache de resultados",
+            [("agromet_result_cache_bytes", {}, cache["bytes"])])
+    _metric(lines, "agromet_result_cache_max_bytes", "gauge", "Orçamento de memória do cache de resultados",
+            [("agromet_result_cache_max_bytes", {}, cache["max_bytes"])])
+    _metric(lines, "agromet_result_cache_requests_total", "counter", "Consultas ao cache de resultados", [
+        ("agromet_result_cache_requests_total", {"result": "hit"}, cache["hits"]),
+        ("agromet_result_cache_requests_total", {"result": "miss"}, cache["misses"]),
+    ])
+    _metric(lines, "agromet_result_cache_evictions_total", "counter", "Remoções por falta de espaço",
+            [("agromet_result_cache_evictions_total", {}, cache["evictions"])])
+    return "\n".join(lines) + "\n"
+
+
+# Função para gravar o texto do Prometheus em um arquivo (substituição atômica)
+# Cada gravação usa o seu próprio arquivo temporário no mesmo diretório: várias sessões
+# concluem etapas ao mesmo tempo, e um nome fixo faria um os.replace levar o arquivo do outro
+def write_metrics(path):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    text = prometheus_text()
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, prefix=f".{os.path.basename(path)}.",
+                                     suffix=".tmp", delete=False) as f:
+        f.write(text)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(f.name)
+        raise
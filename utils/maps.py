@@ -0,0 +1,121 @@
+# Mapas das páginas: cache de tiles do Earth Engine e renderização leve
+#
+# Cada camada exibida exige uma requisição de map ID ao EE (getMapId). As URLs de tiles
+# obtidas ficam no cache de resultados do processo (utils/resultcache.py), pela expressão
+# da imagem e pelos parâmetros de visualização, durante um período menor que a validade
+# das URLs no EE: rever o mesmo município/ano não repete a requisição. O mapa é montado diretamente com folium (sem os controles e
+# plugins do geemap), com o contorno da ROI sobreposto às camadas, e o HTML também é
+# reaproveitado. Como alternativa, render_thumbnail exibe uma imagem PNG estática
+# (getThumbURL) com as camadas e o contorno já combinados.
+
+import hashlib
+import json
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from utils.resultcache import get_result_cache
+from utils.singleflight import coalesce
+
+# Validade das URLs de tiles/miniaturas no cache, em segundos (as do EE expiram após algumas horas)
+TILE_TTL = float(os.environ.get("AGROMET_TILE_TTL", str(2 * 3600)))
+
+# Modos de exibição dos mapas (seletor da barra lateral)
+MAP_MODES = {
+    "Interativo": "interactive",
+    "Interativo leve (um mapa)": "light",
+    "Imagem estática (PNG)": "static",
+}
+
+# Mapas base disponíveis: (modelo de URL, atribuição)
+BASEMAPS = {
+    "HYBRID": ("https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}", "Google"),
+    "ROADMAP": ("https://mt1.google.com/vt/lyrs=m&x={x}&y={y}&z={z}", "Google"),
+}
+
+# Estilo do contorno da ROI
+OUTLINE_VIS = {"palette": ["FF0000"], "min": 0, "max": 1}
+THUMBNAIL_DIMENSIONS = 768
+
+
+def _hash(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# Busca no cache de resultados ou calcula (validade das URLs de tiles); pedidos simultâneos da
+# mesma URL (ex.: contorno da ROI nos dois mapas da renderização progressiva) viram um só
+def _cached(key, compute):
+    return get_result_cache().get_or_compute(("maps", key), lambda: coalesce(("maps", key), compute), TILE_TTL)
+
+
+# Função para obter o modelo de URL dos tiles de uma imagem (map ID em cache)
+def tile_url(backend, image, vis_params):
+    key = _hash("tiles", backend.name, backend.expression_key(image), vis_params)
+    return _cached(key, lambda: backend.get_tile_url(image, vis_params))
+
+
+# Função para obter o retângulo envolvente da ROI (em cache)
+def roi_bounds(backend, roi):
+    key = _hash("bounds", backend.name, backend.expression_key(roi))
+    return _cached(key, lambda: backend.get_info(backend.bounds(roi)))
+
+
+# Função para obter a URL da miniatura PNG das camadas com o contorno da ROI (em cache)
+def thumbnail_url(backend, roi, layers, dimensions=THUMBNAIL_DIMENSIONS):
+    layers = [(image, vis_params) for image, vis_params, _ in layers] + [(backend.outline(roi), OUTLINE_VIS)]
+    key = _hash("thumbnail", backend.name, backend.expression_key(roi), dimensions,
+                [(backend.expression_key(image), vis_params) for image, vis_params in layers])
+    return _cached(key, lambda: backend.get_thumbnail_url(backend.visualize(layers), roi, dimensions))
+
+
+def _map_html(bounds, tile_layers, height, basemap):
+    # folium só é importado quando um mapa interativo é de fato renderizado
+    import folium
+
+    m = folium.Map(tiles=None, control_scale=True, height=height)
+    if basemap in BASEMAPS:
+        url, attribution = BASEMAPS[basemap]
+        folium.TileLayer(tiles=url, attr=attribution, name=basemap).add_to(m)
+    else:
+        folium.TileLayer("OpenStreetMap").add_to(m)
+    for url, name in tile_layers:
+        folium.TileLayer(tiles=url, attr="Google Earth Engine", name=name, overlay=True).add_to(m)
+    west, south, east, north = bounds
+    m.fit_bounds([[south, west], [north, east]])
+    folium.LayerControl().add_to(m)
+    return m.get_root().render()
+
+
+# Função para obter as camadas de tiles [(URL, nome), ...] e o retângulo envolvente de um mapa da ROI
+def map_tiles(backend, roi, layers=()):
+    tile_layers = [(tile_url(backend, image, vis_params), name) for image, vis_params, name in layers]
+    tile_layers.append((tile_url(backend, backend.outline(roi), OUTLINE_VIS), "Região de Interesse"))
+    return tile_layers, roi_bounds(backend, roi)
+
+
+# Função para preparar um mapa sem exibi-lo: map IDs, retângulo envolvente ou miniatura ficam em
+# cache (pode rodar em outra thread, ver utils/progressive.py)
+def prepare_map(backend, roi, layers=(), static=False):
+    if static:
+        thumbnail_url(backend, roi, layers)
+    else:
+        map_tiles(backend, roi, layers)
+
+
+# Função para renderizar um mapa interativo centrado na ROI com as camadas [(imagem, vis_params, nome), ...]
+def render_map(backend, roi, layers=(), height=500, basemap=None):
+    tile_layers, bounds = map_tiles(backend, roi, layers)
+    html = _cached(_hash("html", bounds, tile_layers, height, basemap),
+                   lambda: _map_html(bounds, tile_layers, height, basemap))
+    components.html(html, height=height)
+
+
+# Função para exibir as camadas e o contorno da ROI como uma imagem PNG estática
+def render_thumbnail(backend, roi, layers, caption=None, dimensions=THUMBNAIL_DIMENSIONS):
+    st.image(thumbnail_url(backend, roi, layers, dimensions), caption=caption)
+
+
+# Função para limpar o cache (testes e benchmarks)
+def clear_cache():
+    get_result_cache().clear("maps")
@@ -0,0 +1,114 @@
+# Planejamento da redução espacial (escala, simplificação da ROI, tileScale/bestEffort)
+#
+# Em vez de escalas fixas (10 km para a precipitação, 1 km para a temperatura...), a
+# escala de redução é escolhida a partir da área da ROI e da resolução nativa do
+# conjunto de dados, mirando um orçamento de pixels: municípios pequenos são amostrados
+# abaixo da resolução nativa para terem pixels suficientes, e municípios enormes
+# (ex.: Altamira) são reduzidos em escala mais grossa para não estourar o tempo.
+# A tolerância de simplificação da geometria acompanha a escala escolhida.
+
+import math
+import os
+from collections import namedtuple
+
+from utils.executor import get_executor
+from utils.catalog import get_municipality, get_region, load_catalog
+from utils.datasets import MUNICIPIOS_ASSET, get_dataset
+
+# Orçamento de pixels por redução (pode ser alterado pela variável de ambiente)
+TARGET_PIXELS = int(os.environ.get("AGROMET_PIXEL_BUDGET", "10000"))
+# Mínimo de pixels na ROI (abaixo disso a escala é refinada além da resolução nativa)
+MIN_PIXELS = 100
+# Limite maxPixels das reduções no EE
+MAX_PIXELS = 1e9
+# Tolerância de simplificação como fração da escala (erro de contorno bem menor que um pixel)
+SIMPLIFY_FRACTION = 0.25
+# Pixels nativos por bloco antes de dobrar o tileScale
+NATIVE_PIXELS_PER_TILE_SCALE = 4e6
+MAX_TILE_SCALE = 16
+
+ReductionPlan = namedtuple(
+    "ReductionPlan",
+    ["scale", "tolerance", "tile_scale", "best_effort", "pixels", "area_km2", "native_resolution"],
+)
+
+
+# Função para obter a resolução nativa de um ou mais conjuntos de dados do registro (a mais fina)
+# Aceita o nome curto (ex.: "precipitacao") ou o ID da coleção, ver utils/datasets.py
+def native_resolution(*datasets):
+    return min(get_dataset(dataset).native_resolution for dataset in datasets)
+
+
+# Arredonda a escala para dois algarismos significativos (chaves de cache estáveis)
+def _round_scale(scale):
+    digits = int(math.floor(math.log10(scale))) - 1
+    return float(round(scale, -digits))
+
+
+# Função para escolher a escala e os parâmetros da redução a partir da área da ROI
+def plan_reduction(area_km2, native, target_pixels=TARGET_PIXELS, min_pixels=MIN_PIXELS):
+    area_m2 = max(area_km2, 1e-6) * 1e6
+
+    # Nunca mais fino que a resolução nativa enquanto couberem pixels suficientes na ROI
+    scale = max(native, math.sqrt(area_m2 / target_pixels))
+    if area_m2 / scale ** 2 < min_pixels:
+        scale = math.sqrt(area_m2 / min_pixels)
+    scale = _round_scale(scale)
+
+    # tileScale cresce com o volume de pixels nativos lidos; bestEffort só se estourar maxPixels
+    native_pixels = area_m2 / native ** 2
+    tile_scale = 1
+    while native_pixels / tile_scale ** 2 > NATIVE_PIXELS_PER_TILE_SCALE and tile_scale < MAX_TILE_SCALE:
+        tile_scale *= 2
+
+    return ReductionPlan(
+        scale=scale,
+        tolerance=round(scale * SIMPLIFY_FRACTION),
+        tile_scale=tile_scale,
+        best_effort=native_pixels > MAX_PIXELS,
+        pixels=int(area_m2 / scale ** 2),
+        area_km2=float(area_km2),
+        native_resolution=native,
+    )
+
+
+# Função para planejar a redução de um município (área do catálogo local ou, sem ele, do EE)
+def plan_region(backend, state, municipality, native, target_pixels=TARGET_PIXELS):
+    row = get_municipality(state, municipality)
+    if row is not None:
+        area_km2 = float(row["AREA_KM2"])
+    else:
+        _, roi = get_region(backend, state, municipality)
+        area_km2 = backend.get_info(backend.area(roi)) / 1e6
+    return plan_reduction(area_km2, native, target_pixels)
+
+
+# Função para planejar a redução em lote (área mediana dos municípios; sem catálogo, a média do estado)
+def plan_state(backend, state, native, municipalities=None, target_pixels=TARGET_PIXELS):
+    catalog = load_catalog()
+    if catalog is not None:
+        rows = catalog[catalog["NM_UF"] == state]
+        if municipalities:
+            rows = rows[rows["NM_MUN"].isin(municipalities)]
+        area_km2 = float(rows["AREA_KM2"].median())
+    else:
+        fc = backend.filter_eq(backend.feature_collection(MUNICIPIOS_ASSET), "NM_UF", state)
+        if municipalities:
+            fc = backend.filter_in(fc, "NM_MUN", municipalities)
+        area, names = get_executor().get_info_all(backend, [backend.area(backend.geometry(fc)),
+                                                            backend.aggregate_array(fc, "NM_MUN")])
+        area_km2 = area / 1e6 / max(len(names), 1)
+    return plan_reduction(area_km2, native, target_pixels)
+
+
+# Número inteiro com separador de milhar brasileiro
+def _format_int(value):
+    return f"{value:,.0f}".replace(",", ".")
+
+
+# Função para descrever o plano (legenda dos gráficos)
+def describe_plan(plan):
+    return (f"Redução espacial: escala de {_format_int(plan.scale)} m (~{_format_int(plan.pixels)} pixels em "
+            f"{_format_int(plan.area_km2)} km²; resolução nativa {_format_int(plan.native_resolution)} m), "
+            f"geometria simplificada com tolerância de {_format_int(plan.tolerance)} m, "
+            f"tileScale {plan.tile_scale}, bestEffort {'sim' if plan.best_effort else 'não'}.")
@@ -0,0 +1,318 @@
+# Séries mensais pré-calculadas de todos os municípios (armazenamento colunar em Parquet)
+#
+# A maior parte das consultas pede os mesmos períodos (últimos 10/20/30 anos) sobre os
+# mesmos municípios. Um job offline calcula, estado por estado e em lote (utils/batch.py),
+# as séries mensais de cada produto e as grava em data/precomputed/<produto>/<estado>.parquet
+# (inteiros pequenos, float32, compressão zstd). As páginas consultam esse armazenamento
+# antes de calcular a série no Earth Engine: uma consulta coberta não faz nenhuma chamada
+# ao EE para a série.
+#
+# Construção:
+#   python -m utils.precomputed build [--products precipitacao temperatura evapotranspiracao]
+#                                     [--states "Minas Gerais" ...] [--start 1991-01 --end 2020-12]
+#                                     [--backend ee|local]
+#
+# Atualização incremental (apenas os meses completados desde a última execução):
+#   python -m utils.precomputed refresh [--every 24]
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import time
+import unicodedata
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+import pandas as pd
+
+from utils.backend import create_backend
+from utils.batch import batch_series
+from utils.executor import get_executor
+from utils.catalog import get_states
+from utils.planner import TARGET_PIXELS, native_resolution, plan_state
+from utils.datasets import get_dataset
+from utils.series import dataset_collection, month_range, water_balance_images
+
+# Diretório padrão do armazenamento (pode ser alterado pela variável de ambiente)
+PRECOMPUTED_PATH = os.environ.get("AGROMET_PRECOMPUTED_PATH", os.path.join("data", "precomputed"))
+
+# Produtos pré-calculados: conjuntos de dados do registro (utils/datasets.py) e colunas gravadas
+PRODUCTS = {
+    "precipitacao": {"datasets": ["precipitacao"], "columns": ["precip"]},
+    "temperatura": {"datasets": ["temperatura"], "columns": ["temp"]},
+    "evapotranspiracao": {"datasets": ["precipitacao_pentadal", "evapotranspiracao"],
+                          "columns": ["precipitation", "ET", "water_balance"]},
+}
+
+# Período padrão da construção: os últimos 30 anos completos
+DEFAULT_YEARS = 30
+
+# Arquivo de progresso da atualização (retomada após uma interrupção)
+CHECKPOINT_FILE = "refresh_checkpoint.json"
+
+
+# Função para montar o construtor de imagens mensais (por bloco de meses) de um produto
+# As coleções são as mesmas das páginas 01, 02 e 03 (utils/series.dataset_collection)
+def image_builder(backend, product, start_date, end_date):
+    datasets = [get_dataset(key) for key in PRODUCTS[product]["datasets"]]
+    collections = [dataset_collection(dataset, start_date, end_date, backend=backend) for dataset in datasets]
+
+    if product == "evapotranspiracao":
+        return lambda year, month, n: water_balance_images(*collections, year, month, n, backend=backend)
+
+    (dataset,), (collection,) = datasets, collections
+    return lambda year, month, n: backend.filter_nonempty(
+        backend.monthly_images(collection, year, month, n, dataset.aggregator))
+
+
+# Nome do arquivo de um estado (sem acentos nem espaços)
+def _slug(text):
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+# Função para obter o caminho do arquivo de um produto/estado
+def partition_path(product, state, root=None):
+    return os.path.join(root or PRECOMPUTED_PATH, product, f"{_slug(state)}.parquet")
+
+
+@lru_cache(maxsize=32)
+def _read_partition(path, mtime):
+    return pd.read_parquet(path)
+
+
+# Função para carregar a tabela de um produto/estado (None se ainda não foi gerada)
+def load_partition(product, state, root=None):
+    path = partition_path(product, state, root)
+    if not os.path.exists(path):
+        return None
+    return _read_partition(path, os.path.getmtime(path))
+
+
+# Função para obter a série mensal pré-calculada de um município (None se o período não está coberto)
+# Colunas: year, month e as colunas do produto; a escala usada fica em df.attrs["scale"]
+def load_series(product, state, municipality, start_date, end_date, root=None):
+    table = load_partition(product, state, root)
+    if table is None:
+        return None
+    rows = table[table["NM_MUN"] == municipality]
+    months = month_range(start_date, end_date)
+    wanted = pd.MultiIndex.from_tuples(months, names=["year", "month"])
+    rows = rows.set_index(["year", "month"])
+    if not wanted.isin(rows.index).all():
+        return None
+
+    df = rows.loc[wanted, PRODUCTS[product]["columns"]].astype(float).reset_index()
+    df["year"] = df["year"].astype(int)
+    df["month"] = df["month"].astype(int)
+    df.attrs["scale"] = float(rows["scale"].iloc[0])
+    return df
+
+
+# Função para descrever a origem da série (legenda dos gráficos)
+def describe_precomputed(df):
+    scale = f"{df.attrs['scale']:,.0f}".replace(",", ".")
+    return (f"Série mensal pré-calculada (escala de {scale} m), "
+            f"servida do armazenamento local sem consulta ao Earth Engine.")
+
+
+# Função para compactar a tabela de um estado (tipos pequenos e nomes como categorias)
+def _compact(df, columns, scale):
+    df = df.copy()
+    df["year"] = df["year"].astype("int16")
+    df["month"] = df["month"].astype("int8")
+    for column in columns:
+        df[column] = df[column].astype("float32")
+    df["scale"] = pd.Series(scale, index=df.index, dtype="float32")
+    df["NM_MUN"] = df["NM_MUN"].astype("category")
+    return df
+
+
+# Função para gravar a tabela de um estado de forma atômica
+def write_partition(df, product, state, root=None):
+    path = partition_path(product, state, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+# Função para calcular e gravar um produto para um estado (todos os municípios, em lote)
+def build_state(backend, product, state, start_date, end_date, root=None, target_pixels=TARGET_PIXELS):
+    spec = PRODUCTS[product]
+    plan = plan_state(backend, state, native_resolution(*spec["datasets"]), target_pixels=target_pixels)
+    df = batch_series(backend, state, start_date, end_date, image_builder(backend, product, start_date, end_date),
+                      spec["columns"], scale=plan.scale, tile_scale=plan.tile_scale)
+    return write_partition(_compact(df, spec["columns"], plan.scale), product, state, root), df
+
+
+# Função para construir o armazenamento (produtos × estados); devolve um relatório por partição
+def build_store(backend, products=None, states=None, start_date=None, end_date=None, root=None,
+                target_pixels=TARGET_PIXELS):
+    today = date.today()
+    start_date = start_date or date(today.year - DEFAULT_YEARS, 1, 1)
+    end_date = end_date or date(today.year - 1, 12, 31)
+    report = []
+    for product in products or list(PRODUCTS):
+        for state in states or get_states(backend):
+            started = time.perf_counter()
+            path, df = build_state(backend, product, state, start_date, end_date, root, target_pixels)
+            report.append({
+                "product": product, "state": state, "municipalities": df["NM_MUN"].nunique(),
+                "months": len(month_range(start_date, end_date)), "seconds": round(time.perf_counter() - started, 1),
+                "bytes": os.path.getsize(path),
+            })
+    return report
+
+
+# Função para obter o último mês completo de um conjunto de dados a partir da imagem mais recente
+# Um mês está completo quando a imagem mais recente (system:time_start + duração da imagem,
+# cadence_days no registro) chega ao primeiro dia do mês seguinte
+def last_complete_month(latest_ms, dataset):
+    if latest_ms is None:
+        return None
+    latest = datetime.fromtimestamp(latest_ms / 1000, timezone.utc).date()
+    covered_until = latest + timedelta(days=get_dataset(dataset).cadence_days)
+    return (covered_until.year - 1, 12) if covered_until.month == 1 else (covered_until.year, covered_until.month - 1)
+
+
+# Função para obter o último mês completo de cada produto (o mais antigo entre os seus conjuntos de dados)
+def latest_complete_months(backend, products):
+    datasets = sorted({dataset for product in products for dataset in PRODUCTS[product]["datasets"]})
+    latest = get_executor().get_info_all(
+        backend, [backend.latest_time(backend.image_collection(get_dataset(dataset).id)) for dataset in datasets])
+    complete = {dataset: last_complete_month(ms, dataset) for dataset, ms in zip(datasets, latest)}
+    return {product: min((complete[d] for d in PRODUCTS[product]["datasets"]), default=None, key=lambda m: m or (0, 0))
+            for product in products}
+
+
+def _read_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# Função para acrescentar a um produto/estado os meses completados depois do último gravado
+# A escala e os municípios são os da tabela existente; a gravação é atômica
+def refresh_state(backend, product, state, target, root=None, target_pixels=TARGET_PIXELS):
+    table = load_partition(product, state, root)
+    if table is None:
+        return None
+    columns = PRODUCTS[product]["columns"]
+    last = max(zip(table["year"].astype(int), table["month"].astype(int)))
+    next_month = date(last[0] + 1, 1, 1) if last[1] == 12 else date(last[0], last[1] + 1, 1)
+    months = month_range(next_month, date(*target, 1)) if target and target >= (next_month.year, next_month.month) else []
+    if not months:
+        return {"months": 0, "cells": 0, "from": None, "to": None}
+
+    start_date, end_date = next_month, date(*target, 1)
+    scale = float(table["scale"].iloc[0])
+    plan = plan_state(backend, state, native_resolution(*PRODUCTS[product]["datasets"]), target_pixels=target_pixels)
+    municipalities = table["NM_MUN"].astype(str).unique().tolist()
+    df = batch_series(backend, state, start_date, end_date, image_builder(backend, product, start_date, end_date),
+                      columns, municipalities=municipalities, scale=scale, tile_scale=plan.tile_scale)
+
+    combined = pd.concat([table.assign(NM_MUN=table["NM_MUN"].astype(str)).drop(columns="scale"), df],
+                         ignore_index=True)
+    combined = combined.sort_values(["NM_MUN", "year", "month"]).reset_index(drop=True)
+    write_partition(_compact(combined, columns, scale), product, state, root)
+    return {"months": len(months), "cells": len(df) * len(columns),
+            "from": "%04d-%02d" % months[0], "to": "%04d-%02d" % months[-1]}
+
+
+# Função para atualizar o armazenamento com os meses recém-completados (todos os produtos × estados)
+# O progresso fica em <root>/refresh_checkpoint.json: uma execução interrompida é retomada
+# a partir do próximo estado, desde que o último mês disponível não tenha mudado
+def refresh_store(backend, products=None, states=None, root=None, target_pixels=TARGET_PIXELS):
+    root = root or PRECOMPUTED_PATH
+    products = products or list(PRODUCTS)
+    targets = {product: list(month) if month else None
+               for product, month in latest_complete_months(backend, products).items()}
+    checkpoint_path = os.path.join(root, CHECKPOINT_FILE)
+    checkpoint = _read_checkpoint(checkpoint_path)
+    if checkpoint is None or checkpoint["targets"] != targets:
+        checkpoint = {"targets": targets, "done": []}
+
+    report = []
+    for product in products:
+        for state in states or get_states(backend):
+            record = {"product": product, "state": state, "target": targets[product]}
+            if f"{product}/{state}" in checkpoint["done"]:
+                report.append({**record, "status": "retomado"})
+                continue
+            started = time.perf_counter()
+            result = refresh_state(backend, product, state, targets[product] and tuple(targets[product]),
+                                   root, target_pixels)
+            status = "sem partição" if result is None else ("atualizado" if result["months"] else "em dia")
+            report.append({**record, **(result or {}), "status": status,
+                           "seconds": round(time.perf_counter() - started, 1)})
+            checkpoint["done"].append(f"{product}/{state}")
+            os.makedirs(root, exist_ok=True)
+            _write_checkpoint(checkpoint_path, checkpoint)
+
+    # Sem nenhum estado processado (ex.: lista vazia), o checkpoint nunca chegou a ser gravado
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(checkpoint_path)
+    return report
+
+
+# Converte "AAAA-MM" em data (primeiro dia do mês)
+def _parse_month(text):
+    year, month = text.split("-")
+    return date(int(year), int(month), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Séries mensais pré-calculadas de todos os municípios")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="calcula e grava as séries (por produto e estado)")
+    build.add_argument("--products", nargs="+", choices=list(PRODUCTS), default=list(PRODUCTS))
+    build.add_argument("--states", nargs="+", help="estados a calcular (padrão: todos)")
+    build.add_argument("--start", type=_parse_month, help="primeiro mês, AAAA-MM (padrão: 30 anos atrás)")
+    build.add_argument("--end", type=_parse_month, help="último mês, AAAA-MM (padrão: dezembro do ano passado)")
+    build.add_argument("--path", default=PRECOMPUTED_PATH)
+    build.add_argument("--pixels", type=int, default=TARGET_PIXELS, help="orçamento de pixels por município")
+    build.add_argument("--backend", choices=["ee", "local"], default="ee")
+    refresh = commands.add_parser("refresh", help="acrescenta os meses completados desde a última atualização")
+    refresh.add_argument("--products", nargs="+", choices=list(PRODUCTS), default=list(PRODUCTS))
+    refresh.add_argument("--states", nargs="+", help="estados a atualizar (padrão: todos)")
+    refresh.add_argument("--path", default=PRECOMPUTED_PATH)
+    refresh.add_argument("--pixels", type=int, default=TARGET_PIXELS, help="orçamento de pixels por município")
+    refresh.add_argument("--every", type=float, help="repete a atualização a cada N horas (agendador simples)")
+    refresh.add_argument("--backend", choices=["ee", "local"], default="ee")
+    args = parser.parse_args(argv)
+
+    backend = create_backend(args.backend)
+    backend.initialize()
+    if args.command == "build":
+        for record in build_store(backend, args.products, args.states, args.start, args.end, args.path, args.pixels):
+            print(f"{record['product']} / {record['state']}: {record['municipalities']} municípios × "
+                  f"{record['months']} meses em {record['seconds']} s ({record['bytes'] / 1e3:.0f} kB)")
+        return
+
+    while True:
+        report = refresh_store(backend, args.products, args.states, args.path, args.pixels)
+        for record in report:
+            detail = f" +{record['months']} meses ({record['from']} a {record['to']}), {record['cells']} células" \
+                if record.get("months") else ""
+            print(f"{record['product']} / {record['state']}: {record['status']}{detail}")
+        print(f"Total: {sum(r.get('months', 0) for r in report)} meses e {sum(r.get('cells', 0) for r in report)} "
+              f"células atualizados em {len(report)} partições")
+        if not args.every:
+            break
+        time.sleep(args.every * 3600)
+
+
+if __name__ == "__main__":
+    main()
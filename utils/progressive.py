@@ -0,0 +1,70 @@
+# Renderização progressiva das páginas
+#
+# No modo sequencial, a página calcula e exibe tudo em ordem na thread do script: mapa da
+# ROI, mapa anual, série mensal, gráficos. No modo progressivo, as etapas independentes
+# (série mensal, estatísticas e tiles do mapa anual, mapa da ROI, composições de P/ET...)
+# são submetidas ao mesmo tempo e cada resultado é exibido no seu espaço reservado
+# (st.empty) assim que chega, sem esperar a etapa mais lenta.
+#
+# As etapas rodam em um pool próprio (AGROMET_PROGRESSIVE_WORKERS), e não no executor de
+# requisições (utils/executor.py): elas mesmas submetem chamadas a ele, e dividir o mesmo
+# pool poderia esgotá-lo com etapas esperando as próprias chamadas. Cada etapa é medida
+# como as demais (utils/instrumentation.py), e o registro é concluído na thread da página.
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.instrumentation import current_page, finish_stage, track
+
+MAX_WORKERS = int(os.environ.get("AGROMET_PROGRESSIVE_WORKERS", "16"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="agromet-stage")
+        return _pool
+
+
+def _run_tracked(page, name, fn, args, kwargs):
+    with track(page, name) as record:
+        result = fn(*args, **kwargs)
+    return result, record
+
+
+class ProgressiveRun:
+    def __init__(self):
+        self.page = current_page()
+        self._futures = {}
+        self._results = {}
+
+    # Submete uma etapa (executada em segundo plano, com o contexto da página)
+    def submit(self, name, fn, *args, **kwargs):
+        context = contextvars.copy_context()
+        future = _get_pool().submit(context.run, _run_tracked, self.page, name, fn, args, kwargs)
+        self._futures[future] = name
+
+    def _collect(self, future):
+        result, record = future.result()
+        finish_stage(record)
+        self._results[self._futures[future]] = result
+        return result
+
+    # Devolve (nome, resultado) de cada etapa à medida que terminam (na thread da página)
+    def as_completed(self):
+        for future in as_completed(list(self._futures)):
+            name = self._futures[future]
+            yield name, self._results[name] if name in self._results else self._collect(future)
+
+    # Aguarda uma etapa específica e devolve o seu resultado
+    def result(self, name):
+        if name not in self._results:
+            future = next(future for future, future_name in self._futures.items() if future_name == name)
+            self._collect(future)
+        return self._results[name]
@@ -0,0 +1,146 @@
+# Cache de resultados compartilhado pelo processo (todas as sessões do Streamlit)
+#
+# Guarda em memória as séries (DataFrames), as estatísticas de visualização dos mapas e as
+# URLs de tiles/miniaturas, com:
+# - orçamento em bytes (AGROMET_RESULT_CACHE_MB, padrão 256 MB): o tamanho de cada entrada é
+#   estimado (DataFrames pelo memory_usage(deep=True)) e as menos usadas recentemente saem
+#   primeiro quando o orçamento é excedido;
+# - validade por entrada: resultados que incluem meses ainda não consolidados (o CHIRPS e o
+#   MODIS podem revisá-los, ver utils/store.py) expiram bem antes dos demais;
+# - introspecção: entradas, bytes, acertos, falhas e remoções.
+#
+# Chamadas simultâneas com a mesma chave não são coalescidas aqui (ver utils/singleflight.py).
+
+import os
+import sys
+import threading
+from datetime import date
+
+import pandas as pd
+from cachetools import TLRUCache
+
+from utils.store import month_is_settled
+
+# Orçamento de memória do cache, em bytes
+MAX_BYTES = int(float(os.environ.get("AGROMET_RESULT_CACHE_MB", "256")) * 1024 * 1024)
+# Validade dos resultados consolidados e dos que incluem meses recentes, em segundos
+RESULT_TTL = float(os.environ.get("AGROMET_RESULT_TTL", str(24 * 3600)))
+RECENT_TTL = float(os.environ.get("AGROMET_RESULT_TTL_RECENT", str(3600)))
+
+
+# Função para estimar a memória ocupada por um resultado (DataFrames, tuplas, listas, dicionários...)
+def estimate_bytes(value, _depth=0):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_bytes(k, _depth + 1) + estimate_bytes(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_bytes(item, _depth + 1) for item in value)
+    return size
+
+
+# Função para obter a validade de um resultado que vai até end_date (meses recentes expiram antes)
+def period_ttl(end_date, today=None):
+    if month_is_settled(end_date.year, end_date.month, today=today):
+        return RESULT_TTL
+    return RECENT_TTL
+
+
+# Validade das estatísticas de um ano inteiro (ex.: mapa anual)
+def year_ttl(year, today=None):
+    return period_ttl(date(year, 12, 31), today=today)
+
+
+class _Entry:
+    __slots__ = ("value", "size", "ttl")
+
+    def __init__(self, value, size, ttl):
+        self.value = value
+        self.size = size
+        self.ttl = ttl
+
+
+class _Cache(TLRUCache):
+    evictions = 0
+
+    # Remoção pelo critério LRU (orçamento excedido); entradas expiradas saem por expire()
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+
+class ResultCache:
+    def __init__(self, max_bytes=MAX_BYTES, default_ttl=RESULT_TTL):
+        self.default_ttl = default_ttl
+        self._cache = _Cache(maxsize=max_bytes, ttu=lambda key, entry, now: now + entry.ttl,
+                             getsizeof=lambda entry: entry.size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Busca no cache ou calcula (fora do lock, para não serializar as requisições ao EE)
+    # key: tupla cujo primeiro elemento é o espaço de nomes ("series", "viz_stats", "maps"...)
+    def get_or_compute(self, key, compute, ttl=None):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+        value = compute()
+        self.put(key, value, ttl)
+        return value
+
+    def put(self, key, value, ttl=None):
+        entry = _Entry(value, estimate_bytes(value), self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            try:
+                self._cache[key] = entry
+            except ValueError:
+                # Maior que o orçamento inteiro: não é guardado
+                pass
+
+    # Remove todas as entradas, ou apenas as de um espaço de nomes
+    def clear(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._cache.clear()
+            else:
+                for key in [key for key in self._cache.keys() if key[0] == namespace]:
+                    del self._cache[key]
+
+    def stats(self):
+        with self._lock:
+            self._cache.expire()
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "bytes": int(self._cache.currsize),
+                "max_bytes": int(self._cache.maxsize),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / requests if requests else None,
+                "evictions": self._cache.evictions,
+            }
+
+
+_result_cache = ResultCache()
+
+
+# Função para obter o cache de resultados do processo (todas as sessões)
+def get_result_cache():
+    return _result_cache
+
+
+# Função para descrever o estado do cache (depuração)
+def describe_result_cache(stats):
+    ratio = "—" if stats["hit_ratio"] is None else f"{stats['hit_ratio']:.0%}"
+    return (f"Cache de resultados: {stats['entries']} entradas, {stats['bytes'] / 1024:.0f} kB de "
+            f"{stats['max_bytes'] / 1024 ** 2:.0f} MB; taxa de acerto {ratio} ({stats['hits']} acertos, "
+            f"{stats['misses']} falhas, {stats['evictions']} remoções por falta de espaço).")
@@ -0,0 +1,222 @@
+# Motor de séries temporais mensais
+#
+# A coleção mensal inteira é construída no servidor (via backend, ver utils/backend.py),
+# cada mês é reduzido sobre a ROI e os valores voltam em uma única chamada getInfo
+# (ou em poucos blocos para períodos muito longos), em vez de uma chamada por ano/mês.
+
+import json
+import time
+from datetime import date
+
+import pandas as pd
+
+from utils.backend import get_backend
+from utils.datasets import get_dataset
+from utils.executor import get_executor
+from utils.store import SeriesKey, get_store, month_is_settled
+
+# Número máximo de meses reduzidos por requisição (evita o tempo limite do EE em séries longas)
+MAX_MONTHS_PER_REQUEST = 240
+
+
+# Função para listar os meses (ano, mês) entre duas datas, inclusive
+def month_range(start_date, end_date):
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+# Função para obter o intervalo de filtragem (meses completos) entre duas datas: [início, fim)
+def month_bounds(start_date, end_date):
+    end_year, end_month = (end_date.year + 1, 1) if end_date.month == 12 else (end_date.year, end_date.month + 1)
+    return (date(start_date.year, start_date.month, 1).strftime("%Y-%m-%d"),
+            date(end_year, end_month, 1).strftime("%Y-%m-%d"))
+
+
+# Função para montar a coleção de um conjunto de dados do registro: banda, conversão para a
+# unidade exibida e filtro pelos meses completos do período (e pela ROI, se informada)
+def dataset_collection(dataset, start_date, end_date, roi=None, backend=None):
+    dataset = get_dataset(dataset)
+    backend = backend or get_backend()
+    collection = backend.select(backend.image_collection(dataset.id), dataset.band)
+    if (dataset.multiply, dataset.add) != (1.0, 0.0):
+        collection = backend.rescale(collection, multiply=dataset.multiply, add=dataset.add)
+    collection = backend.filter_date(collection, *month_bounds(start_date, end_date))
+    if roi is not None:
+        collection = backend.filter_bounds(collection, roi)
+    return collection
+
+
+# Função para agrupar uma lista ordenada de meses em trechos consecutivos [(início, fim), ...]
+def contiguous_runs(months):
+    runs = []
+    for year, month in months:
+        if runs:
+            last_year, last_month = runs[-1][1]
+            expected = (last_year + 1, 1) if last_month == 12 else (last_year, last_month + 1)
+            if (year, month) == expected:
+                runs[-1][1] = (year, month)
+                continue
+        runs.append([(year, month), (year, month)])
+    return [tuple(run) for run in runs]
+
+
+# Função para montar as requisições (lazy) de uma lista de meses consecutivos, em blocos
+def _monthly_requests(collection, band, roi, months, aggregator, scale, backend, tile_scale=1, best_effort=False):
+    requests = []
+    for i in range(0, len(months), MAX_MONTHS_PER_REQUEST):
+        chunk = months[i:i + MAX_MONTHS_PER_REQUEST]
+        start_year, start_month = chunk[0]
+        images = backend.monthly_images(collection, start_year, start_month, len(chunk), aggregator)
+        values = backend.reduce_monthly_images(images, band, roi, len(chunk), scale, tile_scale, best_effort)
+        requests.append((chunk, values))
+    return requests
+
+
+# Função para executar as requisições em paralelo e devolver {(ano, mês): valor}
+def _fetch_monthly(requests, backend):
+    results = get_executor().get_info_all(backend, [request for _, request in requests])
+    values = {}
+    for (chunk, _), chunk_values in zip(requests, results):
+        values.update(zip(chunk, chunk_values))
+    return values
+
+
+def _series_frame(months, values, value_name):
+    df = pd.DataFrame(months, columns=["year", "month"])
+    df[value_name] = pd.to_numeric(pd.Series([values.get(m) for m in months], dtype="object"), errors="coerce")
+    return df
+
+
+# Função para obter a série mensal (ano, mês, valor) da ROI com o mínimo de chamadas getInfo
+def monthly_series(collection, band, roi, start_date, end_date,
+                   aggregator="sum", scale=10000, value_name="value", backend=None,
+                   tile_scale=1, best_effort=False):
+    backend = backend or get_backend()
+    months = month_range(start_date, end_date)
+    requests = _monthly_requests(collection, band, roi, months, aggregator, scale, backend, tile_scale, best_effort)
+    values = _fetch_monthly(requests, backend)
+    return _series_frame(months, values, value_name)
+
+
+# Função para obter a série mensal usando o cache local: busca no EE apenas os meses ausentes
+# dataset e region identificam a série no disco (ex.: "UCSB-CHG/CHIRPS/DAILY", "Minas Gerais/Uberlândia")
+def cached_monthly_series(collection, dataset, band, region, roi, start_date, end_date,
+                          aggregator="sum", scale=10000, value_name="value", store=None, backend=None,
+                          tile_scale=1, best_effort=False):
+    backend = backend or get_backend()
+    store = store or get_store()
+    key = SeriesKey(dataset, band, region, f"{aggregator}/mean", float(scale))
+    months = month_range(start_date, end_date)
+
+    values = store.get(key, months)
+    missing = [m for m in months if m not in values]
+
+    # Cada trecho de meses ausentes vira uma (ou poucas) requisição; todas correm em paralelo
+    requests = []
+    for (start_year, start_month), (end_year, end_month) in contiguous_runs(missing):
+        run = month_range(date(start_year, start_month, 1), date(end_year, end_month, 1))
+        requests.extend(_monthly_requests(collection, band, roi, run, aggregator, scale, backend,
+                                          tile_scale, best_effort))
+    fetched = _fetch_monthly(requests, backend)
+
+    values.update(fetched)
+    # Meses recentes ainda podem ser revisados pela fonte: ficam fora do disco
+    store.put(key, [(year, month, value) for (year, month), value in fetched.items()
+                    if month_is_settled(year, month)])
+    return _series_frame(months, values, value_name)
+
+
+# Função para montar a tabela da climatologia: sempre 12 linhas (month, valor médio, std, count);
+# meses do calendário sem dados ficam com média nula e count 0
+def _climatology_frame(groups, value_name):
+    df = pd.DataFrame({"month": range(1, 13)})
+    by_month = {int(group["month"]): group for group in groups}
+    df[value_name] = [by_month.get(m, {}).get("mean") for m in df["month"]]
+    df["std"] = [by_month.get(m, {}).get("stdDev") for m in df["month"]]
+    df["count"] = [by_month.get(m, {}).get("count", 0) for m in df["month"]]
+    df[[value_name, "std"]] = df[[value_name, "std"]].apply(pd.to_numeric, errors="coerce")
+    return df.astype({"count": int})
+
+
+# Função para obter a climatologia mensal (média, desvio-padrão e número de anos de cada mês do
+# calendário) calculada no servidor com um redutor agrupado, em uma única requisição: 30 anos
+# voltam como 12 linhas, e não como 360 valores
+def monthly_climatology(collection, band, roi, start_date, end_date,
+                        aggregator="sum", scale=10000, value_name="value", backend=None,
+                        tile_scale=1, best_effort=False):
+    backend = backend or get_backend()
+    months = month_range(start_date, end_date)
+    start_year, start_month = months[0]
+    images = backend.monthly_images(collection, start_year, start_month, len(months), aggregator)
+    groups = backend.get_info(backend.reduce_climatology(images, band, roi, scale, tile_scale, best_effort))
+    return _climatology_frame(groups, value_name)
+
+
+# Função para calcular a mesma climatologia localmente a partir de uma série mensal já disponível
+# (ex.: armazenamento pré-calculado), sem chamadas ao EE
+def climatology_from_monthly(df_monthly, value_name="value"):
+    grouped = df_monthly[value_name].astype(float).groupby(df_monthly["month"])
+    stats = pd.DataFrame({"mean": grouped.mean(), "stdDev": grouped.std(ddof=0), "count": grouped.count()})
+    groups = [{"month": month, **row} for month, row in stats[stats["count"] > 0].iterrows()]
+    return _climatology_frame(groups, value_name)
+
+
+# Função para montar as imagens mensais do balanço hídrico (bandas precipitation, ET e water_balance)
+# Uma composição mensal (soma) por conjunto de dados, pareadas pela chave ano-mês em uma única junção
+def water_balance_images(precipitation, et, start_year, start_month, n_months, backend=None):
+    backend = backend or get_backend()
+    precipitation_monthly = backend.monthly_images(precipitation, start_year, start_month, n_months, "sum")
+    et_monthly = backend.monthly_images(et, start_year, start_month, n_months, "sum")
+    joined = backend.join_monthly(precipitation_monthly, et_monthly, "ET")
+    return backend.band_difference(joined, "precipitation", "ET", "water_balance")
+
+
+# Função para extrair a tabela mensal (year, month, bandas...) da ROI em formato compacto
+# Devolve (df, info); info traz os bytes da resposta e os tempos de requisição e decodificação
+def monthly_table(images, roi, bands, n_months, scale, backend=None, tile_scale=1, best_effort=False):
+    backend = backend or get_backend()
+    started = time.perf_counter()
+    rows = backend.get_info(backend.reduce_monthly_rows(images, roi, bands, n_months, scale,
+                                                        tile_scale, best_effort))
+    fetched = time.perf_counter()
+    df = pd.DataFrame(rows, columns=["year", "month", *bands])
+    df[bands] = df[bands].apply(pd.to_numeric, errors="coerce")
+    df = df.astype({"year": int, "month": int})
+    info = {
+        "bytes": len(json.dumps(rows)),
+        "request_s": fetched - started,
+        "decode_s": time.perf_counter() - fetched,
+        "rows": len(df),
+    }
+    return df, info
+
+
+# Função para agregar a série mensal em valores anuais localmente, sem chamadas ao EE
+# aggregator: "sum" (precipitação) ou "mean" (temperatura)
+# weights: None (meses com peso igual), "days" (dias do mês) ou nome de uma coluna de pesos
+def annual_from_monthly(df_monthly, value_name="value", aggregator="sum", weights=None):
+    values = df_monthly[value_name].astype(float)
+    years = df_monthly["year"]
+
+    if aggregator == "sum":
+        annual = values.groupby(years).sum(min_count=1)
+    elif aggregator == "mean":
+        if weights is None:
+            w = pd.Series(1.0, index=df_monthly.index)
+        elif weights == "days":
+            first_days = pd.to_datetime(pd.DataFrame({
+                "year": df_monthly["year"], "month": df_monthly["month"], "day": 1
+            }))
+            w = first_days.dt.days_in_month.astype(float)
+        else:
+            w = df_monthly[weights].astype(float)
+        w = w.where(values.notna())
+        annual = (values * w).groupby(years).sum(min_count=1) / w.groupby(years).sum(min_count=1)
+    else:
+        raise ValueError(f"Agregador temporal desconhecido: {aggregator}")
+
+    return annual.rename(value_name).rename_axis("year").reset_index()
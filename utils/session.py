@@ -0,0 +1,68 @@
+# Sessão compartilhada com o Earth Engine
+#
+# A autenticação (ee.Initialize com a conta de serviço) acontece uma única vez por
+# processo do Streamlit, e não a cada rerun da página: o backend inicializado fica em
+# st.cache_resource e é compartilhado por todas as sessões e páginas. Já os resultados
+# de cada análise ficam no st.session_state do usuário.
+
+import os
+
+import pandas as pd
+import streamlit as st
+
+from utils.backend import get_backend
+from utils.instrumentation import prometheus_text, session_stages
+from utils.resultcache import describe_result_cache, get_result_cache
+from utils.singleflight import describe_singleflight, get_singleflight
+
+# Variável de ambiente que ativa as informações de depuração nas páginas (também: ?debug=1 na URL)
+DEBUG_ENV = "AGROMET_DEBUG"
+
+
+# Função para obter o backend já inicializado (uma vez por processo)
+@st.cache_resource(show_spinner="Conectando ao Google Earth Engine...")
+def get_session():
+    backend = get_backend()
+    backend.initialize()
+    return backend
+
+
+# Função para guardar na sessão do usuário os resultados de uma análise (por página e parâmetros)
+# Assim, reruns provocados por widgets da página (ex.: ano do mapa) não refazem a análise
+def set_analysis(page, params, **results):
+    st.session_state[f"analise_{page}"] = {"params": params, **results}
+
+
+# Função para recuperar os resultados guardados (None se os parâmetros mudaram ou não há análise)
+def get_analysis(page, params):
+    analysis = st.session_state.get(f"analise_{page}")
+    if analysis is None or analysis["params"] != params:
+        return None
+    return analysis
+
+
+# Função para verificar se as informações de depuração devem ser exibidas
+def debug_enabled():
+    return os.environ.get(DEBUG_ENV) == "1" or st.query_params.get("debug") == "1"
+
+
+# Função para exibir na barra lateral, no modo de depuração, as etapas da sessão (duração,
+# chamadas ao EE e bytes, ver utils/instrumentation.py) e os contadores do processo
+# (coalescência de requisições entre sessões e cache de resultados)
+def debug_sidebar():
+    if not debug_enabled():
+        return
+    with st.sidebar.expander("🔧 Depuração", expanded=True):
+        stages = session_stages()
+        if stages:
+            df = pd.DataFrame(stages[::-1])[["page", "stage", "seconds", "calls", "bytes", "ee_seconds"]]
+            st.dataframe(df, use_container_width=True, hide_index=True)
+            charts = [entry for entry in stages[::-1] if entry.get("metric") == "chart"]
+            if charts:
+                df_charts = pd.DataFrame(charts)[["stage", "seconds", "figure_bytes", "points", "total_points"]]
+                df_charts = df_charts.rename(columns={"seconds": "queue_seconds"})
+                st.dataframe(df_charts, use_container_width=True, hide_index=True)
+        st.caption(describe_singleflight(get_singleflight().stats()))
+        st.caption(describe_result_cache(get_result_cache().stats()))
+        st.download_button("Métricas (Prometheus)", prometheus_text().encode("utf-8"),
+                           file_name="agromet_metrics.prom", mime="text/plain")
@@ -0,0 +1,127 @@
+# Coalescência de requisições idênticas entre sessões (single-flight)
+#
+# Quando vários usuários abrem o mesmo município e período ao mesmo tempo (ex.: durante uma
+# seca), cada sessão do Streamlit dispararia a mesma cadeia de chamadas ao Earth Engine.
+# Aqui, a primeira sessão que pede uma chave (conjunto de dados, ROI, período, escala...)
+# executa o cálculo; as demais que chegam enquanto ele está em andamento esperam e recebem
+# o mesmo resultado (ou o mesmo erro). Um resultado recém-concluído ainda é servido por
+# alguns segundos (AGROMET_SINGLEFLIGHT_LINGER), cobrindo quem chega logo depois.
+#
+# Só erros comuns (Exception) são compartilhados. Se o cálculo é interrompido (rerun ou parada
+# do Streamlit, KeyboardInterrupt), a interrupção vale apenas para a sessão que o executava: as
+# que aguardavam são liberadas e executam o cálculo elas mesmas.
+#
+# Contadores (por processo):
+# - miss: a sessão executou o cálculo;
+# - join: a sessão esperou um cálculo em andamento;
+# - hit: a sessão recebeu um resultado recém-concluído.
+# hits + joins é o número de cálculos (e de cadeias de chamadas ao EE) economizados.
+
+import os
+import threading
+import time
+
+# Segundos em que um resultado concluído continua sendo servido (0 desativa)
+LINGER_SECONDS = float(os.environ.get("AGROMET_SINGLEFLIGHT_LINGER", "5"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.aborted = False
+        self.finished_at = None
+
+
+class SingleFlight:
+    def __init__(self, linger=LINGER_SECONDS):
+        self.linger = linger
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.joins = 0
+
+    def _fresh(self, call, now):
+        return call.error is None and not call.aborted and now - call.finished_at <= self.linger
+
+    # Remove os resultados concluídos que já passaram da janela
+    def _prune(self, now):
+        expired = [key for key, call in self._calls.items()
+                   if call.done.is_set() and not self._fresh(call, now)]
+        for key in expired:
+            del self._calls[key]
+
+    # Executa fn(*args, **kwargs) uma única vez para chamadas simultâneas com a mesma chave
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            now = time.monotonic()
+            call = self._calls.get(key)
+            if call is not None and call.done.is_set() and not self._fresh(call, now):
+                call = None
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.misses += 1
+                leader = True
+            elif call.done.is_set():
+                self.hits += 1
+                return call.result
+            else:
+                self.joins += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.aborted:
+                # O líder foi interrompido: esta sessão refaz o pedido (a primeira a chegar
+                # executa o cálculo, as demais voltam a aguardar por ela)
+                return self.do(key, fn, *args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as exc:
+            call.error = exc
+            raise
+        except BaseException:
+            call.aborted = True
+            raise
+        finally:
+            with self._lock:
+                call.finished_at = time.monotonic()
+                call.done.set()
+                self._prune(call.finished_at)
+        return call.result
+
+    # Contadores e economia (cálculos evitados) desde o início do processo
+    def stats(self):
+        with self._lock:
+            in_flight = sum(1 for call in self._calls.values() if not call.done.is_set())
+            return {"hits": self.hits, "misses": self.misses, "joins": self.joins,
+                    "in_flight": in_flight, "saved": self.hits + self.joins}
+
+
+_singleflight = SingleFlight()
+
+
+# Função para obter a camada de coalescência compartilhada do processo (todas as sessões)
+def get_singleflight():
+    return _singleflight
+
+
+# Atalho: executa fn pela camada compartilhada, coalescendo chamadas simultâneas com a mesma chave
+def coalesce(key, fn, *args, **kwargs):
+    return _singleflight.do(key, fn, *args, **kwargs)
+
+
+# Função para descrever os contadores (depuração)
+def describe_singleflight(stats):
+    return (f"Coalescência de requisições: {stats['misses']} cálculos, {stats['joins']} sessões aguardaram "
+            f"um cálculo em andamento e {stats['hits']} receberam um resultado recém-concluído "
+            f"({stats['saved']} cálculos evitados).")
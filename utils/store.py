@@ -0,0 +1,103 @@
+# Armazenamento local e persistente das séries mensais (SQLite)
+#
+# Cada valor é identificado por (dataset, banda, município, redutor, escala, ano-mês),
+# de modo que uma nova consulta só precisa buscar no Earth Engine os meses que ainda
+# não estão no disco.
+
+import math
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import closing
+from datetime import date
+
+# Caminho padrão do arquivo de cache (pode ser alterado pela variável de ambiente)
+CACHE_PATH = os.environ.get("AGROMET_CACHE_PATH", os.path.join(".cache", "series.sqlite"))
+
+# Dias após o fim do mês para considerá-lo consolidado (CHIRPS e MODIS ainda podem ser revisados antes disso)
+SETTLE_DAYS = 45
+
+# Identificação de uma série: o ano-mês completa a chave de cada valor
+SeriesKey = namedtuple("SeriesKey", ["dataset", "band", "region", "reducer", "scale"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS monthly_values (
+    dataset    TEXT    NOT NULL,
+    band       TEXT    NOT NULL,
+    region     TEXT    NOT NULL,
+    reducer    TEXT    NOT NULL,
+    scale      REAL    NOT NULL,
+    year       INTEGER NOT NULL,
+    month      INTEGER NOT NULL,
+    value      REAL,
+    fetched_at REAL    NOT NULL,
+    PRIMARY KEY (dataset, band, region, reducer, scale, year, month)
+)
+"""
+
+
+# Função para verificar se um mês já está consolidado (pode ser gravado em definitivo)
+def month_is_settled(year, month, today=None, settle_days=SETTLE_DAYS):
+    today = today or date.today()
+    next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return (today - next_month).days >= settle_days
+
+
+class SeriesStore:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        # Uma conexão por operação: o Streamlit executa cada sessão em uma thread diferente
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Retorna {(ano, mês): valor} para os meses da lista que já estão no disco
+    def get(self, key, months):
+        if not months:
+            return {}
+        first = min(months)
+        last = max(months)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT year, month, value FROM monthly_values "
+                "WHERE dataset = ? AND band = ? AND region = ? AND reducer = ? AND scale = ? "
+                "AND year * 100 + month BETWEEN ? AND ?",
+                (*key, first[0] * 100 + first[1], last[0] * 100 + last[1])
+            ).fetchall()
+        wanted = set(months)
+        return {(year, month): value for year, month, value in rows if (year, month) in wanted}
+
+    # Grava (ano, mês, valor) para a série; valores nulos/NaN são gravados como NULL
+    def put(self, key, rows):
+        now = time.time()
+        records = [
+            (*key, int(year), int(month),
+             None if value is None or (isinstance(value, float) and math.isnan(value)) else float(value),
+             now)
+            for year, month, value in rows
+        ]
+        if not records:
+            return 0
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO monthly_values "
+                "(dataset, band, region, reducer, scale, year, month, value, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+        return len(records)
+
+
+_default_store = None
+
+
+# Função para obter o armazenamento padrão do processo (criado na primeira chamada)
+def get_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = SeriesStore()
+    return _default_store
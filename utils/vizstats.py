@@ -0,0 +1,54 @@
+# Estatísticas de visualização dos mapas (mínimo, máximo e percentis em uma única chamada)
+#
+# A escala de cores usa por padrão os percentis 2 e 98 (ajuste robusto a valores extremos).
+# O resultado é memorizado por (conjunto de dados, ano, trecho do ano coberto pelo período,
+# região, escala, percentis) no cache de resultados do processo (utils/resultcache.py): rever
+# um ano já exibido não custa nenhuma chamada ao Earth Engine. O trecho do ano faz parte da
+# chave porque o primeiro e o último ano de um período são composições parciais.
+
+from utils.resultcache import get_result_cache
+
+# Percentis padrão do ajuste da escala de cores
+DEFAULT_PERCENTILES = (2, 98)
+
+
+def _compute_stats(backend, image, band, roi, scale, percentiles, tile_scale, best_effort):
+    values = backend.get_info(backend.reduce_stats(image, roi, percentiles, scale, tile_scale, best_effort))
+    stats = {"min": values.get(f"{band}_min"), "max": values.get(f"{band}_max")}
+    for p in percentiles:
+        stats[f"p{p}"] = values.get(f"{band}_p{p}")
+    return stats
+
+
+# Função para obter {"min", "max", "p2", "p98", ...} de uma banda da imagem sobre a ROI
+# key identifica a imagem no cache, inclusive o trecho do ano composto, ex.:
+# ("UCSB-CHG/CHIRPS/DAILY", 2015, ("2015-01-01", "2015-12-31"), "Minas Gerais/Uberlândia")
+# ttl: validade no cache, em segundos (padrão: a dos resultados consolidados)
+def get_viz_stats(backend, image, band, key, roi, scale, percentiles=DEFAULT_PERCENTILES,
+                  tile_scale=1, best_effort=False, ttl=None):
+    cache_key = ("viz_stats", backend.name, band, key, float(scale), tuple(percentiles))
+    return get_result_cache().get_or_compute(
+        cache_key, lambda: _compute_stats(backend, image, band, roi, scale, percentiles, tile_scale, best_effort),
+        ttl)
+
+
+# Função para montar os parâmetros de visualização; stretch: "percentile" (padrão) ou "minmax"
+def viz_params(stats, palette, stretch="percentile", percentiles=DEFAULT_PERCENTILES):
+    if stretch == "percentile":
+        low, high = stats[f"p{percentiles[0]}"], stats[f"p{percentiles[-1]}"]
+    else:
+        low, high = stats["min"], stats["max"]
+    return {"min": low, "max": high, "palette": palette}
+
+
+# Função para descrever a escala de cores (legenda do mapa)
+def describe_stretch(stats, unit, percentiles=DEFAULT_PERCENTILES, digits=1):
+    low, high = percentiles[0], percentiles[-1]
+    return (f"Escala de cores: percentis {low}–{high} ({stats[f'p{low}']:.{digits}f} a "
+            f"{stats[f'p{high}']:.{digits}f} {unit}); mínimo {stats['min']:.{digits}f} {unit}, "
+            f"máximo {stats['max']:.{digits}f} {unit}.")
+
+
+# Função para limpar o cache (testes e benchmarks)
+def clear_cache():
+    get_result_cache().clear("viz_stats")